@@ -0,0 +1,3 @@
+"""
+Benchmarks for the geo types, run with python -m benchmarks from the root of the repository
+"""
@@ -0,0 +1,82 @@
+"""
+GeoJSON for the benchmark matrix, every geometry is generated from a fixed seed so runs are comparable
+"""
+import math
+from typing import Callable, Dict
+
+import numpy as np
+
+
+def _feature(geometry: dict, **properties) -> dict:
+    return {"type": "Feature", "properties": properties, "geometry": geometry}
+
+
+def _ring(xs, ys) -> list:
+    ring = [[round(float(x), 6), round(float(y), 6)] for x, y in zip(xs, ys)]
+    return ring + [ring[0]]
+
+
+def bbox() -> dict:
+    """ a rectangle, every candidate drawn in its bounds is accepted """
+    return _feature({"type": "Polygon", "coordinates": [
+        [[-77.5, 38.5], [-76.5, 38.5], [-76.5, 39.5], [-77.5, 39.5], [-77.5, 38.5]]]})
+
+
+def sliver() -> dict:
+    """ the thin triangle from the clip tests, it covers under a fifth of its bounds """
+    return _feature({"type": "Polygon", "coordinates": [
+        [[23.0843, 53.1544], [23.0845, 53.1544], [23.0859, 53.1535], [23.0843, 53.1544]]]})
+
+
+def coastline(vertices: int = 5000) -> dict:
+    """ a concave, star shaped polygon with a rough edge of many vertices, like a detailed coastline """
+    rng = np.random.default_rng(0)
+    angles = np.linspace(0, 2 * math.pi, vertices, endpoint=False)
+    # deep bays from the low harmonics, a rough edge from a smoothed random walk
+    walk = np.cumsum(rng.normal(0, 0.02, vertices))
+    walk -= np.linspace(0, walk[-1], vertices)
+    radii = 1.0 + 0.45 * np.sin(5 * angles) * np.cos(3 * angles) + walk
+    radii = np.clip(radii, 0.05, None)
+    xs = -70.0 + radii * np.cos(angles)
+    ys = 42.0 + 0.75 * radii * np.sin(angles)
+    return _feature({"type": "Polygon", "coordinates": [_ring(xs, ys)]})
+
+
+def feature_collection(count: int = 1000) -> dict:
+    """ count small polygons of varied size on a grid, each with a population property """
+    rng = np.random.default_rng(1)
+    columns = math.ceil(math.sqrt(count))
+    features = []
+    for i in range(count):
+        x = 5.0 + (i % columns) * 0.1
+        y = 45.0 + (i // columns) * 0.1
+        size = rng.uniform(0.01, 0.08)
+        sides = int(rng.integers(3, 9))
+        angles = np.linspace(0, 2 * math.pi, sides, endpoint=False) + rng.uniform(0, math.pi)
+        geometry = {"type": "Polygon", "coordinates": [_ring(x + size / 2 * np.cos(angles),
+                                                             y + size / 2 * np.sin(angles))]}
+        features.append(_feature(geometry, population=int(rng.integers(1, 100000))))
+    return {"type": "FeatureCollection", "features": features}
+
+
+def holes(count: int = 10) -> dict:
+    """ a square with a count by count grid of square holes covering over a third of it """
+    outer = [[10.0, 50.0], [11.0, 50.0], [11.0, 51.0], [10.0, 51.0], [10.0, 50.0]]
+    step = 1.0 / count
+    size = step * 0.6
+    rings = [outer]
+    for row in range(count):
+        for column in range(count):
+            x = 10.0 + column * step + step * 0.2
+            y = 50.0 + row * step + step * 0.2
+            rings.append([[x, y], [x, y + size], [x + size, y + size], [x + size, y], [x, y]])
+    return _feature({"type": "Polygon", "coordinates": rings})
+
+
+MATRIX: Dict[str, Callable[[], dict]] = {
+    "bbox": bbox,
+    "sliver": sliver,
+    "coastline": coastline,
+    "features_1000": feature_collection,
+    "holes": holes,
+}
@@ -0,0 +1,219 @@
+"""
+Runs the geo types over the benchmark matrix and writes the results as JSON
+
+Each case generates records for one geo type over one geometry with one sampler and reports the throughput, the per
+record latency percentiles, the peak resident memory and the acceptance ratio of the rejection samplers, along with the
+vertex counts before and after simplifying when a simplify tolerance is given. Cases run one at a time in a fresh
+process by default, so the peak memory and the geometry cache belong to that case alone.
+"""
+import argparse
+import concurrent.futures
+import datetime
+import itertools
+import json
+import multiprocessing
+import platform
+import random
+import subprocess
+import sys
+import time
+from typing import List, Union
+
+import numpy as np
+import shapely  # type: ignore
+
+from datacraft.loader import field_loader
+
+from .geometries import MATRIX
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # type: ignore
+
+TYPES = ['geo.mgrs', 'geo.utm', 'geo.pair.clip', 'geo.lat.clip', 'geo.long.clip']
+SAMPLERS = ['rejection', 'triangulate', 'grid']
+
+
+def run_case(type_name: str, geometry: str, sampler: str, records: int, seed: int = 0,
+             config: Union[dict, None] = None) -> dict:
+    """
+    Generate records for one case of the matrix in this process
+
+    Args:
+        type_name: geo type to generate
+        geometry: name of the geometry in the matrix to clip by
+        sampler: to generate the points with
+        records: number of records to generate
+        seed: for the random module and the field
+        config: more config for the field, i.e. simplify_tolerance or precision
+
+    Returns:
+        the measurements for the case
+    """
+    random.seed(seed)
+    field_config = {"geojson": MATRIX[geometry](), "sampler": sampler, "seed": seed}
+    field_config.update(config or {})
+    spec = {"field": {"type": type_name, "config": field_config}}
+
+    started = time.perf_counter()
+    supplier = field_loader(spec).get('field')
+    load_seconds = time.perf_counter() - started
+
+    clock = time.perf_counter_ns
+    latencies = np.empty(records, dtype=np.int64)
+    started_ns = clock()
+    for i in range(records):
+        tick = clock()
+        supplier.next(i)
+        latencies[i] = clock() - tick
+    elapsed = (clock() - started_ns) / 1e9
+
+    candidates, accepted = _sampler_totals(supplier)
+    counters = _point_supplier(supplier).metrics.counters
+    return {
+        "type": type_name,
+        "geometry": geometry,
+        "sampler": sampler,
+        "records": records,
+        "load_seconds": round(load_seconds, 6),
+        "records_per_second": round(records / elapsed, 1) if elapsed > 0 else None,
+        "p50_us": round(float(np.percentile(latencies, 50)) / 1000, 3),
+        "p99_us": round(float(np.percentile(latencies, 99)) / 1000, 3),
+        "peak_rss_mb": _peak_rss_mb(),
+        # samplers that draw points directly inside the polygon never reject a candidate
+        "acceptance": round(accepted / candidates, 4) if candidates > 0 else 1.0,
+        "config": config or {},
+        "vertices_before": counters.get('vertices_before_simplify'),
+        "vertices_after": counters.get('vertices_after_simplify'),
+    }
+
+
+def run(types: List[str], geometries: List[str], samplers: List[str], records: int, seed: int = 0,
+        isolate: bool = True, config: Union[dict, None] = None) -> dict:
+    """
+    Run every combination of the types, geometries and samplers
+
+    Args:
+        types: geo types to generate
+        geometries: names of the geometries in the matrix
+        samplers: samplers to generate points with
+        records: number of records for each case
+        seed: for each case
+        isolate: run each case in a fresh process
+        config: more config for every field
+
+    Returns:
+        the environment and the measurements for each case
+    """
+    cases = list(itertools.product(types, geometries, samplers))
+    if isolate:
+        context = multiprocessing.get_context('spawn')
+        results = []
+        for case in cases:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                results.append(pool.submit(run_case, *case, records, seed, config).result())
+    else:
+        results = [run_case(*case, records, seed, config) for case in cases]
+    return {
+        "commit": _commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "shapely": shapely.__version__,
+        "platform": platform.platform(),
+        "records": records,
+        "seed": seed,
+        "cases": results,
+    }
+
+
+def compare(baseline: dict, current: dict) -> List[str]:
+    """
+    Compare the throughput of the cases in two runs
+
+    Args:
+        baseline: results of the earlier run
+        current: results of the later run
+
+    Returns:
+        one line per case found in both runs with the ratio of records per second
+    """
+    def key(case):
+        return case['type'], case['geometry'], case['sampler']
+
+    previous = {key(case): case for case in baseline['cases']}
+    lines = []
+    for case in current['cases']:
+        before = previous.get(key(case))
+        if before is None or not before['records_per_second'] or not case['records_per_second']:
+            continue
+        ratio = case['records_per_second'] / before['records_per_second']
+        lines.append(f"{' '.join(key(case)):<45} {before['records_per_second']:>12,.0f} -> "
+                     f"{case['records_per_second']:>12,.0f} records/sec ({ratio:.2f}x)")
+    return lines
+
+
+def _point_supplier(supplier):
+    """ the supplier that samples the points, unwrapping the geo suppliers and any datacraft buffering around it """
+    while supplier is not None and not hasattr(supplier, 'samplers'):
+        supplier = getattr(supplier, 'pair_supplier', getattr(supplier, 'wrapped', None))
+    return supplier
+
+
+def _sampler_totals(supplier):
+    """ sum the candidates and accepted counts of the samplers behind the supplier """
+    samplers = getattr(_point_supplier(supplier), 'samplers', [])
+    candidates = sum(getattr(sampler, 'candidates', 0) for sampler in samplers)
+    accepted = sum(getattr(sampler, 'accepted', 0) for sampler in samplers)
+    return candidates, accepted
+
+
+def _peak_rss_mb() -> Union[float, None]:
+    if resource is None:  # pragma: no cover
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on mac
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(peak / scale, 1)
+
+
+def _commit() -> Union[str, None]:
+    try:
+        output = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Benchmark the datacraft-geo types')
+    parser.add_argument('-n', '--records', type=int, default=10000, help='records to generate per case')
+    parser.add_argument('-t', '--types', nargs='+', default=TYPES, choices=TYPES, help='geo types to run')
+    parser.add_argument('-g', '--geometries', nargs='+', default=list(MATRIX), choices=list(MATRIX),
+                        help='geometries to clip by')
+    parser.add_argument('-s', '--samplers', nargs='+', default=SAMPLERS, choices=SAMPLERS, help='samplers to use')
+    parser.add_argument('--seed', type=int, default=0, help='seed for every case')
+    parser.add_argument('-o', '--output', help='file to write the JSON results to, default is stdout')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare the throughput against')
+    parser.add_argument('--in-process', action='store_true', help='run all cases in this process')
+    parser.add_argument('--simplify-tolerance', type=float, help='meters to simplify the geometries within')
+    parser.add_argument('--precision', type=int, help='digits after the decimal place for the points')
+    parser.add_argument('--join-with', help='join the pairs of the pair type with this string')
+    args = parser.parse_args(argv)
+
+    config = {key: value for key, value in [('simplify_tolerance', args.simplify_tolerance),
+                                            ('precision', args.precision),
+                                            ('join_with', args.join_with)] if value is not None}
+    results = run(args.types, args.geometries, args.samplers, args.records, args.seed, isolate=not args.in_process,
+                  config=config)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(results, handle, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as handle:
+            baseline = json.load(handle)
+        print('\n'.join(compare(baseline, results)), file=sys.stderr)
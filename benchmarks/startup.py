@@ -0,0 +1,119 @@
+"""
+Measures the import cost the geo plugin adds to every datacraft invocation, and the cost of the first geo field that
+loads the rest of it
+
+Each measurement runs in a fresh interpreter. datacraft loads its plugins with importlib, which python -X importtime
+does not see, so the plugin cost is the difference between importing datacraft with the plugin and with a stand in
+for it.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import List, Union
+
+from .run import _commit
+
+# modules the plugin should only load once a geo field is configured
+HEAVY_MODULES = ['numpy', 'shapely', 'utm', 'mgrs', 'datacraft_geo.suppliers']
+
+_IMPORT = '''
+import sys
+import time
+import types
+if {stand_in}:
+    stand_in = types.ModuleType('datacraft_geo')
+    stand_in.load_custom = lambda: None
+    sys.modules['datacraft_geo'] = stand_in
+started = time.perf_counter()
+import datacraft
+print(time.perf_counter() - started)
+'''
+
+_LOADED = '''
+import json
+import sys
+import types
+if {stand_in}:
+    stand_in = types.ModuleType('datacraft_geo')
+    stand_in.load_custom = lambda: None
+    sys.modules['datacraft_geo'] = stand_in
+import datacraft
+print(json.dumps([name for name in {heavy!r} if name in sys.modules]))
+'''
+
+_FIRST_FIELD = '''
+import time
+import datacraft
+started = time.perf_counter()
+datacraft.entries({{"field": {{"type": "{type_name}"}}}}, 1)
+print(time.perf_counter() - started)
+'''
+
+
+def _median_ms(script: str, runs: int) -> float:
+    """ median of the seconds printed by the script across fresh interpreters, in milliseconds """
+    seconds = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True)
+        seconds.append(float(output.stdout.strip().splitlines()[-1]))
+    return round(statistics.median(seconds) * 1000, 2)
+
+
+def heavy_modules_loaded() -> List[str]:
+    """ the heavy modules importing datacraft loads with the plugin that it does not load with a stand in for it """
+    loaded = {}
+    for stand_in in (False, True):
+        output = subprocess.run([sys.executable, '-c', _LOADED.format(stand_in=stand_in, heavy=HEAVY_MODULES)],
+                                capture_output=True, text=True, check=True)
+        loaded[stand_in] = json.loads(output.stdout.strip().splitlines()[-1])
+    return [name for name in loaded[False] if name not in loaded[True]]
+
+
+def measure(runs: int = 20, types: Union[List[str], None] = None) -> dict:
+    """
+    Measure the plugin import cost and the first field cost in fresh interpreters
+
+    Args:
+        runs: number of interpreters to start for each measurement
+        types: geo types to time the first field for, default is geo.mgrs and geo.utm
+
+    Returns:
+        the median times in milliseconds along with the heavy modules loaded by importing datacraft
+    """
+    if types is None:
+        types = ['geo.mgrs', 'geo.utm']
+    with_plugin = _median_ms(_IMPORT.format(stand_in=False), runs)
+    without_plugin = _median_ms(_IMPORT.format(stand_in=True), runs)
+    first_field = {type_name: _median_ms(_FIRST_FIELD.format(type_name=type_name), runs) for type_name in types}
+    return {
+        "commit": _commit(),
+        "python": sys.version.split()[0],
+        "runs": runs,
+        "datacraft_import_ms": with_plugin,
+        "datacraft_import_without_plugin_ms": without_plugin,
+        "plugin_import_ms": round(with_plugin - without_plugin, 2),
+        "heavy_modules_on_import": heavy_modules_loaded(),
+        "first_field_ms": first_field,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.startup',
+                                     description='Measure the startup cost of the datacraft-geo plugin')
+    parser.add_argument('-r', '--runs', type=int, default=20, help='interpreters to start for each measurement')
+    parser.add_argument('-o', '--output', help='file to write the JSON results to, default is stdout')
+    args = parser.parse_args(argv)
+
+    results = measure(args.runs)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(results, handle, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
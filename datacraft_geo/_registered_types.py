@@ -0,0 +1,869 @@
+"""
+Registers the geo types, their schemas, usage and defaults with datacraft. Imported by load_custom when datacraft loads
+its plugins, so importing datacraft_geo on its own never imports datacraft.
+"""
+import collections
+import hashlib
+import json
+import logging
+import os.path
+import tempfile
+import weakref
+from typing import TYPE_CHECKING, Union
+
+import datacraft
+import datacraft._registered_types.common as common
+
+if TYPE_CHECKING:
+    # numpy is imported when a geo field is configured, like the rest of the modules that do the work
+    import numpy as np
+
+_GEO_UTM_TEMPLATE = "geo_utm_template"
+_GEO_CLIP_BATCH_SIZE = "geo_clip_batch_size"
+_GEO_GRID_SIZE = "geo_grid_size"
+_GEO_CACHE_SIZE = "geo_cache_size"
+_GEO_BATCH_SIZE = "geo_batch_size"
+_GEO_SEED = "geo_seed"
+_GEO_METRICS_FILE = "geo_metrics_file"
+_GEO_MAX_ATTEMPTS = "geo_max_attempts"
+_GEO_TIME_BUDGET = "geo_time_budget"
+_GEO_MIN_ACCEPTANCE = "geo_min_acceptance"
+_GEO_POOL_DIR = "geo_pool_dir"
+
+_MGRS_KEY = 'geo.mgrs'
+_UTM_KEY = 'geo.utm'
+_GEO_PAIR_CLIPPED = 'geo.pair.clip'
+_GEO_PAIR_WEIGHTED = 'geo.pair.weighted'
+_GEO_LAT_CLIPPED = 'geo.lat.clip'
+_GEO_LONG_CLIPPED = 'geo.long.clip'
+_GEO_TRACK = 'geo.track'
+_GEO_REGION_CLIPPED = 'geo.region.clip'
+_GEOHASH_KEY = 'geo.geohash'
+_CELL_KEY = 'geo.cell'
+
+_log = logging.getLogger(__name__)
+_ZONES_SCHEMA = {
+    "type": ["integer", "string", "array"],
+    "items": {"type": ["integer", "string"]}
+}
+_TRACK_OUTPUTS = ['pair', 'mgrs', 'utm']
+# level of the cells for each cell type when not configured, about 150 m across
+_CELL_LEVELS = {'s2': 16, 'hex': 9, 'geohash': 7}
+# config for how points are served from a pool, the rest of the config changes the points in the pool
+_POOL_SERVING_KEYS = ['lat_first', 'join_with', 'batch_size', 'pool_replacement']
+_BBOX_SCHEMA = {"type": "array", "items": {"type": "number"}, "minItems": 4, "maxItems": 4}
+# shared pair suppliers for each loader, keyed by point group name
+_point_groups: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+# number of seeded fields with the same spec for each loader
+_field_counts: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_BBOX_KEYS = ['start_lat', 'end_lat', 'start_long', 'end_long', 'bbox', 'precision']
+####################
+# Schema Definitions
+####################
+
+
+@datacraft.registry.schemas(_MGRS_KEY)
+def _get_mgrs_schema():
+    """ get the schema for mgrs type """
+    schema = _geo_common_schema(_MGRS_KEY)
+    properties = schema['properties']['config']['properties']
+    properties['mgrs_precision'] = {
+        "type": ["integer", "string"],
+        "enum": [0, 1, 2, 3, 4, 5, "100km", "10km", "1km", "100m", "10m", "1m"]
+    }
+    properties['zones'] = _ZONES_SCHEMA
+    properties['mgrs_squares'] = {
+        "type": ["string", "array"],
+        "items": {
+            "type": "string",
+            "pattern": "^[0-9]{1,2}[C-HJ-NP-Xc-hj-np-x][A-HJ-NP-Za-hj-np-z][A-HJ-NP-Va-hj-np-v]$"
+        }
+    }
+    return schema
+
+
+@datacraft.registry.schemas(_GEOHASH_KEY)
+def _get_geohash_schema():
+    """ get the schema for geo.geohash type """
+    schema = _cell_schema(_GEOHASH_KEY)
+    schema['properties']['config']['properties']['geohash_precision'] = {"type": "integer", "minimum": 1, "maximum": 12}
+    return schema
+
+
+@datacraft.registry.schemas(_CELL_KEY)
+def _get_cell_schema():
+    """ get the schema for geo.cell type """
+    schema = _cell_schema(_CELL_KEY)
+    properties = schema['properties']['config']['properties']
+    properties['cell_type'] = {"type": "string", "enum": list(_CELL_LEVELS.keys())}
+    properties['level'] = {"type": "integer", "minimum": 0, "maximum": 30}
+    return schema
+
+
+def _cell_schema(type_key):
+    schema = _geo_common_schema(type_key)
+    properties = schema['properties']['config']['properties']
+    properties['cell_format'] = {"type": "string", "enum": ["token", "id"]}
+    properties['per_cell'] = {"type": ["boolean", "string"]}
+    return schema
+
+
+@datacraft.registry.schemas(_GEO_PAIR_CLIPPED)
+def _get_geo_pair_schema():
+    """ get the schema for geo.pair.clip type """
+    return _geo_common_schema(_GEO_PAIR_CLIPPED)
+
+
+@datacraft.registry.schemas(_GEO_PAIR_WEIGHTED)
+def _get_geo_pair_weighted_schema():
+    """ get the schema for geo.pair.weighted type """
+    return _geo_common_schema(_GEO_PAIR_WEIGHTED)
+
+
+@datacraft.registry.schemas(_GEO_TRACK)
+def _get_geo_track_schema():
+    """ get the schema for geo.track type """
+    schema = _geo_common_schema(_GEO_TRACK)
+    properties = schema['properties']['config']['properties']
+    properties['tracks'] = {"type": "integer", "minimum": 1}
+    properties['mode'] = {"type": "string", "enum": ["walk", "waypoints"]}
+    properties['step_meters'] = {"type": "number", "exclusiveMinimum": 0}
+    properties['turn_degrees'] = {"type": "number", "minimum": 0}
+    properties['output'] = {"type": "string", "enum": _TRACK_OUTPUTS}
+    properties['mgrs_precision'] = _get_mgrs_schema()['properties']['config']['properties']['mgrs_precision']
+    properties['template'] = {"type": "string"}
+    return schema
+
+
+@datacraft.registry.schemas(_GEO_REGION_CLIPPED)
+def _get_geo_region_schema():
+    """ get the schema for geo.region.clip type """
+    schema = _geo_common_schema(_GEO_REGION_CLIPPED)
+    properties = schema['properties']['config']['properties']
+    properties['property'] = {"type": "string"}
+    properties['properties'] = {"type": ["string", "array"], "items": {"type": "string"}}
+    return schema
+
+
+@datacraft.registry.schemas(_GEO_LAT_CLIPPED)
+def _get_geo_lat_schema():
+    """ get the schema for geo.lat.clip type """
+    return _geo_common_schema(_GEO_LAT_CLIPPED)
+
+
+@datacraft.registry.schemas(_GEO_LONG_CLIPPED)
+def _get_geo_long_schema():
+    """ get the schema for geo.long.clip type """
+    return _geo_common_schema(_GEO_LONG_CLIPPED)
+
+
+def _geo_common_schema(type_key):
+    return {
+        "$schema": "http://json-schema.org/draft-07/schema#",
+        "$id": f"https://github.com/bbux-dev/datacraft-geo/schemas/{type_key}.schema.json",
+        "type": "object",
+        "properties": {
+            "type": {"type": "string", "pattern": f"^{type_key}$"},
+            "config": {
+                "type": "object",
+                "properties": {
+                    "start_lat": {"type": "number", "minimum": -90, "maximum": 90},
+                    "end_lat": {"type": "number", "minimum": -90, "maximum": 90},
+                    "start_long": {"type": "number", "minimum": -180, "maximum": 180},
+                    "end_long": {"type": "number", "minimum": -180, "maximum": 180},
+                    "geojson": {"type": "object"},
+                    "exclude_geojson": {"type": ["object", "string"]},
+                    "buffer_meters": {"type": "number"},
+                    "simplify_tolerance": {"type": "number", "minimum": 0},
+                    "precision": {"type": "integer", "minimum": 0, "maximum": 15},
+                    "sampler": {"type": "string", "enum": ["rejection", "triangulate", "grid"]},
+                    "grid_size": {"type": "integer", "minimum": 1},
+                    "weight_by": {"type": "string", "enum": ["area", "uniform", "property"]},
+                    "weight_property": {"type": "string"},
+                    "where": {"type": "object"},
+                    "wkb_cache": {"type": ["boolean", "string"]},
+                    "max_attempts": {"type": "integer", "minimum": 1},
+                    "time_budget": {"type": "number", "exclusiveMinimum": 0},
+                    "min_acceptance": {"type": "number", "minimum": 0, "maximum": 1},
+                    "make_valid": {"type": ["boolean", "string"]},
+                    "weights": {"type": "string"},
+                    "weights_bounds": _BBOX_SCHEMA,
+                    "weights_cache": {"type": ["boolean", "string"]},
+                    "pool_size": {"type": "integer", "minimum": 1},
+                    "pool_cache": {"type": ["boolean", "string"]},
+                    "pool_replacement": {"type": ["boolean", "string"]},
+                    "point_group": {"type": "string"}
+                },
+                "additionalProperties": True
+            }
+        }
+    }
+
+
+@datacraft.registry.schemas(_UTM_KEY)
+def _get_utm_schema():
+    """ get the schema for utm type """
+    return {
+        "$schema": "http://json-schema.org/draft-07/schema#",
+        "$id": "https://github.com/bbux-dev/datacraft-geo/schemas/utm.schema.json",
+        "type": "object",
+        "properties": {
+            "type": {"type": "string", "pattern": "^geo.utm$"},
+            "config": {
+                "type": "object",
+                "properties": {
+                    "template": {"type": "string"},
+                    "start_lat": {
+                        "type": "number", "minimum": -90, "maximum": 90,
+                        "description": "points south of -80 are converted to UPS"
+                    },
+                    "end_lat": {
+                        "type": "number", "minimum": -90, "maximum": 90,
+                        "description": "points north of 84 are converted to UPS"
+                    },
+                    "start_long": {"type": "number", "minimum": -180, "maximum": 180},
+                    "end_long": {"type": "number", "minimum": -180, "maximum": 180},
+                    "geojson": {"type": "object"},
+                    "exclude_geojson": {"type": ["object", "string"]},
+                    "buffer_meters": {"type": "number"},
+                    "simplify_tolerance": {"type": "number", "minimum": 0},
+                    "precision": {"type": "integer", "minimum": 0, "maximum": 15},
+                    "sampler": {"type": "string", "enum": ["rejection", "triangulate", "grid"]},
+                    "grid_size": {"type": "integer", "minimum": 1},
+                    "weight_by": {"type": "string", "enum": ["area", "uniform", "property"]},
+                    "weight_property": {"type": "string"},
+                    "where": {"type": "object"},
+                    "wkb_cache": {"type": ["boolean", "string"]},
+                    "max_attempts": {"type": "integer", "minimum": 1},
+                    "time_budget": {"type": "number", "exclusiveMinimum": 0},
+                    "min_acceptance": {"type": "number", "minimum": 0, "maximum": 1},
+                    "make_valid": {"type": ["boolean", "string"]},
+                    "weights": {"type": "string"},
+                    "weights_bounds": _BBOX_SCHEMA,
+                    "weights_cache": {"type": ["boolean", "string"]},
+                    "pool_size": {"type": "integer", "minimum": 1},
+                    "pool_cache": {"type": ["boolean", "string"]},
+                    "pool_replacement": {"type": ["boolean", "string"]},
+                    "zones": _ZONES_SCHEMA,
+                    "force_zone_number": {"type": "integer", "minimum": 1, "maximum": 60},
+                    "force_zone_letter": {"type": "string", "pattern": "^[C-HJ-NP-Xc-hj-np-x]$"}
+                },
+                "additionalProperties": True
+            }
+        }
+    }
+#####################
+# Default Definitions
+#####################
+
+
+@datacraft.registry.defaults(_GEO_UTM_TEMPLATE)
+def _default_utm_template():
+    return "{{ zone_number }} {{ zone_letter }} {{ easting | int }} {{ northing | int }}"
+
+
+@datacraft.registry.defaults(_GEO_CLIP_BATCH_SIZE)
+def _default_clip_batch_size():
+    return 1000
+
+
+@datacraft.registry.defaults(_GEO_BATCH_SIZE)
+def _default_batch_size():
+    return 10000
+
+
+@datacraft.registry.defaults(_GEO_SEED)
+def _default_seed():
+    return None
+
+
+@datacraft.registry.defaults(_GEO_METRICS_FILE)
+def _default_metrics_file():
+    return None
+
+
+@datacraft.registry.defaults(_GEO_MAX_ATTEMPTS)
+def _default_max_attempts():
+    return 1000
+
+
+@datacraft.registry.defaults(_GEO_TIME_BUDGET)
+def _default_time_budget():
+    return None
+
+
+@datacraft.registry.defaults(_GEO_MIN_ACCEPTANCE)
+def _default_min_acceptance():
+    return 0.01
+
+
+@datacraft.registry.defaults(_GEO_POOL_DIR)
+def _default_pool_dir():
+    return os.path.join(tempfile.gettempdir(), 'datacraft-geo-pools')
+
+
+@datacraft.registry.defaults(_GEO_GRID_SIZE)
+def _default_grid_size():
+    return 64
+
+
+@datacraft.registry.defaults(_GEO_CACHE_SIZE)
+def _default_cache_size():
+    return 16
+####################
+# Type Definitions
+####################
+
+
+@datacraft.registry.types(_MGRS_KEY)
+def _configure_mgrs_supplier(field_spec, loader: datacraft.Loader):
+    """ configure the supplier for mgrs types """
+    rng = _field_rng(field_spec, loader)
+    config = datacraft.utils.load_config(field_spec, loader)
+    pair_supplier = _configure_zoned_pair_supplier(config, rng)
+    if pair_supplier is None and 'geojson' in config:
+        pair_supplier = _configure_clipped_pair_supplier(field_spec, loader, rng)
+    elif pair_supplier is None:
+        pair_supplier = _get_pair_supplier(field_spec, loader, rng)
+    lat_first = datacraft.utils.is_affirmative(
+        'lat_first', config, datacraft.registries.get_default('geo_lat_first'))
+    return _mgrs_from_pairs(pair_supplier, config, lat_first)
+
+
+@datacraft.registry.types(_UTM_KEY)
+def _configure_utm_supplier(field_spec, loader: datacraft.Loader):
+    """ configure the supplier for utm types """
+    rng = _field_rng(field_spec, loader)
+    config = datacraft.utils.load_config(field_spec, loader)
+    # want the pair to be returned as a list, not combined as string
+    if 'as_list' not in config or config['as_list'] is False:
+        config['as_list'] = True
+    # points outside of these are converted to UPS
+    if 'start_lat' not in config:
+        config['start_lat'] = -80
+    if 'end_lat' not in config:
+        config['end_lat'] = 84
+    lat_first = datacraft.utils.is_affirmative(
+        'lat_first', config, datacraft.registries.get_default('geo_lat_first'))
+    pair_supplier = _configure_zoned_pair_supplier(config, rng)
+    if pair_supplier is None and 'geojson' in config:
+        tweaked_spec = field_spec.copy()
+        tweaked_spec['config'] = config
+        pair_supplier = _configure_clipped_pair_supplier(tweaked_spec, loader, rng)
+    elif pair_supplier is None:
+        pair_supplier = _bbox_pair_supplier(config, rng)
+    return _utm_from_pairs(pair_supplier, config, lat_first)
+
+
+@datacraft.registry.types(_GEOHASH_KEY)
+def _configure_geohash_supplier(field_spec, loader: datacraft.Loader):
+    """ configure the supplier for geohash types """
+    config = datacraft.utils.load_config(field_spec, loader)
+    return _cells_from_spec(field_spec, loader, 'geohash', config.get('geohash_precision', _CELL_LEVELS['geohash']))
+
+
+@datacraft.registry.types(_CELL_KEY)
+def _configure_cell_supplier(field_spec, loader: datacraft.Loader):
+    """ configure the supplier for cell types """
+    config = datacraft.utils.load_config(field_spec, loader)
+    cell_type = config.get('cell_type', 's2')
+    if cell_type not in _CELL_LEVELS:
+        raise datacraft.SpecException(f'Unknown cell_type {cell_type}, must be one of {list(_CELL_LEVELS.keys())}')
+    return _cells_from_spec(field_spec, loader, cell_type, config.get('level', _CELL_LEVELS[cell_type]))
+
+
+@datacraft.registry.types(_GEO_PAIR_CLIPPED)
+def _configure_clipped_pair_type(field_spec: dict, loader: datacraft.Loader):
+    """ configure the supplier for clipped geo pair type """
+    from . import suppliers
+    config = datacraft.utils.load_config(field_spec, loader)
+    if 'point_group' in config:
+        return suppliers.group_pair_supplier(_get_point_group_supplier(field_spec, loader), **config)
+    return _configure_clipped_pair_supplier(field_spec, loader)
+
+
+def _configure_clipped_pair_supplier(field_spec: dict,
+                                     loader: datacraft.Loader,
+                                     rng: Union["np.random.Generator", None] = None):
+    """ configure the clipped geo pair supplier """
+    if rng is None:
+        rng = _field_rng(field_spec, loader)
+    config = datacraft.utils.load_config(field_spec, loader)
+    if 'geojson' not in config:
+        raise datacraft.SpecException(f'geojson is required config for {_GEO_PAIR_CLIPPED} type: '
+                                      f'{json.dumps(field_spec)}')
+    geometries = _load_geometries(config, loader)
+    if 'pool_size' in config:
+        return _point_pool_supplier(geometries, config, loader, rng)
+    return _clipped_points(geometries, config, loader, rng)
+
+
+@datacraft.registry.types(_GEO_PAIR_WEIGHTED)
+def _configure_weighted_pair_supplier(field_spec: dict, loader: datacraft.Loader):
+    """ configure the supplier for weighted geo pair type """
+    config = datacraft.utils.load_config(field_spec, loader)
+    if 'weights' not in config:
+        raise datacraft.SpecException(f'weights is required config for {_GEO_PAIR_WEIGHTED} type: '
+                                      f'{json.dumps(field_spec)}')
+    return _configure_clipped_pair_supplier(field_spec, loader)
+
+
+@datacraft.registry.types(_GEO_TRACK)
+def _configure_track_supplier(field_spec: dict, loader: datacraft.Loader):
+    """ configure the supplier for geo track type """
+    from . import suppliers
+    rng = _field_rng(field_spec, loader)
+    config = datacraft.utils.load_config(field_spec, loader)
+    if 'geojson' not in config:
+        raise datacraft.SpecException(f'geojson is required config for {_GEO_TRACK} type: {json.dumps(field_spec)}')
+    geometries = _load_geometries(config, loader)
+    output = config.pop('output', 'pair')
+    if output == 'pair':
+        return suppliers.track_supplier(geometries, rng=rng, **config)
+    # the converters read the points straight from the track supplier, longitude first
+    kwargs = {key: value for key, value in config.items() if key not in ['lat_first', 'join_with']}
+    track_supplier = suppliers.track_supplier(geometries, rng=rng, **kwargs)
+    if output == 'mgrs':
+        return _mgrs_from_pairs(track_supplier, config, False)
+    if output == 'utm':
+        return _utm_from_pairs(track_supplier, config, False)
+    raise datacraft.SpecException(f'Unknown output {output} for {_GEO_TRACK}, must be one of {_TRACK_OUTPUTS}')
+
+
+@datacraft.registry.types(_GEO_REGION_CLIPPED)
+def _configure_clipped_region_supplier(field_spec: dict, loader: datacraft.Loader):
+    """ configure the supplier for clipped geo region type """
+    from . import suppliers
+    config = datacraft.utils.load_config(field_spec, loader)
+    if 'point_group' in config:
+        shared = _get_point_group_supplier(field_spec, loader)
+    else:
+        shared = suppliers.shared_pairs(_configure_clipped_pair_supplier(field_spec, loader))
+    return suppliers.region_supplier(shared, **config)
+
+
+@datacraft.registry.types(_GEO_LAT_CLIPPED)
+def _configure_clipped_lat_supplier(field_spec: dict, loader: datacraft.Loader):
+    """ configure the usage for clipped geo lat type """
+    from . import suppliers
+    config = datacraft.utils.load_config(field_spec, loader)
+    if 'point_group' in config:
+        pair_supplier = _get_point_group_supplier(field_spec, loader)
+        return suppliers.lat_supplier(pair_supplier, lat_first=False)
+    pair_supplier = _configure_clipped_pair_supplier(field_spec, loader)
+    return suppliers.lat_supplier(pair_supplier, **config)
+
+
+@datacraft.registry.types(_GEO_LONG_CLIPPED)
+def _configure_clipped_long_supplier(field_spec: dict, loader: datacraft.Loader):
+    """ configure the usage for clipped geo long type """
+    from . import suppliers
+    config = datacraft.utils.load_config(field_spec, loader)
+    if 'point_group' in config:
+        pair_supplier = _get_point_group_supplier(field_spec, loader)
+        return suppliers.long_supplier(pair_supplier, lat_first=False)
+    pair_supplier = _configure_clipped_pair_supplier(field_spec, loader)
+    return suppliers.long_supplier(pair_supplier, **config)
+###########################
+# Usage Definitions
+###########################
+
+
+@datacraft.registry.usage(_MGRS_KEY)
+def _configure_mgrs_usage():
+    """ configure the usage for mgrs types """
+    example = {
+        "bound_mgrs": {
+            "type": "geo.mgrs",
+            "config": {
+                "start_lat": 49.5,
+                "end_lat": 50.5,
+                "start_long": 49.5,
+                "end_long": 40.5
+            }
+        }
+    }
+    return common.standard_example_usage(example, 3)
+
+
+@datacraft.registry.usage(_MGRS_KEY)
+def _configure_utm_usage():
+    """ configure the usage for utm types """
+    example = {
+        "custom_format": {
+            "type": "geo.utm",
+            "config": {
+                "template": "{{ zone_number }}{{ zone_letter }} {{ easting | int }}/{{ northing | int }}"
+            }
+        }
+    }
+    return common.standard_example_usage(example, 3)
+
+
+@datacraft.registry.usage(_GEOHASH_KEY)
+def _configure_geohash_usage():
+    """ configure the usage for geo.geohash types """
+    example = {
+        "geohash": {
+            "type": _GEOHASH_KEY,
+            "config": {
+                "geojson": "boundary.geojson",
+                "geohash_precision": 6
+            }
+        }
+    }
+    return common.standard_example_usage(example, 3)
+
+
+@datacraft.registry.usage(_CELL_KEY)
+def _configure_cell_usage():
+    """ configure the usage for geo.cell types """
+    example = {
+        "cell": {
+            "type": _CELL_KEY,
+            "config": {
+                "geojson": "boundary.geojson",
+                "cell_type": "hex",
+                "level": 7,
+                "per_cell": True
+            }
+        }
+    }
+    return common.standard_example_usage(example, 3)
+
+
+@datacraft.registry.usage(_GEO_PAIR_CLIPPED)
+def _configure_geo_pair_clipped_usage():
+    """ configure the usage for geo.pair.clip types """
+    return _geo_clipped_example(_GEO_PAIR_CLIPPED)
+
+
+@datacraft.registry.usage(_GEO_PAIR_WEIGHTED)
+def _configure_geo_pair_weighted_usage():
+    """ configure the usage for geo.pair.weighted types """
+    example = {
+        "home": {
+            "type": _GEO_PAIR_WEIGHTED,
+            "config": {
+                "geojson": "boundary.geojson",
+                "weights": "population.asc"
+            }
+        }
+    }
+    return common.standard_example_usage(example, 3)
+
+
+@datacraft.registry.usage(_GEO_TRACK)
+def _configure_geo_track_usage():
+    """ configure the usage for geo.track types """
+    example = {
+        "position": {
+            "type": _GEO_TRACK,
+            "config": {
+                "geojson": "boundary.geojson",
+                "tracks": 100,
+                "mode": "waypoints",
+                "step_meters": 50
+            }
+        }
+    }
+    return common.standard_example_usage(example, 3)
+
+
+@datacraft.registry.usage(_GEO_REGION_CLIPPED)
+def _configure_geo_region_clipped_usage():
+    """ configure the usage for geo.region.clip types """
+    example = {
+        "location": {
+            "type": _GEO_PAIR_CLIPPED,
+            "config": {
+                "geojson": "countries.geojson",
+                "point_group": "home"
+            }
+        },
+        "country": {
+            "type": _GEO_REGION_CLIPPED,
+            "config": {
+                "geojson": "countries.geojson",
+                "point_group": "home",
+                "property": "name"
+            }
+        }
+    }
+    return common.standard_example_usage(example, 3)
+
+
+@datacraft.registry.usage(_GEO_LAT_CLIPPED)
+def _configure_geo_lat_clipped_usage():
+    """ configure the usage for geo.lat.clip types """
+    return _geo_clipped_example(_GEO_LAT_CLIPPED)
+
+
+@datacraft.registry.usage(_GEO_LONG_CLIPPED)
+def _configure_geo_long_clipped_usage():
+    """ configure the usage for geo.long.clip types """
+    return _geo_clipped_example(_GEO_LONG_CLIPPED)
+
+
+def _geo_clipped_example(type_key):
+    example = {
+        "lat_dd": {
+            "type": type_key,
+            "config": {
+                "geojson": {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "Polygon",
+                        "coordinates": [
+                            [[23.0843, 53.1544], [23.0859, 53.1544], [23.0859, 53.1535], [23.0843, 53.1544]]]
+                    }
+                }
+            }
+        }
+    }
+    return common.standard_example_usage(example, 3)
+###################
+# Helper functions
+###################
+
+
+def _resolve_geojson_as_path(geojson: str, datadir: str) -> Union[str, None]:
+    if geojson is None:
+        return None
+    if os.path.exists(geojson):
+        return geojson
+    if datadir is None:
+        datadir = '.'
+    data_dir_path = os.path.join(datadir, geojson)
+    if os.path.exists(data_dir_path):
+        return data_dir_path
+    return None
+
+
+def _load_geometries(config: dict, loader: datacraft.Loader):
+    """
+    load the geometries for the geojson config, simplified, buffered and with the exclude_geojson cut out of them if
+    configured, removes the keys used to load them from the config
+    """
+    from . import boundaries
+    wkb_cache = config.pop('wkb_cache', None)
+    geometries = _load_geojson(config.pop('geojson'), config.pop('where', None), wkb_cache, loader)
+    exclude = config.pop('exclude_geojson', None)
+    if exclude is not None:
+        exclude = _load_geojson(exclude, None, wkb_cache, loader)
+    try:
+        meters = float(config.pop('buffer_meters', 0))
+        tolerance = float(config.pop('simplify_tolerance', 0))
+    except ValueError as err:
+        raise datacraft.SpecException(f'buffer_meters and simplify_tolerance must be numbers: {err}') from err
+    return boundaries.combine(geometries, exclude, meters, tolerance)
+
+
+def _load_geojson(geojson, where: Union[dict, None], wkb_cache, loader: datacraft.Loader):
+    """ geometries for inline GeoJSON or a GeoJSON file """
+    from . import cache
+    if isinstance(geojson, dict):
+        return cache.load_geojson(geojson, where)
+    # if not found check if this is a pointer to a file on disk
+    geojson_path = _resolve_geojson_as_path(geojson, loader.datadir)  # type: ignore
+    if geojson_path is None:
+        raise datacraft.SpecException(
+            f'geojson config must be valid GeoJSON or path to GeoJSON file on disk: ' + str(geojson))
+    return cache.load_geojson_file(geojson_path, where, wkb_cache)
+
+
+def _clipped_points(geometries, config: dict, loader: datacraft.Loader, rng: "np.random.Generator"):
+    """ supplier for points inside the geometries, weighted by a grid if there is one """
+    from . import suppliers
+    if 'weights' in config:
+        weights = config.pop('weights')
+        weights_path = _resolve_geojson_as_path(weights, loader.datadir)  # type: ignore
+        if weights_path is None:
+            raise datacraft.SpecException(f'weights config must be path to weight grid on disk: {weights}')
+        return suppliers.point_in_weighted_grid(geometries, weights_path, rng=rng, **config)
+    return suppliers.point_in_geometries(geometries, rng=rng, **config)
+
+
+def _point_pool_supplier(geometries, config: dict, loader: datacraft.Loader, rng: "np.random.Generator"):
+    """
+    Supplier that serves points from a pool. The points in the pool only depend on the geometries, the seed and the
+    config that changes how points are sampled, so seeded pools are shared by every field and run with the same ones,
+    and can be kept on disk. The field's own generator picks the points to serve from the pool.
+    """
+    import numpy as np
+    from . import suppliers
+    size = config.pop('pool_size')
+    pool_cache = config.pop('pool_cache', None)
+    serving = {key: config.pop(key) for key in _POOL_SERVING_KEYS if key in config}
+    serving['replacement'] = serving.pop('pool_replacement', True)
+    sampling_config = {key: value for key, value in config.items() if key != 'seed'}
+    if 'weights' in config:
+        weights_path = _resolve_geojson_as_path(config['weights'], loader.datadir)  # type: ignore
+        if weights_path is not None:
+            sampling_config['weights'] = [os.path.realpath(weights_path), os.stat(weights_path).st_mtime_ns]
+    seeds = _seeds(config)
+    content = json.dumps([geometries.digest(), sampling_config, seeds, size,
+                          datacraft.registries.get_default('geo_precision')], sort_keys=True, default=str)
+    pool_key = hashlib.sha256(content.encode('utf-8')).hexdigest()
+    path = None
+    if len(seeds) > 0:
+        pool_rng = np.random.default_rng(np.random.SeedSequence(
+            [seed % (1 << 64) for seed in seeds] + [int(pool_key[:16], 16)]))
+        if pool_cache:
+            directory = pool_cache if isinstance(pool_cache, str) else datacraft.registries.get_default(_GEO_POOL_DIR)
+            path = os.path.join(directory, f'pool-{pool_key[:32]}.npy')
+    else:
+        # without a seed the pool is different every run, so there is nothing to keep
+        if pool_cache:
+            _log.warning('pool_cache needs a seed or the geo_seed default to be set, the pool will not be kept')
+        pool_rng = rng
+
+    def build():
+        return _clipped_points(geometries, dict(config), loader, pool_rng)
+
+    return suppliers.point_pool(build, size, path, rng=rng, **serving)
+
+
+def _mgrs_from_pairs(pair_supplier, config: dict, lat_first: bool):
+    """ mgrs supplier for the points from the pair supplier """
+    from . import mgrs_batch, suppliers
+    try:
+        precision = mgrs_batch.parse_precision(config.get('mgrs_precision', 5))
+    except ValueError as err:
+        raise datacraft.SpecException(str(err)) from err
+    kwargs = {'precision': precision}
+    if 'batch_size' in config:
+        kwargs['batch_size'] = config['batch_size']
+    return suppliers.mgrs_supplier(pair_supplier, lat_first, **kwargs)
+
+
+def _utm_from_pairs(pair_supplier, config: dict, lat_first: bool):
+    """ utm supplier for the points from the pair supplier, formatted with the template config """
+    from . import suppliers, utm_batch
+    template = config.get('template', datacraft.registries.get_default(_GEO_UTM_TEMPLATE))
+    engine = datacraft.outputs.processor(template=template)
+    kwargs = {}
+    if not os.path.exists(template):
+        kwargs['template'] = template
+    if 'batch_size' in config:
+        kwargs['batch_size'] = config['batch_size']
+    force_zone_number = config.get('force_zone_number')
+    force_zone_letter = config.get('force_zone_letter')
+    try:
+        utm_batch.check_forced_zone(force_zone_number, force_zone_letter)
+    except ValueError as err:
+        raise datacraft.SpecException(f'Invalid forced zone for {_UTM_KEY}: {err}') from err
+    kwargs['force_zone_number'] = force_zone_number
+    kwargs['force_zone_letter'] = force_zone_letter
+    return suppliers.utm_supplier(pair_supplier, engine, lat_first, **kwargs)  # type: ignore
+
+
+def _cells_from_spec(field_spec: dict, loader: datacraft.Loader, cell_type: str, level: int):
+    """
+    cell supplier for the points from the geojson or bounds config. With per_cell the boundary is cut in to the cells
+    and each cell it touches is equally likely, instead of each part of the area.
+    """
+    from . import cells, suppliers
+    rng = _field_rng(field_spec, loader)
+    config = datacraft.utils.load_config(field_spec, loader)
+    try:
+        grid = cells.grid_for(cell_type, int(level))
+    except ValueError as err:
+        raise datacraft.SpecException(str(err)) from err
+    lat_first = datacraft.utils.is_affirmative(
+        'lat_first', config, datacraft.registries.get_default('geo_lat_first'))
+    kwargs = {key: config[key] for key in ['cell_format', 'batch_size'] if key in config}
+    if not datacraft.utils.is_affirmative('per_cell', config, False):
+        if 'geojson' in config:
+            pair_supplier = _configure_clipped_pair_supplier(field_spec, loader, rng)
+        else:
+            pair_supplier = _get_pair_supplier(field_spec, loader, rng)
+        return suppliers.cell_supplier(pair_supplier, grid, lat_first, **kwargs)
+    if 'geojson' not in config or 'weights' in config:
+        raise datacraft.SpecException(f'per_cell needs geojson config, and can not be used with weights: '
+                                      f'{json.dumps(field_spec)}')
+    geometries = _load_geometries(config, loader)
+    try:
+        geometries = cells.cell_geometries(geometries, grid)
+    except ValueError as err:
+        raise datacraft.SpecException(str(err)) from err
+    config['weight_by'] = 'uniform'
+    if 'pool_size' in config:
+        pair_supplier = _point_pool_supplier(geometries, config, loader, rng)
+    else:
+        pair_supplier = _clipped_points(geometries, config, loader, rng)
+    return suppliers.cell_supplier(pair_supplier, grid, lat_first, **kwargs)
+
+
+def _get_point_group_supplier(field_spec: dict, loader: datacraft.Loader):
+    """
+    Fields in the same point group share one clipped pair supplier, so they read the lat and long of the same point
+    for each iteration. The first field to reference the group configures the supplier. The shared pair is always
+    longitude first, the lat and long suppliers index into it accordingly.
+    """
+    from . import suppliers
+    config = datacraft.utils.load_config(field_spec, loader)
+    groups = _point_groups.setdefault(loader, {})
+    name = config['point_group']
+    if name not in groups:
+        tweaked_spec = field_spec.copy()
+        tweaked_spec['config'] = {key: value for key, value in config.items() if key != 'join_with'}
+        tweaked_spec['config']['lat_first'] = False
+        pair_supplier = _configure_clipped_pair_supplier(tweaked_spec, loader)
+        groups[name] = suppliers.shared_pairs(pair_supplier)
+    return groups[name]
+
+
+def _configure_zoned_pair_supplier(config: dict, rng: "np.random.Generator"):
+    """ pair supplier for points inside of MGRS grid squares or UTM zones, None if neither are configured """
+    from . import suppliers
+    if 'mgrs_squares' in config:
+        squares = config['mgrs_squares']
+        return suppliers.point_in_mgrs_squares(squares if isinstance(squares, list) else [squares], rng=rng, **config)
+    if 'zones' in config:
+        zones = config['zones']
+        return suppliers.point_in_zones(zones if isinstance(zones, list) else [zones], rng=rng, **config)
+    return None
+
+
+def _get_pair_supplier(field_spec, loader, rng: "np.random.Generator"):
+    config = datacraft.utils.load_config(field_spec, loader)
+    return _bbox_pair_supplier(config, rng)
+
+
+def _bbox_pair_supplier(config: dict, rng: "np.random.Generator"):
+    """ pair supplier for points in the bounds given by the same config as the datacraft geo.pair type """
+    from . import suppliers
+    bounds = {key: value for key, value in config.items() if key in _BBOX_KEYS}
+    return suppliers.point_in_box(rng=rng, lat_first=config.get('lat_first', False), **bounds)
+
+
+def _seeds(config: dict) -> list:
+    """ the seed from the config and the geo_seed default, whichever are set """
+    seeds = [config.get('seed'), datacraft.registries.get_default(_GEO_SEED)]
+    seeds = [seed for seed in seeds if seed is not None]
+    try:
+        return [int(seed) for seed in seeds]
+    except (TypeError, ValueError) as err:
+        raise datacraft.SpecException(f'seed must be an integer: {seeds}') from err
+
+
+def _field_rng(field_spec: dict, loader: datacraft.Loader) -> "np.random.Generator":
+    """
+    The random generator for a field. When the field has a seed in its config, or the geo_seed default is set, the
+    generator is seeded from those along with a hash of the field spec, so the values for the field don't change when
+    other fields are added to or removed from the spec. Otherwise it is seeded from the random module.
+    """
+    import numpy as np
+    config = datacraft.utils.load_config(field_spec, loader)
+    entropy = _seeds(config)
+    if len(entropy) == 0:
+        from . import suppliers
+        return suppliers.default_rng()
+    content = json.dumps(field_spec, sort_keys=True, default=str).encode('utf-8')
+    spec_hash = int.from_bytes(hashlib.sha256(content).digest()[:8], 'little')
+    # identical field specs in the same spec get their own streams
+    counts = _field_counts.setdefault(loader, collections.Counter())
+    counts[spec_hash] += 1
+    words = [seed % (1 << 64) for seed in entropy] + [spec_hash, counts[spec_hash]]
+    return np.random.default_rng(np.random.SeedSequence(words))
@@ -0,0 +1,163 @@
+"""
+Boundaries made from the GeoJSON features once at configure time, simplified, buffered by a distance in meters and with
+exclusion zones cut out of them, so sampling inside of them costs the same as sampling inside of the original polygons.
+Simplifying detailed polygons, i.e. full resolution coastlines, makes every containment test cheaper.
+
+Buffers are done in a local azimuthal equidistant projection centered on each feature, on a sphere with the mean radius
+of the earth, so the distances are in meters wherever the feature is. Long edges are split before they are projected so
+they follow the parallels and meridians they were drawn along. The edges of the buffer are simplified to within a
+hundredth of the buffer distance, which keeps the round corners from adding a vertex count that the rest of the
+sampling pays for.
+"""
+import hashlib
+import json
+import logging
+from typing import Union
+
+import numpy as np
+import shapely  # type: ignore
+
+from . import cache
+
+_log = logging.getLogger(__name__)
+# mean radius of the earth in meters
+_RADIUS = 6371008.8
+# simplify buffered edges to within this fraction of the buffer distance
+_SIMPLIFY_FRACTION = 0.01
+# longest edge in degrees to project as is, longer edges are split so they follow the projection
+_MAX_EDGE_DEGREES = 0.1
+
+
+def project(geometry, center: tuple):
+    """
+    Project a geometry from longitude, latitude to meters in an azimuthal equidistant projection
+
+    Args:
+        geometry: in degrees of longitude and latitude
+        center: longitude, latitude of the center of the projection
+
+    Returns:
+        the geometry in meters from the center
+    """
+    long0, lat0 = np.radians(center)
+
+    def forward(coords: np.ndarray) -> np.ndarray:
+        long, lat = np.radians(coords[:, 0]), np.radians(coords[:, 1])
+        cos_c = np.sin(lat0) * np.sin(lat) + np.cos(lat0) * np.cos(lat) * np.cos(long - long0)
+        c = np.arccos(np.clip(cos_c, -1.0, 1.0))
+        # c / sin(c) goes to 1 at the center
+        scale = np.where(c > 1e-12, c / np.sin(np.maximum(c, 1e-12)), 1.0) * _RADIUS
+        x = scale * np.cos(lat) * np.sin(long - long0)
+        y = scale * (np.cos(lat0) * np.sin(lat) - np.sin(lat0) * np.cos(lat) * np.cos(long - long0))
+        return np.column_stack([x, y])
+
+    return shapely.transform(geometry, forward)
+
+
+def unproject(geometry, center: tuple):
+    """
+    Inverse of project
+
+    Args:
+        geometry: in meters from the center
+        center: longitude, latitude of the center of the projection
+
+    Returns:
+        the geometry in degrees of longitude and latitude
+    """
+    long0, lat0 = np.radians(center)
+
+    def inverse(coords: np.ndarray) -> np.ndarray:
+        x, y = coords[:, 0], coords[:, 1]
+        rho = np.hypot(x, y)
+        c = rho / _RADIUS
+        safe_rho = np.where(rho > 0, rho, 1.0)
+        lat = np.arcsin(np.clip(np.cos(c) * np.sin(lat0) + y * np.sin(c) * np.cos(lat0) / safe_rho, -1.0, 1.0))
+        long = long0 + np.arctan2(x * np.sin(c), rho * np.cos(lat0) * np.cos(c) - y * np.sin(lat0) * np.sin(c))
+        long = (long + np.pi) % (2 * np.pi) - np.pi
+        return np.column_stack([np.degrees(long), np.degrees(lat)])
+
+    return shapely.transform(geometry, inverse)
+
+
+def buffer_meters(geometry, meters: float):
+    """
+    Grow the geometry by a distance, or shrink it for a negative one
+
+    Args:
+        geometry: in degrees of longitude and latitude
+        meters: distance to buffer by
+
+    Returns:
+        the buffered geometry in degrees of longitude and latitude
+    """
+    if geometry.is_empty or meters == 0:
+        return geometry
+    min_x, min_y, max_x, max_y = geometry.bounds
+    center = ((min_x + max_x) / 2, (min_y + max_y) / 2)
+    projected = project(shapely.segmentize(geometry, _MAX_EDGE_DEGREES), center)
+    buffered = shapely.buffer(projected, meters)
+    buffered = shapely.simplify(buffered, abs(meters) * _SIMPLIFY_FRACTION, preserve_topology=True)
+    return shapely.make_valid(unproject(buffered, center))
+
+
+def simplify_meters(geometry, tolerance: float):
+    """
+    Simplify the geometry, keeping its topology valid
+
+    Args:
+        geometry: in degrees of longitude and latitude
+        tolerance: most meters any edge can move by
+
+    Returns:
+        the simplified geometry in degrees of longitude and latitude
+    """
+    if geometry.is_empty or tolerance <= 0:
+        return geometry
+    min_x, min_y, max_x, max_y = geometry.bounds
+    center = ((min_x + max_x) / 2, (min_y + max_y) / 2)
+    simplified = shapely.simplify(project(geometry, center), tolerance, preserve_topology=True)
+    return shapely.make_valid(unproject(simplified, center))
+
+
+def combine(geometries: cache.Geometries,
+            exclude: Union[cache.Geometries, None] = None,
+            meters: float = 0.0,
+            tolerance: float = 0.0) -> cache.Geometries:
+    """
+    Simplify and buffer each feature and cut the exclusion zones out of it. The features keep their place and
+    properties, a feature that ends up empty is kept with no polygons in it, so the feature indexes still match the
+    GeoJSON. The result is kept in the geometry cache, so every field with the same boundaries shares it.
+
+    Args:
+        geometries: the features to sample inside of
+        exclude: features to leave out of them
+        meters: distance to buffer each feature by, negative to shrink it
+        tolerance: meters the edges of each feature can move by when it is simplified, 0 to leave them as they are
+
+    Returns:
+        the combined geometries
+    """
+    if exclude is None and meters == 0 and tolerance <= 0:
+        return geometries
+    content = json.dumps([geometries.digest(), exclude.digest() if exclude is not None else None, meters, tolerance])
+    key = ('combined', hashlib.sha256(content.encode('utf-8')).hexdigest())
+
+    def build():
+        excluded = shapely.union_all([geometry for geometry, _ in exclude.features]) if exclude is not None else None
+        if excluded is not None:
+            shapely.prepare(excluded)
+        features = []
+        for geometry, properties in geometries.features:
+            geometry = buffer_meters(simplify_meters(geometry, tolerance), meters)
+            if excluded is not None and shapely.intersects(geometry, excluded):
+                geometry = shapely.difference(geometry, excluded)
+            features.append((geometry, properties))
+        combined = cache.Geometries(features)
+        if tolerance > 0:
+            combined.simplified_from = geometries.vertex_count()
+            _log.info('Simplified %s features within %s m from %s to %s vertices', len(features), tolerance,
+                      combined.simplified_from, combined.vertex_count())
+        return combined
+
+    return cache.geometry_cache().get(key, build)
@@ -0,0 +1,259 @@
+"""
+Process wide cache of parsed and prepared GeoJSON geometries, shared by all the fields that reference the same GeoJSON
+"""
+import collections
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Hashable, Union
+
+import shapely  # type: ignore
+from shapely.geometry import shape  # type: ignore
+
+import datacraft
+
+from . import ingest
+
+_log = logging.getLogger(__name__)
+
+
+class Geometries:
+    """
+    The parsed features of one GeoJSON source, with the polygon parts prepared for fast containment tests and a
+    place to keep any sampling indexes built for them. Invalid geometries, i.e. self-intersecting polygons, are
+    repaired with make_valid, the features that needed it are listed in invalid along with the reason.
+    """
+
+    def __init__(self, features: list):
+        """
+        Args:
+            features: list of (shape, properties) for each feature
+        """
+        self.features = []
+        self.invalid = []
+        for feature_index, (geometry, properties) in enumerate(features):
+            if not shapely.is_valid(geometry):
+                self.invalid.append((feature_index, shapely.is_valid_reason(geometry)))
+                geometry = shapely.make_valid(geometry)
+            self.features.append((geometry, properties))
+        self.parts = []
+        self.part_features = []
+        for feature_index, (geometry, _) in enumerate(self.features):
+            for part in _flatten(geometry):
+                if part.area > 0:
+                    shapely.prepare(part)
+                    self.parts.append(part)
+                    self.part_features.append(feature_index)
+        self.bounds = shapely.total_bounds(self.parts) if self.parts else None
+        self._indexes: dict = {}
+        self._lock = threading.Lock()
+        self._digest: Union[str, None] = None
+        # number of vertices before simplifying, for geometries that were simplified
+        self.simplified_from: Union[int, None] = None
+
+    def __getstate__(self):
+        """ pickled as WKB along with the properties and any indexes already built, i.e. to send to worker processes """
+        return {
+            'wkb': shapely.to_wkb([geometry for geometry, _ in self.features]),
+            'properties': [properties for _, properties in self.features],
+            'invalid': self.invalid,
+            'indexes': self._indexes,
+            'simplified_from': self.simplified_from
+        }
+
+    def __setstate__(self, state):
+        self.__init__(list(zip(shapely.from_wkb(state['wkb']), state['properties'])))
+        self.invalid = state['invalid']
+        self._indexes = state['indexes']
+        self.simplified_from = state.get('simplified_from')
+
+    def digest(self) -> str:
+        """
+        Returns:
+            hash of the geometries and properties of the features, the same for the same GeoJSON in any process
+        """
+        if self._digest is None:
+            content = hashlib.sha256()
+            for geometry, properties in self.features:
+                content.update(shapely.to_wkb(geometry))
+                content.update(json.dumps(properties, sort_keys=True, default=str).encode('utf-8'))
+            self._digest = content.hexdigest()
+        return self._digest
+
+    def vertex_count(self) -> int:
+        """
+        Returns:
+            the number of vertices in the polygon parts
+        """
+        return int(shapely.get_num_coordinates(self.parts).sum()) if self.parts else 0
+
+    def index(self, key: Hashable, factory: Callable[[], Any]):
+        """
+        Get the index stored under the key, building it with the factory the first time it is requested
+
+        Args:
+            key: identifies the index, i.e. the sampler type and its parameters
+            factory: builds the index if it is not there yet
+
+        Returns:
+            the index
+        """
+        with self._lock:
+            if key not in self._indexes:
+                self._indexes[key] = factory()
+            return self._indexes[key]
+
+
+class GeometryCache:
+    """
+    Least recently used cache of Geometries keyed by the source they were loaded from
+    """
+
+    def __init__(self, max_size: int):
+        """
+        Args:
+            max_size: maximum number of GeoJSON sources to keep
+        """
+        self.max_size = max_size
+        self.entries: collections.OrderedDict = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, loader: Callable[[], Geometries]) -> Geometries:
+        """
+        Get the geometries for the key, loading them on a miss
+
+        Args:
+            key: identifies the GeoJSON source
+            loader: loads the geometries if they are not cached
+
+        Returns:
+            the cached geometries
+        """
+        with self._lock:
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return self.entries[key]
+            self.misses += 1
+        geometries = loader()
+        with self._lock:
+            self.entries[key] = geometries
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return geometries
+
+    def stats(self) -> dict:
+        """ hit, miss and eviction counts along with the current size of the cache """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self.entries),
+                "max_size": self.max_size
+            }
+
+    def clear(self):
+        """ remove all entries and reset the counts """
+        with self._lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+
+_cache = None
+
+
+def geometry_cache() -> GeometryCache:
+    """ the process wide geometry cache, sized by the geo_cache_size default when first used """
+    global _cache
+    if _cache is None:
+        _cache = GeometryCache(int(datacraft.registries.get_default('geo_cache_size')))
+    return _cache
+
+
+def cache_stats() -> dict:
+    """
+    Get the statistics for the geometry cache
+
+    Returns:
+        dictionary with hits, misses, evictions, size and max_size
+    """
+    return geometry_cache().stats()
+
+
+def load_geojson(geojson: dict, where: Union[dict, None] = None) -> Geometries:
+    """
+    Get the geometries for inline GeoJSON, keyed by a hash of the content
+
+    Args:
+        geojson: Feature or FeatureCollection
+        where: only keep features whose properties match
+
+    Returns:
+        the geometries for the GeoJSON
+    """
+    content = json.dumps([geojson, where], sort_keys=True, separators=(',', ':')).encode('utf-8')
+    key = ('inline', hashlib.sha256(content).hexdigest())
+    return geometry_cache().get(key, lambda: Geometries(features_from_geojson(geojson, where)))
+
+
+def load_geojson_file(path: str,
+                      where: Union[dict, None] = None,
+                      wkb_cache: Union[bool, str, None] = None) -> Geometries:
+    """
+    Get the geometries for a GeoJSON file, keyed by the resolved path and modification time. The file is streamed so
+    only the features that match the filter are materialized.
+
+    Args:
+        path: to the GeoJSON or newline delimited GeoJSON file
+        where: only keep features whose properties match
+        wkb_cache: True or a directory to keep a binary cache of the matching features for later runs
+
+    Returns:
+        the geometries for the GeoJSON file
+    """
+    real_path = os.path.realpath(path)
+    stat = os.stat(real_path)
+    key = ('file', real_path, stat.st_mtime_ns, stat.st_size, json.dumps(where, sort_keys=True))
+    _log.debug('loading geojson from %s', real_path)
+    return geometry_cache().get(key, lambda: Geometries(ingest.load_features(real_path, where, wkb_cache)))
+
+
+def features_from_geojson(geojson: dict, where: Union[dict, None] = None) -> list:
+    """
+    Parse the features in the GeoJSON
+
+    Args:
+        geojson: Feature or FeatureCollection
+        where: only keep features whose properties match
+
+    Returns:
+        list of (shape, properties) for each of the matching features in the geojson
+    """
+    feature_type = geojson.get('type')
+    if feature_type == 'FeatureCollection':
+        features = geojson['features']
+    elif feature_type == 'Feature':
+        features = [geojson]
+    else:
+        raise datacraft.SpecException('Invalid GeoJSON, must contain Feature or FeatureCollection')
+    return [(shape(feature['geometry']), feature.get('properties') or {})
+            for feature in features if ingest.matches(feature, where)]
+
+
+def _flatten(geometry) -> list:
+    """ break multi part geometries and geometry collections down into single parts """
+    if geometry.geom_type in ('MultiPolygon', 'GeometryCollection'):
+        return [part for child in geometry.geoms for part in _flatten(child)]
+    if geometry.geom_type == 'Polygon':
+        return [geometry]
+    return []
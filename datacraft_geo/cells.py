@@ -0,0 +1,325 @@
+"""
+Vectorized encoding of longitude and latitude to the ids of cells in hierarchical grids: geohashes, S2 cells and
+hexagons. The encoders work on NumPy arrays, with no native code.
+
+Cell ids are unsigned 64 bit integers, tokens are the fixed width ASCII strings for the ids:
+
+* geohash, the bits of the geohash with the longitude bits first, the token is the usual base 32 geohash
+* s2, the S2 cell id, the same as the S2 geometry library gives for the cell at the level, the token is the id in
+  hex with the trailing zeros removed
+* hex, hexagons on the plane of longitude and latitude with a seventh of the area at each level, in the style of, but
+  not compatible with, H3. The id packs the level and the axial coordinates of the hexagon, the token is the id as 15
+  hex digits.
+"""
+import math
+
+import numpy as np
+import shapely  # type: ignore
+
+from . import cache
+
+GEOHASH = 'geohash'
+S2 = 's2'
+HEX = 'hex'
+CELL_TYPES = [S2, HEX, GEOHASH]
+_BASE32 = np.frombuffer(b'0123456789bcdefghjkmnpqrstuvwxyz', dtype=np.uint8)
+_HEX_DIGITS = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+# most cells to cut a boundary in to for sampling per cell
+_MAX_CELLS = 100000
+
+
+class CellGrid:
+    """ a hierarchical grid of cells at one level """
+
+    def __init__(self, name: str, level: int, max_level: int):
+        if not 0 <= level <= max_level:
+            raise ValueError(f'{name} level must be from 0 to {max_level}: {level}')
+        self.name = name
+        self.level = level
+        self.key = (name, level)
+
+    def ids(self, longs: np.ndarray, lats: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            longs: longitudes in degrees
+            lats: latitudes in degrees
+
+        Returns:
+            the uint64 id of the cell each point is in
+        """
+        raise NotImplementedError()
+
+    def tokens(self, ids: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            ids: from ids
+
+        Returns:
+            the tokens for the ids as fixed width ASCII byte strings
+        """
+        raise NotImplementedError()
+
+    def cover(self, bounds: tuple):
+        """
+        Get the cells that cover the bounds
+
+        Args:
+            bounds: min long, min lat, max long, max lat
+
+        Returns:
+            tuple of the ids and polygons of the cells
+        """
+        raise ValueError(f'Sampling per cell is not supported for {self.name} cells')
+
+
+class GeohashGrid(CellGrid):
+    """ geohashes with a number of characters """
+
+    def __init__(self, precision: int):
+        super().__init__(GEOHASH, precision, 12)
+        bits = 5 * precision
+        self.long_bits = (bits + 1) // 2
+        self.lat_bits = bits // 2
+        self.width = 360.0 / (1 << self.long_bits)
+        self.height = 180.0 / (1 << self.lat_bits)
+
+    def ids(self, longs: np.ndarray, lats: np.ndarray) -> np.ndarray:
+        cols = _quantize(np.asarray(longs, dtype=np.float64) + 180.0, self.width, self.long_bits)
+        rows = _quantize(np.asarray(lats, dtype=np.float64) + 90.0, self.height, self.lat_bits)
+        return self._interleave(cols, rows)
+
+    def _interleave(self, cols: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """ the bits of the column and row, starting with the most significant bit of the column """
+        bits = self.long_bits + self.lat_bits
+        ids = np.zeros(len(cols), dtype=np.uint64)
+        for k in range(self.long_bits):
+            ids |= ((cols >> np.uint64(self.long_bits - 1 - k)) & np.uint64(1)) << np.uint64(bits - 1 - 2 * k)
+        for k in range(self.lat_bits):
+            ids |= ((rows >> np.uint64(self.lat_bits - 1 - k)) & np.uint64(1)) << np.uint64(bits - 2 - 2 * k)
+        return ids
+
+    def tokens(self, ids: np.ndarray) -> np.ndarray:
+        return _digits(ids, _BASE32, 5, self.level)
+
+    def cover(self, bounds: tuple):
+        min_x, min_y, max_x, max_y = bounds
+        col_start, col_end = _quantize(np.array([min_x + 180.0, max_x + 180.0]), self.width, self.long_bits)
+        row_start, row_end = _quantize(np.array([min_y + 90.0, max_y + 90.0]), self.height, self.lat_bits)
+        _check_count((int(col_end) - int(col_start) + 1) * (int(row_end) - int(row_start) + 1))
+        cols, rows = np.meshgrid(np.arange(col_start, col_end + 1, dtype=np.uint64),
+                                 np.arange(row_start, row_end + 1, dtype=np.uint64))
+        cols, rows = cols.ravel(), rows.ravel()
+        west = cols.astype(np.float64) * self.width - 180.0
+        south = rows.astype(np.float64) * self.height - 90.0
+        return self._interleave(cols, rows), shapely.box(west, south, west + self.width, south + self.height)
+
+
+class S2Grid(CellGrid):
+    """ S2 cells at a level from 0 (the six faces of the cube) to 30 """
+
+    def __init__(self, level: int):
+        super().__init__(S2, level, 30)
+        self.lsb = np.uint64(1 << (2 * (30 - level)))
+        # the low bits of every id at the level are zero, so the tokens all have the same width
+        self.width = 16 - (30 - level) // 2
+
+    def ids(self, longs: np.ndarray, lats: np.ndarray) -> np.ndarray:
+        long, lat = np.radians(np.asarray(longs, dtype=np.float64)), np.radians(np.asarray(lats, dtype=np.float64))
+        x, y, z = np.cos(lat) * np.cos(long), np.cos(lat) * np.sin(long), np.sin(lat)
+        face, u, v = _face_uv(x, y, z)
+        i, j = _st_to_ij(_uv_to_st(u)), _st_to_ij(_uv_to_st(v))
+        leaf = _face_ij_to_id(face, i, j)
+        return (leaf & ~(self.lsb - np.uint64(1))) | self.lsb
+
+    def tokens(self, ids: np.ndarray) -> np.ndarray:
+        return _digits(ids >> np.uint64(4 * (16 - self.width)), _HEX_DIGITS, 4, self.width)
+
+
+class HexGrid(CellGrid):
+    """ pointy top hexagons on the plane of longitude and latitude, at a level from 0 to 15 """
+
+    def __init__(self, level: int):
+        super().__init__(HEX, level, 15)
+        # distance from the center to a corner in degrees, about 10 degrees at level 0
+        self.size = 10.0 / math.sqrt(7) ** level
+
+    def ids(self, longs: np.ndarray, lats: np.ndarray) -> np.ndarray:
+        x = np.asarray(longs, dtype=np.float64) / self.size
+        y = np.asarray(lats, dtype=np.float64) / self.size
+        q, r = _hex_round(math.sqrt(3) / 3 * x - y / 3, 2 * y / 3)
+        return self._pack(q, r)
+
+    def _pack(self, q: np.ndarray, r: np.ndarray) -> np.ndarray:
+        offset = 1 << 27
+        return ((np.uint64(self.level) << np.uint64(56))
+                | ((q + offset).astype(np.uint64) << np.uint64(28))
+                | (r + offset).astype(np.uint64))
+
+    def tokens(self, ids: np.ndarray) -> np.ndarray:
+        return _digits(ids, _HEX_DIGITS, 4, 15)
+
+    def cover(self, bounds: tuple):
+        min_x, min_y, max_x, max_y = bounds
+        step_x = math.sqrt(3) * self.size
+        r_start = math.floor(min_y / (1.5 * self.size)) - 1
+        r_end = math.ceil(max_y / (1.5 * self.size)) + 1
+        q_start = math.floor(min_x / step_x - r_end / 2) - 1
+        q_end = math.ceil(max_x / step_x - r_start / 2) + 1
+        _check_count((q_end - q_start + 1) * (r_end - r_start + 1))
+        q, r = np.meshgrid(np.arange(q_start, q_end + 1), np.arange(r_start, r_end + 1))
+        q, r = q.ravel(), r.ravel()
+        center_x = step_x * (q + r / 2)
+        center_y = 1.5 * self.size * r
+        near = ((center_x >= min_x - step_x) & (center_x <= max_x + step_x)
+                & (center_y >= min_y - 2 * self.size) & (center_y <= max_y + 2 * self.size))
+        q, r, center_x, center_y = q[near], r[near], center_x[near], center_y[near]
+        angles = np.radians(60.0 * np.arange(7) - 30.0)
+        corners = np.stack([center_x[:, None] + self.size * np.cos(angles),
+                            center_y[:, None] + self.size * np.sin(angles)], axis=-1)
+        return self._pack(q, r), shapely.polygons(corners)
+
+
+def grid_for(cell_type: str, level: int) -> CellGrid:
+    """
+    Args:
+        cell_type: geohash, s2 or hex
+        level: of the cells, the number of characters for geohashes
+
+    Returns:
+        the grid for the type and level
+    """
+    if cell_type == GEOHASH:
+        return GeohashGrid(level)
+    if cell_type == S2:
+        return S2Grid(level)
+    if cell_type == HEX:
+        return HexGrid(level)
+    raise ValueError(f'Unknown cell type {cell_type}, must be one of {CELL_TYPES}')
+
+
+def cell_geometries(geometries: cache.Geometries, grid: CellGrid) -> cache.Geometries:
+    """
+    Cut the geometries in to the cells of the grid, one feature for each cell with the part of the geometries inside of
+    it, and a cell property with the token of the cell. Kept in the geometry cache.
+
+    Args:
+        geometries: to cut up
+        grid: with the cells
+
+    Returns:
+        the pieces of the geometries in each cell
+    """
+    key = ('cells', geometries.digest(), grid.key)
+
+    def build():
+        if geometries.bounds is None:
+            return cache.Geometries([])
+        region = shapely.union_all(geometries.parts)
+        shapely.prepare(region)
+        ids, polygons = grid.cover(tuple(geometries.bounds))
+        hit = shapely.intersects(region, polygons)
+        pieces = shapely.intersection(polygons[hit], region)
+        tokens = grid.tokens(ids[hit]).astype(str)
+        return cache.Geometries([(piece, {'cell': token}) for piece, token in zip(pieces, tokens)])
+
+    return cache.geometry_cache().get(key, build)
+
+
+def _quantize(values: np.ndarray, size: float, bits: int) -> np.ndarray:
+    """ index of the cell of the given size each value is in, clamped to the bits """
+    cells = np.floor(values / size)
+    return np.clip(cells, 0, (1 << bits) - 1).astype(np.uint64)
+
+
+def _digits(ids: np.ndarray, alphabet: np.ndarray, bits: int, width: int) -> np.ndarray:
+    """ the low width groups of bits of each id as characters from the alphabet, most significant first """
+    ids = np.asarray(ids, dtype=np.uint64)
+    chars = np.empty((len(ids), width), dtype=np.uint8)
+    mask = np.uint64((1 << bits) - 1)
+    for k in range(width):
+        chars[:, k] = alphabet[((ids >> np.uint64(bits * (width - 1 - k))) & mask).astype(np.intp)]
+    return chars.view(f'S{width}').ravel() if width > 0 else np.zeros(len(ids), dtype='S1')
+
+
+def _check_count(count: int):
+    if count > _MAX_CELLS:
+        raise ValueError(f'The boundary covers about {count} cells, more than the {_MAX_CELLS} that can be sampled '
+                         f'per cell, use a lower level')
+
+
+def _hex_round(q: np.ndarray, r: np.ndarray):
+    """ the axial coordinates of the hexagons the fractional coordinates are in """
+    s = -q - r
+    round_q, round_r, round_s = np.round(q), np.round(r), np.round(s)
+    diff_q, diff_r, diff_s = np.abs(round_q - q), np.abs(round_r - r), np.abs(round_s - s)
+    fix_q = (diff_q > diff_r) & (diff_q > diff_s)
+    fix_r = ~fix_q & (diff_r > diff_s)
+    round_q = np.where(fix_q, -round_r - round_s, round_q)
+    round_r = np.where(fix_r, -round_q - round_s, round_r)
+    return round_q.astype(np.int64), round_r.astype(np.int64)
+
+
+# S2 cell ids, after s2geometry s2coords.h and s2cell_id.cc
+_LIMIT_IJ = 1 << 30
+_SWAP_MASK = 1
+_INVERT_MASK = 2
+_POS_TO_IJ = [[0, 1, 3, 2], [0, 2, 3, 1], [3, 2, 0, 1], [3, 1, 0, 2]]
+_POS_TO_ORIENTATION = [_SWAP_MASK, 0, 0, _INVERT_MASK | _SWAP_MASK]
+
+
+def _lookup_pos() -> np.ndarray:
+    """ the Hilbert curve position and orientation of each 4 x 4 block of i, j with each starting orientation """
+    lookup = np.zeros(1 << 10, dtype=np.uint64)
+
+    def init(level, i, j, orig_orientation, pos, orientation):
+        if level == 4:
+            ij = (i << 4) + j
+            lookup[(ij << 2) + orig_orientation] = (pos << 2) + orientation
+            return
+        r = _POS_TO_IJ[orientation]
+        for index in range(4):
+            init(level + 1, (i << 1) + (r[index] >> 1), (j << 1) + (r[index] & 1), orig_orientation,
+                 (pos << 2) + index, orientation ^ _POS_TO_ORIENTATION[index])
+
+    for orientation in range(4):
+        init(0, 0, 0, orientation, 0, orientation)
+    return lookup
+
+
+_LOOKUP_POS = _lookup_pos()
+
+
+def _face_uv(x: np.ndarray, y: np.ndarray, z: np.ndarray):
+    """ the cube face of each point and its u, v coordinates on the face """
+    abs_x, abs_y, abs_z = np.abs(x), np.abs(y), np.abs(z)
+    axis = np.where(abs_x > abs_y, np.where(abs_x > abs_z, 0, 2), np.where(abs_y > abs_z, 1, 2))
+    component = np.choose(axis, [x, y, z])
+    face = np.where(component < 0, axis + 3, axis)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        u = np.choose(face, [y / x, -x / y, -x / z, z / x, z / y, -y / z])
+        v = np.choose(face, [z / x, z / y, -y / z, y / x, -x / y, -x / z])
+    return face, u, v
+
+
+def _uv_to_st(u: np.ndarray) -> np.ndarray:
+    """ the quadratic transform S2 uses to even out the size of the cells """
+    return np.where(u >= 0, 0.5 * np.sqrt(1 + 3 * np.maximum(u, 0)), 1 - 0.5 * np.sqrt(1 - 3 * np.minimum(u, 0)))
+
+
+def _st_to_ij(s: np.ndarray) -> np.ndarray:
+    return np.clip(np.floor(_LIMIT_IJ * s), 0, _LIMIT_IJ - 1).astype(np.uint64)
+
+
+def _face_ij_to_id(face: np.ndarray, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """ the leaf cell ids, walking the Hilbert curve 4 bits of i and j at a time """
+    face = face.astype(np.uint64)
+    ids = face << np.uint64(60)
+    bits = face & np.uint64(_SWAP_MASK)
+    mask = np.uint64(15)
+    for k in range(7, -1, -1):
+        shift = np.uint64(k * 4)
+        bits = bits + (((i >> shift) & mask) << np.uint64(6)) + (((j >> shift) & mask) << np.uint64(2))
+        bits = _LOOKUP_POS[bits.astype(np.intp)]
+        ids |= (bits >> np.uint64(2)) << np.uint64(k * 8)
+        bits &= np.uint64(_SWAP_MASK | _INVERT_MASK)
+    return (ids << np.uint64(1)) + np.uint64(1)
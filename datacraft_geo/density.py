@@ -0,0 +1,252 @@
+"""
+Memory mapped weight grids for sampling points in proportion to a density, i.e. population, inside of a boundary
+
+A weight grid is a 2D array of non-negative weights laid over a longitude and latitude box, the first row is the
+northern most. Grids are read from NumPy .npy files or ESRI ASCII grids. Both the grid and the cumulative table used to
+pick cells are memory mapped, so the memory used does not grow with the size of the grid.
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+import tempfile
+from typing import Tuple, Union
+
+import numpy as np
+
+_log = logging.getLogger(__name__)
+
+# number of cells to read at a time when building the cumulative table
+_CHUNK_CELLS = 1 << 22
+_ASCII_HEADER_KEYS = ['ncols', 'nrows', 'xllcorner', 'yllcorner', 'xllcenter', 'yllcenter', 'cellsize', 'dx', 'dy',
+                      'nodata_value']
+
+
+class WeightGrid:
+    """
+    A memory mapped grid of weights and the box it covers
+    """
+
+    def __init__(self, values: np.ndarray, bounds, nodata: Union[float, None] = None):
+        """
+        Args:
+            values: 2D array of weights, the first row is the northern most
+            bounds: (min x, min y, max x, max y) of the grid
+            nodata: value for cells without data, they get no weight
+        """
+        if values.ndim != 2 or values.shape[0] == 0 or values.shape[1] == 0:
+            raise ValueError(f'weight grid must be a non empty 2D array, found shape {values.shape}')
+        if not np.issubdtype(values.dtype, np.number):
+            raise ValueError(f'weight grid must be numeric, found {values.dtype}')
+        min_x, min_y, max_x, max_y = (float(value) for value in bounds)
+        if not min_x < max_x or not min_y < max_y:
+            raise ValueError(f'weight grid bounds must be [min long, min lat, max long, max lat]: {bounds}')
+        self.values = values
+        self.bounds = (min_x, min_y, max_x, max_y)
+        self.nodata = nodata
+        self.rows, self.cols = values.shape
+        self.cell_width = (max_x - min_x) / self.cols
+        self.cell_height = (max_y - min_y) / self.rows
+        # arguments to load_weight_grid with, so the grid is pickled as where to load it from instead of its values
+        self.source: Union[tuple, None] = None
+
+    def __reduce__(self):
+        if self.source is None:
+            return WeightGrid, (np.asarray(self.values), self.bounds, self.nodata)
+        return load_weight_grid, self.source
+
+    def window(self, bounds) -> Tuple[int, int, int, int]:
+        """
+        The cells of the grid that overlap the bounds
+
+        Args:
+            bounds: (min x, min y, max x, max y) to find the cells for
+
+        Returns:
+            (first row, end row, first column, end column)
+        """
+        min_x, _, _, max_y = self.bounds
+        col_start = max(int(math.floor((bounds[0] - min_x) / self.cell_width)), 0)
+        col_end = min(int(math.ceil((bounds[2] - min_x) / self.cell_width)), self.cols)
+        row_start = max(int(math.floor((max_y - bounds[3]) / self.cell_height)), 0)
+        row_end = min(int(math.ceil((max_y - bounds[1]) / self.cell_height)), self.rows)
+        if col_start >= col_end or row_start >= row_end:
+            raise ValueError('weight grid does not overlap the boundary')
+        return row_start, row_end, col_start, col_end
+
+
+class WeightTable:
+    """
+    Cumulative weights of the cells in a window of a grid, in row major order, for picking cells in proportion to
+    their weight with a binary search. The table is kept in a memory mapped temporary file.
+    """
+
+    def __init__(self, grid: WeightGrid, window: Tuple[int, int, int, int]):
+        """
+        Args:
+            grid: to pick cells from
+            window: (first row, end row, first column, end column) of the cells to include
+        """
+        self.grid = grid
+        self.window = window
+        row_start, row_end, col_start, col_end = window
+        self.width = col_end - col_start
+        self.cumulative = _temp_array(np.float64, ((row_end - row_start) * self.width,))
+        total = 0.0
+        offset = 0
+        step = max(1, _CHUNK_CELLS // self.width)
+        for start in range(row_start, row_end, step):
+            block = np.array(grid.values[start:min(start + step, row_end), col_start:col_end], dtype=np.float64)
+            block[~np.isfinite(block)] = 0.0
+            if grid.nodata is not None:
+                block[block == grid.nodata] = 0.0
+            if np.any(block < 0):
+                raise ValueError(f'weights must not be negative, found {block.min()}')
+            sums = np.cumsum(block.ravel())
+            sums += total
+            self.cumulative[offset:offset + len(sums)] = sums
+            offset += len(sums)
+            total = float(sums[-1])
+        if total <= 0:
+            raise ValueError('weight grid has no weight inside the boundary')
+        self.total = total
+
+    def __reduce__(self):
+        """ pickled as the grid and window, the table is rebuilt when unpickled """
+        return WeightTable, (self.grid, self.window)
+
+    def cells(self, picks: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the cells for values drawn uniformly from zero to the total weight
+
+        Args:
+            picks: values from [0, total)
+
+        Returns:
+            the row and column in the grid of each cell
+        """
+        cells = np.searchsorted(self.cumulative, picks, side='right')
+        np.minimum(cells, len(self.cumulative) - 1, out=cells)
+        row_start, _, col_start, _ = self.window
+        return row_start + cells // self.width, col_start + cells % self.width
+
+
+def load_weight_grid(path: str,
+                     bounds: Union[list, None] = None,
+                     cache: Union[bool, str, None] = None) -> WeightGrid:
+    """
+    Memory map the weight grid in a .npy file or an ESRI ASCII grid. ASCII grids are converted to a binary array the
+    first time they are read, in a temporary file or in the cache to reuse in later runs.
+
+    Args:
+        path: to the .npy or ASCII grid file
+        bounds: [min long, min lat, max long, max lat] of the grid, required for .npy files, for ASCII grids this
+                overrides the header
+        cache: True to keep the converted ASCII grid next to the source file, or a directory to keep it in
+
+    Returns:
+        the weight grid
+    """
+    grid = _load_weight_grid(path, bounds, cache)
+    grid.source = (path, bounds, cache)
+    return grid
+
+
+def _load_weight_grid(path: str, bounds: Union[list, None], cache: Union[bool, str, None]) -> WeightGrid:
+    if path.lower().endswith('.npy'):
+        if bounds is None:
+            raise ValueError('weights_bounds are required for .npy weight grids')
+        return WeightGrid(np.load(path, mmap_mode='r'), bounds)
+    header, header_lines = read_ascii_header(path)
+    if bounds is None:
+        bounds = _ascii_bounds(header)
+    nodata = header.get('nodata_value')
+    shape = (int(header['nrows']), int(header['ncols']))
+    cache_path = _grid_cache_path(path, cache) if cache else None
+    if cache_path is not None and os.path.exists(cache_path):
+        return WeightGrid(np.load(cache_path, mmap_mode='r'), bounds, nodata)
+    if cache_path is not None:
+        temp_path = cache_path + '.tmp.npy'
+        values = np.lib.format.open_memmap(temp_path, mode='w+', dtype=np.float32, shape=shape)
+    else:
+        values = _temp_array(np.float32, shape)
+    _read_ascii_values(path, header_lines, values.reshape(-1))
+    if cache_path is not None:
+        values.flush()
+        del values
+        os.replace(temp_path, cache_path)
+        values = np.load(cache_path, mmap_mode='r')
+    return WeightGrid(values, bounds, nodata)
+
+
+def read_ascii_header(path: str) -> Tuple[dict, int]:
+    """
+    Read the header of an ESRI ASCII grid
+
+    Args:
+        path: to the grid file
+
+    Returns:
+        the header values keyed by lower case name, and the number of header lines
+    """
+    header = {}
+    lines = 0
+    with open(path, 'r', encoding='utf-8') as fp:
+        for line in fp:
+            parts = line.split()
+            if len(parts) != 2 or parts[0].lower() not in _ASCII_HEADER_KEYS:
+                break
+            header[parts[0].lower()] = float(parts[1])
+            lines += 1
+    missing = [key for key in ['ncols', 'nrows'] if key not in header]
+    if missing:
+        raise ValueError(f'ASCII grid {path} is missing {missing} from its header')
+    return header, lines
+
+
+def _ascii_bounds(header: dict) -> list:
+    cols, rows = int(header['ncols']), int(header['nrows'])
+    width = header.get('dx', header.get('cellsize'))
+    height = header.get('dy', header.get('cellsize'))
+    if width is None or height is None:
+        raise ValueError('ASCII grid header needs cellsize, or dx and dy')
+    if 'xllcorner' in header and 'yllcorner' in header:
+        min_x, min_y = header['xllcorner'], header['yllcorner']
+    elif 'xllcenter' in header and 'yllcenter' in header:
+        min_x, min_y = header['xllcenter'] - width / 2, header['yllcenter'] - height / 2
+    else:
+        raise ValueError('ASCII grid header needs xllcorner and yllcorner, or xllcenter and yllcenter')
+    return [min_x, min_y, min_x + cols * width, min_y + rows * height]
+
+
+def _read_ascii_values(path: str, header_lines: int, out: np.ndarray):
+    """ stream the values of the grid into out a line at a time """
+    offset = 0
+    with open(path, 'r', encoding='utf-8') as fp:
+        for _ in range(header_lines):
+            next(fp)
+        for line in fp:
+            values = np.array(line.split(), dtype=np.float64)
+            if offset + len(values) > len(out):
+                raise ValueError(f'ASCII grid {path} has more values than ncols x nrows')
+            out[offset:offset + len(values)] = values
+            offset += len(values)
+    if offset != len(out):
+        raise ValueError(f'ASCII grid {path} has {offset} values, expected {len(out)}')
+
+
+def _grid_cache_path(path: str, cache: Union[bool, str]) -> str:
+    real_path = os.path.realpath(path)
+    stat = os.stat(real_path)
+    key = json.dumps([real_path, stat.st_mtime_ns, stat.st_size]).encode('utf-8')
+    name = f'{os.path.basename(real_path)}.{hashlib.sha256(key).hexdigest()[:16]}.npy'
+    directory = cache if isinstance(cache, str) else os.path.dirname(real_path)
+    return os.path.join(directory, name)
+
+
+def _temp_array(dtype, shape) -> np.ndarray:
+    """ array backed by an unnamed temporary file, so its pages can be dropped from memory """
+    with tempfile.TemporaryFile() as fp:
+        # the mapping stays valid after the file is closed
+        return np.memmap(fp, dtype=dtype, mode='w+', shape=shape)
@@ -0,0 +1,255 @@
+"""
+Streaming readers for large GeoJSON files and a memory mapped WKB cache for repeated runs
+"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+from typing import Iterator, Union
+
+import numpy as np
+import shapely  # type: ignore
+from shapely.geometry import shape  # type: ignore
+
+import datacraft
+
+_log = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 1 << 20
+_NDJSON_EXTENSIONS = ('.ndjson', '.jsonl', '.geojsonl', '.geojsons', '.geojsonseq')
+_RECORD_SEPARATOR = '\x1e'
+_WHITESPACE = ' \t\n\r'
+
+_WKB_MAGIC = b'DCGEOWKB'
+_WKB_VERSION = 1
+# magic, version, source mtime, source size, feature count, properties length
+_WKB_HEADER = struct.Struct('<8sIqqQQ')
+
+
+def iter_features(path: str, where: Union[dict, None] = None) -> Iterator[dict]:
+    """
+    Iterate over the features in a GeoJSON file without reading the whole file into memory. Files with a
+    newline delimited extension (.ndjson, .jsonl, .geojsonl, .geojsons, .geojsonseq) are read one feature per line.
+
+    Args:
+        path: to GeoJSON or newline delimited GeoJSON file
+        where: only yield features whose properties match all of these, values may be a list of allowed values
+
+    Returns:
+        iterator of GeoJSON feature dictionaries
+    """
+    with open(path, 'r', encoding='utf-8') as fp:
+        if path.lower().endswith(_NDJSON_EXTENSIONS):
+            features = _iter_lines(fp)
+        else:
+            features = _iter_document(fp)
+        for feature in features:
+            if matches(feature, where):
+                yield feature
+
+
+def matches(feature: dict, where: Union[dict, None]) -> bool:
+    """
+    Check if the properties of the feature match the filter
+
+    Args:
+        feature: GeoJSON feature
+        where: property name to required value, or list of allowed values
+
+    Returns:
+        True if there is no filter or all the properties match
+    """
+    if not where:
+        return True
+    properties = feature.get('properties') or {}
+    for key, expected in where.items():
+        value = properties.get(key)
+        if isinstance(expected, list):
+            if value not in expected:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+def load_features(path: str, where: Union[dict, None] = None, wkb_cache: Union[bool, str, None] = None) -> list:
+    """
+    Load the (shape, properties) of the features in a GeoJSON file, only materializing the geometries that pass the
+    filter. If a WKB cache is requested, the features are read from the cache when it is up to date with the source
+    file, otherwise the cache is written after streaming the source.
+
+    Args:
+        path: to GeoJSON or newline delimited GeoJSON file
+        where: properties filter
+        wkb_cache: True to keep the cache next to the source file, or a directory to keep it in
+
+    Returns:
+        list of (shape, properties) for each matching feature
+    """
+    cache_path = _wkb_cache_path(path, where, wkb_cache) if wkb_cache else None
+    if cache_path is not None:
+        features = read_wkb_cache(cache_path, path)
+        if features is not None:
+            return features
+    features = [(shape(feature['geometry']), feature.get('properties') or {})
+                for feature in iter_features(path, where)]
+    if cache_path is not None:
+        try:
+            write_wkb_cache(cache_path, path, features)
+        except OSError as err:
+            _log.warning('Unable to write WKB cache %s: %s', cache_path, str(err))
+    return features
+
+
+def write_wkb_cache(cache_path: str, source_path: str, features: list):
+    """
+    Write the features out in the compact binary cache format
+
+    Args:
+        cache_path: file to write
+        source_path: GeoJSON file the features came from, used to detect stale caches
+        features: list of (shape, properties)
+    """
+    stat = os.stat(source_path)
+    blobs = shapely.to_wkb([geometry for geometry, _ in features])
+    properties = json.dumps([props for _, props in features]).encode('utf-8')
+    offsets = np.zeros(len(features) + 1, dtype='<u8')
+    offsets[1:] = np.cumsum([len(blob) for blob in blobs])
+    temp_path = cache_path + '.tmp'
+    with open(temp_path, 'wb') as fp:
+        fp.write(_WKB_HEADER.pack(_WKB_MAGIC, _WKB_VERSION, stat.st_mtime_ns, stat.st_size,
+                                  len(features), len(properties)))
+        fp.write(offsets.tobytes())
+        fp.write(properties)
+        for blob in blobs:
+            fp.write(blob)
+    os.replace(temp_path, cache_path)
+
+
+def read_wkb_cache(cache_path: str, source_path: str) -> Union[list, None]:
+    """
+    Read features from the memory mapped binary cache
+
+    Args:
+        cache_path: file to read
+        source_path: GeoJSON file the cache was made from
+
+    Returns:
+        list of (shape, properties) or None if the cache is missing or out of date
+    """
+    if not os.path.exists(cache_path):
+        return None
+    stat = os.stat(source_path)
+    with open(cache_path, 'rb') as fp, mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if len(mapped) < _WKB_HEADER.size:
+            return None
+        magic, version, mtime, size, count, props_len = _WKB_HEADER.unpack_from(mapped, 0)
+        if magic != _WKB_MAGIC or version != _WKB_VERSION or mtime != stat.st_mtime_ns or size != stat.st_size:
+            _log.debug('WKB cache %s is stale', cache_path)
+            return None
+        start = _WKB_HEADER.size
+        offsets = np.frombuffer(mapped[start:start + (count + 1) * 8], dtype='<u8').tolist()
+        start += (count + 1) * 8
+        properties = json.loads(mapped[start:start + props_len].decode('utf-8'))
+        start += props_len
+        blobs = [mapped[start + offsets[i]:start + offsets[i + 1]] for i in range(count)]
+    return list(zip(shapely.from_wkb(blobs), properties))
+
+
+def _wkb_cache_path(path: str, where: Union[dict, None], wkb_cache: Union[bool, str]) -> str:
+    real_path = os.path.realpath(path)
+    key = json.dumps([real_path, where], sort_keys=True).encode('utf-8')
+    name = f'{os.path.basename(real_path)}.{hashlib.sha256(key).hexdigest()[:16]}.wkb'
+    directory = wkb_cache if isinstance(wkb_cache, str) else os.path.dirname(real_path)
+    return os.path.join(directory, name)
+
+
+def _iter_lines(fp) -> Iterator[dict]:
+    for line in fp:
+        line = line.strip(_WHITESPACE + _RECORD_SEPARATOR)
+        if line:
+            yield json.loads(line)
+
+
+def _iter_document(fp) -> Iterator[dict]:
+    """
+    Scans the top level of the document for the features array, then decodes one feature at a time from the stream.
+    A document that is a single Feature is decoded whole.
+    """
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    depth = 0
+    in_string = False
+    escaped = False
+    string_start = 0
+    last_string = None
+    key = None
+    found = False
+    while not found:
+        chunk = fp.read(_CHUNK_SIZE)
+        if not chunk:
+            break
+        buf += chunk
+        while pos < len(buf):
+            char = buf[pos]
+            pos += 1
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == '\\':
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+                    last_string = buf[string_start:pos - 1]
+            elif char == '"':
+                in_string = True
+                string_start = pos
+            elif char in '{[':
+                if depth == 1 and char == '[' and key == 'features':
+                    found = True
+                    break
+                depth += 1
+            elif char in '}]':
+                depth -= 1
+            elif depth == 1 and char == ':':
+                key = last_string
+            elif depth == 1 and char == ',':
+                key = None
+    if not found:
+        document = json.loads(buf)
+        if document.get('type') != 'Feature':
+            raise datacraft.SpecException('Invalid GeoJSON, must contain Feature or FeatureCollection')
+        yield document
+        return
+
+    read_size = _CHUNK_SIZE
+    eof = False
+    while True:
+        while pos < len(buf) and buf[pos] in _WHITESPACE + ',':
+            pos += 1
+        if pos >= len(buf) and not eof:
+            buf, pos, eof = _read_more(fp, buf, pos, read_size)
+            continue
+        if pos < len(buf) and buf[pos] == ']':
+            return
+        try:
+            feature, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError as err:
+            if eof:
+                raise datacraft.SpecException(f'Invalid GeoJSON: {err}') from err
+            # feature is split across chunks, read more and try again, growing the reads for very large features
+            buf, pos, eof = _read_more(fp, buf, pos, read_size)
+            read_size = max(read_size, len(buf) - pos)
+            continue
+        pos = end
+        read_size = _CHUNK_SIZE
+        yield feature
+
+
+def _read_more(fp, buf: str, pos: int, read_size: int):
+    """ drop the consumed part of the buffer and append the next chunk """
+    chunk = fp.read(read_size)
+    return buf[pos:] + chunk, 0, not chunk
@@ -0,0 +1,176 @@
+"""
+Counters and timers for the geo suppliers. Suppliers update their metrics once per batch, not per record, so they are
+always on. The metrics of every supplier alive in this process can be read with snapshot, and are written as JSON
+when the process exits if the geo_metrics_file default is set. Suppliers are only referenced weakly, once one is garbage
+collected its counters and timers are folded into the totals.
+"""
+import atexit
+import collections
+import contextlib
+import itertools
+import json
+import logging
+import multiprocessing
+import threading
+import time
+import weakref
+from typing import Iterator, Union
+
+import numpy as np
+
+import datacraft
+
+_log = logging.getLogger(__name__)
+
+_GEO_METRICS_FILE = "geo_metrics_file"
+
+
+class Metrics:
+    """
+    The counters and timers for one supplier, with per polygon counts for suppliers that sample points from polygons
+    """
+
+    def __init__(self, kind: str, part_features: Union[list, None] = None):
+        """
+        Args:
+            kind: of supplier, i.e. mgrs
+            part_features: index of the feature each polygon part belongs to, for suppliers that sample polygons
+        """
+        self.kind = kind
+        self.counters: collections.Counter = collections.Counter()
+        self.seconds: dict = collections.defaultdict(float)
+        self.part_features = part_features
+        size = len(part_features) if part_features is not None else 0
+        self.part_points = np.zeros(size, dtype=np.int64)
+        self.part_candidates = np.zeros(size, dtype=np.int64)
+        self.part_accepted = np.zeros(size, dtype=np.int64)
+        self.part_seconds = np.zeros(size, dtype=np.float64)
+        with _lock:
+            _registry[next(_ids)] = self
+        # references the values, not the metrics, so they can still be added to the totals once it is collected
+        self._finalizer = weakref.finalize(self, _retire, self.counters, self.seconds,
+                                           self.part_candidates, self.part_accepted, self.part_seconds)
+        # still alive at exit, so they are in the snapshot already
+        self._finalizer.atexit = False
+
+    def count(self, name: str, amount: int = 1):
+        """ add the amount to the named counter """
+        self.counters[name] += amount
+
+    @contextlib.contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """ add the time spent in the with block to the named timer """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - start
+
+    def snapshot(self) -> dict:
+        """
+        Returns:
+            the current counts and times for the supplier
+        """
+        values = {
+            "kind": self.kind,
+            "counters": dict(self.counters),
+            "seconds": dict(self.seconds)
+        }
+        if self.part_features is not None:
+            values['parts'] = [
+                {
+                    "part": idx,
+                    "feature": self.part_features[idx],
+                    "points": int(self.part_points[idx]),
+                    "candidates": int(self.part_candidates[idx]),
+                    "rejected": int(self.part_candidates[idx] - self.part_accepted[idx]),
+                    "containment_seconds": float(self.part_seconds[idx])
+                }
+                for idx in range(len(self.part_features))
+            ]
+        return values
+
+
+# live metrics by the order they were created in
+_registry: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+_ids = itertools.count()
+# totals of the metrics that have been garbage collected
+_retired_counters: collections.Counter = collections.Counter()
+_retired_seconds: dict = collections.defaultdict(float)
+# reentrant, a metrics can be collected and retired while the lock is held
+_lock = threading.RLock()
+
+
+def _retire(counters: collections.Counter, seconds: dict, part_candidates: np.ndarray, part_accepted: np.ndarray,
+            part_seconds: np.ndarray):
+    """ add the values of a collected metrics to the totals """
+    with _lock:
+        _retired_counters.update(counters)
+        for name, value in seconds.items():
+            _retired_seconds[name] += value
+        if len(part_candidates) > 0:
+            _retired_counters['candidates'] += int(part_candidates.sum())
+            _retired_counters['rejected'] += int((part_candidates - part_accepted).sum())
+            _retired_seconds['containment'] += float(part_seconds.sum())
+
+
+def snapshot() -> dict:
+    """
+    Get the metrics for every live supplier created in this process since the last reset, along with the totals of the
+    counters and timers across all of them, including those already garbage collected
+
+    Returns:
+        dictionary with the suppliers and totals
+    """
+    with _lock:
+        metrics = [entry for _, entry in sorted(_registry.items(), key=lambda item: item[0])]
+        counters = collections.Counter(_retired_counters)
+        seconds = collections.defaultdict(float, _retired_seconds)
+    suppliers = [entry.snapshot() for entry in metrics]
+    for entry in suppliers:
+        counters.update(entry['counters'])
+        for name, value in entry['seconds'].items():
+            seconds[name] += value
+        for part in entry.get('parts', []):
+            counters['candidates'] += part['candidates']
+            counters['rejected'] += part['rejected']
+            seconds['containment'] += part['containment_seconds']
+    return {
+        "suppliers": suppliers,
+        "totals": {"counters": dict(counters), "seconds": dict(seconds)}
+    }
+
+
+def reset():
+    """ forget the metrics of all the suppliers created so far """
+    with _lock:
+        for entry in _registry.values():
+            entry._finalizer.detach()
+        _registry.clear()
+        _retired_counters.clear()
+        _retired_seconds.clear()
+
+
+def dump(path: str):
+    """
+    Write the snapshot of the metrics to a file as JSON
+
+    Args:
+        path: of the file to write
+    """
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump(snapshot(), handle, indent=2)
+
+
+@atexit.register
+def _dump_at_exit():
+    # pool workers exit too, only the process that started the run writes the file
+    if multiprocessing.parent_process() is not None:
+        return
+    path = datacraft.registries.get_default(_GEO_METRICS_FILE)
+    if path is None or (len(_registry) == 0 and len(_retired_counters) == 0 and len(_retired_seconds) == 0):
+        return
+    try:
+        dump(path)
+    except OSError as err:
+        _log.warning('Unable to write geo metrics to %s: %s', path, err)
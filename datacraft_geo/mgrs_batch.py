@@ -0,0 +1,264 @@
+"""
+Vectorized conversion of latitude and longitude to MGRS strings.
+
+This is a NumPy port of the GeoTrans UTM and MGRS routines used by the mgrs package (utm.c, tranmerc.c and mgrs.c),
+including their floating point quirks, so that the output matches mgrs.MGRS().toMGRS exactly. Points in the polar
+regions, which use UPS instead of UTM, and points the native code would reject are handed to the mgrs package one at
+a time.
+"""
+import math
+from typing import Union
+
+import numpy as np
+
+_PI = 3.14159265358979323e0
+_DEG_TO_RAD = 0.017453292519943295
+_RAD_TO_DEG = 57.29577951308232087
+_MIN_UTM_LAT = (-80 * _PI) / 180.0
+_MAX_UTM_LAT = (84 * _PI) / 180.0
+_ONEHT = 100000.e0
+# meters, far larger than any difference between pow and repeated multiplication
+_BOUNDARY_TOLERANCE = 1.0e-6
+_TWOMIL = 2000000.e0
+
+# WGS 84
+_A = 6378137.0
+_F = 1 / 298.257223563
+_ES = 2 * _F - _F * _F
+_EBS = (1 / (1 - _ES)) - 1
+_SCALE = 0.9996
+_B = _A * (1 - _F)
+_TN = (_A - _B) / (_A + _B)
+_TN2 = _TN * _TN
+_TN3 = _TN2 * _TN
+_TN4 = _TN3 * _TN
+_TN5 = _TN4 * _TN
+_AP = _A * (1.e0 - _TN + 5.e0 * (_TN2 - _TN3) / 4.e0 + 81.e0 * (_TN4 - _TN5) / 64.e0)
+_BP = 3.e0 * _A * (_TN - _TN2 + 7.e0 * (_TN3 - _TN4) / 8.e0 + 55.e0 * _TN5 / 64.e0) / 2.e0
+_CP = 15.e0 * _A * (_TN2 - _TN3 + 3.e0 * (_TN4 - _TN5) / 4.e0) / 16.0
+_DP = 35.e0 * _A * (_TN3 - _TN4 + 11.e0 * _TN5 / 16.e0) / 48.e0
+_EP = 315.e0 * _A * (_TN4 - _TN5) / 512.e0
+
+_LETTER_H = 7
+_LETTER_J = 9
+_LETTER_N = 13
+_LETTER_V = 21
+_LETTER_X = 23
+# latitude band letters starting at 80 degrees south, as indexes into the alphabet
+_LATITUDE_BANDS = np.array([2, 3, 4, 5, 6, 7, 9, 10, 11, 12, 13, 15, 16, 17, 18, 19, 20, 21, 22, 23])
+
+_PRECISION_NAMES = {'100km': 0, '10km': 1, '1km': 2, '100m': 3, '10m': 4, '1m': 5}
+
+
+def parse_precision(precision: Union[int, str]) -> int:
+    """
+    Convert an MGRS precision to the number of digits used for each of the easting and northing
+
+    Args:
+        precision: number of digits 0 to 5, or one of 100km, 10km, 1km, 100m, 10m, 1m
+
+    Returns:
+        the number of digits
+
+    Raises:
+        ValueError if the precision is not valid
+    """
+    if isinstance(precision, str) and precision.lower() in _PRECISION_NAMES:
+        return _PRECISION_NAMES[precision.lower()]
+    if str(precision).isdigit() and 0 <= int(precision) <= 5:
+        return int(precision)
+    raise ValueError(f'MGRS precision must be 0-5 or one of {list(_PRECISION_NAMES.keys())}: {precision}')
+
+
+def to_mgrs(lats, longs, precision: int = 5) -> np.ndarray:
+    """
+    Convert arrays of latitude and longitude in degrees to MGRS strings
+
+    Args:
+        lats: latitudes in degrees
+        longs: longitudes in degrees
+        precision: number of digits for each of the easting and northing, 5 is 1 meter, 0 is 100 km
+
+    Returns:
+        array of ASCII byte strings with the MGRS coordinates
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    longs = np.asarray(longs, dtype=np.float64)
+    result = np.empty(len(lats), dtype=f'S{5 + 2 * precision}')
+    if len(lats) == 0:
+        return result
+    # same conversion to radians as the mgrs package
+    latitude = lats * math.pi / 180.0
+    longitude = longs * math.pi / 180.0
+
+    zone, easting, northing, valid = _to_utm(latitude, longitude)
+    # anything the UTM path can't handle goes through the native library
+    native = ~valid
+    if native.any():
+        result[native] = _native_mgrs(lats[native], longs[native], precision)
+    if valid.any():
+        result[valid] = _utm_to_mgrs(zone[valid], latitude[valid], easting[valid], northing[valid], precision)
+    return result
+
+
+def _to_utm(latitude: np.ndarray, longitude: np.ndarray):
+    """ port of Convert_Geodetic_To_UTM with the UTM_To_MGRS zone 31V recheck """
+    valid = ((latitude >= _MIN_UTM_LAT) & (latitude <= _MAX_UTM_LAT)
+             & (longitude >= -_PI) & (longitude <= 2 * _PI))
+    lat = np.where((latitude > -1.0e-9) & (latitude < 0), 0.0, latitude)
+    lon = np.where(longitude < 0, longitude + ((2 * _PI) + 1.0e-10), longitude)
+    lat_degrees = np.trunc(lat * 180.0 / _PI)
+    long_degrees = np.trunc(lon * 180.0 / _PI)
+    zone = np.where(lon < _PI,
+                    np.trunc(31 + ((lon * 180.0 / _PI) / 6.0)),
+                    np.trunc(((lon * 180.0 / _PI) / 6.0) - 29)).astype(np.int64)
+    zone[zone > 60] = 1
+    norway = (lat_degrees > 55) & (lat_degrees < 64)
+    zone[norway & (long_degrees > -1) & (long_degrees < 3)] = 31
+    zone[norway & (long_degrees > 2) & (long_degrees < 12)] = 32
+    svalbard = lat_degrees > 71
+    zone[svalbard & (long_degrees > -1) & (long_degrees < 9)] = 31
+    zone[svalbard & (long_degrees > 8) & (long_degrees < 21)] = 33
+    zone[svalbard & (long_degrees > 20) & (long_degrees < 33)] = 35
+    zone[svalbard & (long_degrees > 32) & (long_degrees < 42)] = 37
+
+    easting, northing = _projected(lat, lon, zone)
+    # points rounding onto the eastern edge of zone 31V are reconverted in zone 32
+    recheck = ((zone == 31) & (latitude >= 56.0 * _DEG_TO_RAD) & (latitude < 64.0 * _DEG_TO_RAD)
+               & ((longitude >= 3.0 * _DEG_TO_RAD) | (easting >= 500000.0)))
+    if recheck.any():
+        zone[recheck] = 32
+        easting[recheck], northing[recheck] = _projected(lat[recheck], lon[recheck], zone[recheck])
+    valid &= (easting >= 100000) & (easting <= 900000) & (northing >= 0) & (northing <= 10000000)
+    return zone, easting, northing, valid
+
+
+def _projected(lat: np.ndarray, lon: np.ndarray, zone: np.ndarray):
+    """
+    Project with repeated multiplication in place of pow, which can differ from the C code in the last bit. That only
+    changes the MGRS string when a coordinate is right at a digit boundary, so those points are projected again with
+    pow to match exactly.
+    """
+    easting, northing = _transverse_mercator(lat, lon, zone, exact=False)
+    near = _near_boundary(easting) | _near_boundary(northing)
+    if near.any():
+        easting[near], northing[near] = _transverse_mercator(lat[near], lon[near], zone[near], exact=True)
+    return easting, northing
+
+
+def _near_boundary(values: np.ndarray) -> np.ndarray:
+    """ all the thresholds used on the easting and northing are multiples of half a meter """
+    doubled = values * 2.0
+    return np.abs(doubled - np.round(doubled)) < _BOUNDARY_TOLERANCE
+
+
+def _transverse_mercator(lat: np.ndarray, lon: np.ndarray, zone: np.ndarray, exact: bool = True):
+    """ port of Convert_Geodetic_To_Transverse_Mercator for the UTM zone parameters """
+    central_meridian = np.where(zone >= 31, (6 * zone - 183) * _PI / 180.0, (6 * zone + 177) * _PI / 180.0)
+    central_meridian = np.where(central_meridian > _PI, central_meridian - (2 * _PI), central_meridian)
+    false_northing = np.where(lat < 0, 10000000.0, 0.0)
+
+    lon = np.where(lon > _PI, lon - (2 * _PI), lon)
+    dlam = lon - central_meridian
+    dlam = np.where(dlam > _PI, dlam - (2 * _PI), dlam)
+    dlam = np.where(dlam < -_PI, dlam + (2 * _PI), dlam)
+    dlam = np.where(np.abs(dlam) < 2.e-10, 0.0, dlam)
+
+    s = np.sin(lat)
+    c = np.cos(lat)
+    c2 = c * c
+    c3 = c2 * c
+    c5 = c3 * c2
+    c7 = c5 * c2
+    t = np.tan(lat)
+    tan2 = t * t
+    tan3 = tan2 * t
+    tan4 = tan3 * t
+    tan5 = tan4 * t
+    tan6 = tan5 * t
+    eta = _EBS * c2
+    eta2 = eta * eta
+    eta3 = eta2 * eta
+    eta4 = eta3 * eta
+
+    sn = _A / np.sqrt(1.e0 - _ES * np.power(np.sin(lat), 2))
+    tmd = (_AP * lat - _BP * np.sin(2.e0 * lat) + _CP * np.sin(4.e0 * lat)
+           - _DP * np.sin(6.e0 * lat) + _EP * np.sin(8.e0 * lat))
+    tmdo = 0.0
+
+    t1 = (tmd - tmdo) * _SCALE
+    t2 = sn * s * c * _SCALE / 2.e0
+    t3 = sn * s * c3 * _SCALE * (5.e0 - tan2 + 9.e0 * eta + 4.e0 * eta2) / 24.e0
+    t4 = sn * s * c5 * _SCALE * (61.e0 - 58.e0 * tan2 + tan4 + 270.e0 * eta - 330.e0 * tan2 * eta + 445.e0 * eta2
+                                 + 324.e0 * eta3 - 680.e0 * tan2 * eta2 + 88.e0 * eta4
+                                 - 600.e0 * tan2 * eta3 - 192.e0 * tan2 * eta4) / 720.e0
+    t5 = sn * s * c7 * _SCALE * (1385.e0 - 3111.e0 * tan2 + 543.e0 * tan4 - tan6) / 40320.e0
+    if exact:
+        powers = [np.power(dlam, float(n)) for n in range(9)]
+    else:
+        powers = [np.ones_like(dlam), dlam]
+        for _ in range(7):
+            powers.append(powers[-1] * dlam)
+    northing = (false_northing + t1 + powers[2] * t2 + powers[4] * t3
+                + powers[6] * t4 + powers[8] * t5)
+
+    t6 = sn * c * _SCALE
+    t7 = sn * c3 * _SCALE * (1.e0 - tan2 + eta) / 6.e0
+    t8 = sn * c5 * _SCALE * (5.e0 - 18.e0 * tan2 + tan4 + 14.e0 * eta - 58.e0 * tan2 * eta + 13.e0 * eta2
+                             + 4.e0 * eta3 - 64.e0 * tan2 * eta2 - 24.e0 * tan2 * eta3) / 120.e0
+    t9 = sn * c7 * _SCALE * (61.e0 - 479.e0 * tan2 + 179.e0 * tan4 - tan6) / 5040.e0
+    easting = (500000.0 + dlam * t6 + powers[3] * t7
+               + powers[5] * t8 + powers[7] * t9)
+    return easting, northing
+
+
+def _utm_to_mgrs(zone, latitude, easting, northing, precision: int) -> np.ndarray:
+    """ port of UTM_To_MGRS and Make_MGRS_String, builds the strings as a matrix of ASCII codes """
+    equator = (latitude <= 0.0) & (northing == 1.0e7)
+    latitude = np.where(equator, 0.0, latitude)
+    northing = np.where(equator, 0.0, northing)
+
+    lat_deg = latitude * _RAD_TO_DEG
+    band_index = (((latitude + (80.0 * _DEG_TO_RAD)) / (8.0 * _DEG_TO_RAD)) + 1.0e-12).astype(np.int64)
+    band = np.where((lat_deg >= 72) & (lat_deg < 84.5),
+                    _LETTER_X,
+                    _LATITUDE_BANDS[np.clip(band_index, 0, len(_LATITUDE_BANDS) - 1)])
+
+    set_number = zone % 6
+    set_number[set_number == 0] = 6
+    ltr2_low = np.select([(set_number == 1) | (set_number == 4), (set_number == 2) | (set_number == 5)],
+                         [0, _LETTER_J], 18)
+    pattern_offset = np.where(set_number % 2 == 0, 500000.0, 0.0)
+
+    grid_northing = np.fmod(northing, _TWOMIL) + pattern_offset
+    grid_northing = np.where(grid_northing >= _TWOMIL, grid_northing - _TWOMIL, grid_northing)
+    letter3 = (grid_northing / _ONEHT).astype(np.int64)
+    letter3 = np.where(letter3 > _LETTER_H, letter3 + 1, letter3)
+    letter3 = np.where(letter3 > _LETTER_N, letter3 + 1, letter3)
+
+    grid_easting = np.where((band == _LETTER_V) & (zone == 31) & (easting == 500000.0), easting - 1.0, easting)
+    letter2 = ltr2_low + ((grid_easting / _ONEHT).astype(np.int64) - 1)
+    letter2 = np.where((ltr2_low == _LETTER_J) & (letter2 > _LETTER_N), letter2 + 1, letter2)
+
+    codes = np.empty((len(zone), 5 + 2 * precision), dtype=np.uint8)
+    codes[:, 0] = zone // 10 + ord('0')
+    codes[:, 1] = zone % 10 + ord('0')
+    codes[:, 2] = band + ord('A')
+    codes[:, 3] = letter2 + ord('A')
+    codes[:, 4] = letter3 + ord('A')
+    divisor = math.pow(10.0, (5 - precision))
+    for offset, value in [(5, grid_easting), (5 + precision, northing)]:
+        value = np.fmod(value, 100000.0)
+        value = np.where(value >= 99999.5, 99999.0, value)
+        digits = (value / divisor).astype(np.int64)
+        for i in range(precision):
+            codes[:, offset + precision - 1 - i] = digits % 10 + ord('0')
+            digits //= 10
+    return codes.view(f'S{5 + 2 * precision}').ravel()
+
+
+def _native_mgrs(lats, longs, precision: int) -> list:
+    import mgrs  # type: ignore
+    converter = mgrs.MGRS()
+    return [converter.toMGRS(lat, long, MGRSPrecision=precision).encode('ascii')
+            for lat, long in zip(lats.tolist(), longs.tolist())]
@@ -0,0 +1,173 @@
+"""
+Parallel record generation across a pool of processes.
+
+Records are generated in fixed size chunks. Each chunk is generated from a fresh copy of the spec, with the random
+module and the geo_seed default seeded from the run seed and the chunk number, so the output only depends on the seed
+and the chunk size. Splitting a run across any number of workers gives the same records as generating it in a single
+process.
+"""
+import collections
+import concurrent.futures
+import copy
+import multiprocessing
+import os
+import random
+from typing import Iterator, List, Tuple, Union
+
+import numpy as np
+
+import datacraft
+from datacraft.loader import field_loader
+from datacraft.supplier import key_suppliers
+
+from . import cache
+
+
+def chunk_seed(seed: int, chunk_index: int) -> int:
+    """
+    Derive the seed for one chunk of a run
+
+    Args:
+        seed: for the whole run, must not be negative
+        chunk_index: position of the chunk in the run
+
+    Returns:
+        the 64 bit seed for the chunk
+    """
+    return int(np.random.SeedSequence([seed, chunk_index]).generate_state(1, np.uint64)[0])
+
+
+def chunks(raw_spec: dict,
+           iterations: int,
+           seed: int,
+           workers: Union[int, None] = None,
+           chunk_size: int = 10000,
+           ordered: bool = True,
+           **kwargs) -> Iterator[Tuple[int, list]]:
+    """
+    Generate the records for the spec in chunks spread across a pool of processes
+
+    Args:
+        raw_spec: to create records for
+        iterations: total number of records
+        seed: for the run, the same seed and chunk size always give the same records
+        workers: number of processes, defaults to the number of CPUs, 1 generates in this process
+        chunk_size: number of records in each chunk
+        ordered: yield chunks in order, otherwise as they are finished
+
+    Keyword Args:
+        data_dir (str): path the data directory with csv files and such
+        enforce_schema (bool): If schema validation should be applied where possible
+        template (str): template to render each record with, as for datacraft.outputs.processor
+        format_name (str): registered format to render each record with, as for datacraft.outputs.processor
+        start_method (str): multiprocessing start method for the pool, i.e. spawn, default is the platform default
+
+    Returns:
+        iterator of (chunk index, list of records)
+    """
+    if seed < 0:
+        raise ValueError(f'seed must not be negative: {seed}')
+    if chunk_size < 1:
+        raise ValueError(f'chunk_size must be positive: {chunk_size}')
+    options = {key: kwargs[key] for key in ('data_dir', 'enforce_schema', 'template', 'format_name') if key in kwargs}
+    tasks = [(raw_spec, seed, index, start, min(start + chunk_size, iterations), options)
+             for index, start in enumerate(range(0, iterations, chunk_size))]
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield _generate_chunk(task)
+        return
+
+    # parse the geometries once here, the workers get them as WKB instead of loading them again
+    _warm_cache(raw_spec, options)
+    workers = workers or os.cpu_count() or 1
+    context = multiprocessing.get_context(kwargs.get('start_method'))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                mp_context=context,
+                                                initializer=_init_worker,
+                                                initargs=(dict(cache.geometry_cache().entries),)) as pool:
+        # bound the number of chunks held in memory
+        window = 2 * workers
+        pending: collections.deque = collections.deque()
+        remaining = iter(tasks)
+        for task in remaining:
+            pending.append(pool.submit(_generate_chunk, task))
+            if len(pending) >= window:
+                break
+        while pending:
+            if ordered:
+                done = pending.popleft()
+            else:
+                finished, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                done = next(future for future in pending if future in finished)
+                pending.remove(done)
+            yield done.result()
+            task = next(remaining, None)
+            if task is not None:
+                pending.append(pool.submit(_generate_chunk, task))
+
+
+def entries(raw_spec: dict, iterations: int, seed: int, workers: Union[int, None] = None, **kwargs) -> List:
+    """
+    Generate the records for the spec across a pool of processes. Takes the same keyword args as chunks.
+
+    Args:
+        raw_spec: to create records for
+        iterations: total number of records
+        seed: for the run
+        workers: number of processes, defaults to the number of CPUs
+
+    Returns:
+        the list of records in order
+    """
+    kwargs['ordered'] = True
+    return [record for _, records in chunks(raw_spec, iterations, seed, workers, **kwargs) for record in records]
+
+
+def _generate_chunk(task) -> Tuple[int, list]:
+    raw_spec, seed, index, start, end, options = task
+    state = chunk_seed(seed, index)
+    # chunks generated in process must not change the caller's random state
+    random_state = random.getstate()
+    previous_seed = datacraft.registries.get_default('geo_seed')
+    # the random module for the datacraft types, geo_seed for the generators of the geo types
+    random.seed(state)
+    datacraft.registries.set_default('geo_seed', state)
+    try:
+        # loading a spec can modify it, i.e. popping config keys
+        loader = field_loader(copy.deepcopy(raw_spec),
+                              data_dir=options.get('data_dir', datacraft.registries.get_default('data_dir')),
+                              enforce_schema=options.get('enforce_schema', False))
+        key_provider = key_suppliers.from_spec(loader.spec)
+        processor = None
+        if 'template' in options or 'format_name' in options:
+            processor = datacraft.outputs.processor(template=options.get('template'),
+                                                    format_name=options.get('format_name'))
+        records = []
+        for i in range(start, end):
+            _, keys = key_provider.get()
+            record = {key: loader.get(key).next(i) for key in keys}
+            records.append(processor.process(record) if processor is not None else record)
+    finally:
+        datacraft.registries.set_default('geo_seed', previous_seed)
+        random.setstate(random_state)
+    return index, records
+
+
+def _warm_cache(raw_spec: dict, options: dict):
+    """ load every field once so the geometries and sampling indexes they use are in the cache """
+    state = random.getstate()
+    try:
+        loader = field_loader(copy.deepcopy(raw_spec),
+                              data_dir=options.get('data_dir', datacraft.registries.get_default('data_dir')),
+                              enforce_schema=options.get('enforce_schema', False))
+        for key in loader.spec.keys():
+            if key not in ('refs', 'field_groups'):
+                loader.get(key)
+    finally:
+        random.setstate(state)
+
+
+def _init_worker(entries: dict):
+    geometry_cache = cache.geometry_cache()
+    for key, geometries in entries.items():
+        geometry_cache.get(key, lambda value=geometries: value)
@@ -0,0 +1,133 @@
+"""
+Pools of points sampled once and served by index, for repeated runs against the same boundary
+
+A pool is a float64 array of shape (size, 2) with the longitude and latitude of each point. Pools can be kept on disk as
+.npy files and are memory mapped when read back, so later runs skip clipping altogether.
+"""
+import logging
+import math
+import os
+from typing import Callable, Union
+
+import numpy as np
+
+_log = logging.getLogger(__name__)
+
+# largest pool, keeps the products of the affine permutation inside of int64
+_MAX_SIZE = (1 << 31) - 1
+
+
+def load_pool(path: str, size: int) -> Union[np.ndarray, None]:
+    """
+    Memory map a pool written by build_pool
+
+    Args:
+        path: of the pool file
+        size: number of points the pool should have
+
+    Returns:
+        the points, or None if there is no usable pool at the path
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        points = np.load(path, mmap_mode='r')
+    except (OSError, ValueError) as err:
+        _log.warning('Unable to read point pool %s: %s', path, err)
+        return None
+    if points.dtype != np.float64 or points.shape != (size, 2):
+        _log.warning('Point pool %s has shape %s, expected %s', path, points.shape, (size, 2))
+        return None
+    return points
+
+
+def build_pool(fill: Callable[[int], np.ndarray], size: int, path: Union[str, None] = None,
+               batch_size: int = 100000) -> np.ndarray:
+    """
+    Fill a pool a batch at a time
+
+    Args:
+        fill: returns the given number of points as an (n, 2) array
+        size: number of points in the pool
+        path: file to keep the pool in, None to keep it in memory
+        batch_size: number of points to request from fill at a time
+
+    Returns:
+        the points, memory mapped from the file if there is one
+    """
+    if path is None:
+        points = np.empty((size, 2), dtype=np.float64)
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # unique per process, parallel workers may build the same pool at the same time
+        temp_path = f'{path}.{os.getpid()}.tmp.npy'
+        points = np.lib.format.open_memmap(temp_path, mode='w+', dtype=np.float64, shape=(size, 2))
+    for start in range(0, size, batch_size):
+        end = min(start + batch_size, size)
+        points[start:end] = fill(end - start)
+    if path is None:
+        return points
+    points.flush()
+    del points
+    os.replace(temp_path, path)
+    _log.info('Wrote point pool of %s points to %s', size, path)
+    return np.load(path, mmap_mode='r')
+
+
+class PoolOrder:
+    """
+    The order to serve the points of a pool in. With replacement every index is drawn independently. Without
+    replacement the indexes follow a random affine permutation, (a * i + b) mod size with a coprime to size, so every
+    point is served once before any repeats, without keeping a shuffled copy of the indexes. A new permutation is drawn
+    for each pass over the pool.
+    """
+
+    def __init__(self, size: int, replacement: bool = True):
+        """
+        Args:
+            size: number of points in the pool
+            replacement: if points may repeat before all of them have been served
+        """
+        if size < 1:
+            raise ValueError(f'pool size must be a positive integer: {size}')
+        if size > _MAX_SIZE:
+            raise ValueError(f'pool size must be at most {_MAX_SIZE}: {size}')
+        self.size = size
+        self.replacement = replacement
+        self.position = size
+        self.multiplier = 1
+        self.offset = 0
+
+    def next(self, rng: np.random.Generator, count: int) -> np.ndarray:
+        """
+        Args:
+            rng: random generator to draw with
+            count: number of indexes to return
+
+        Returns:
+            the indexes of the next count points to serve
+        """
+        if self.replacement:
+            return rng.integers(0, self.size, count)
+        indexes = np.empty(count, dtype=np.int64)
+        filled = 0
+        while filled < count:
+            if self.position >= self.size:
+                self._shuffle(rng)
+            take = min(count - filled, self.size - self.position)
+            steps = np.arange(self.position, self.position + take, dtype=np.int64)
+            indexes[filled:filled + take] = (self.multiplier * steps + self.offset) % self.size
+            self.position += take
+            filled += take
+        return indexes
+
+    def _shuffle(self, rng: np.random.Generator):
+        """ draw a new permutation """
+        self.multiplier = 1
+        if self.size > 1:
+            while True:
+                self.multiplier = int(rng.integers(1, self.size))
+                if math.gcd(self.multiplier, self.size) == 1:
+                    break
+        self.offset = int(rng.integers(0, self.size))
+        self.position = 0
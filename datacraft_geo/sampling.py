@@ -0,0 +1,633 @@
+"""
+Batched samplers for generating points inside of polygon boundaries
+"""
+import logging
+import time
+
+import numpy as np
+import shapely  # type: ignore
+
+_log = logging.getLogger(__name__)
+
+# lower bound on the estimated acceptance rate, keeps the candidate batches from exploding in size
+_MIN_RATE = 0.01
+# upper bound on the number of candidates tested in one vectorized call
+_MAX_CANDIDATES = 1_000_000
+
+# states for the cells of a grid index
+_OUTSIDE = 0
+_INSIDE = 1
+_BOUNDARY = 2
+
+
+class BudgetExceeded(Exception):
+    """
+    Raised by a sampler that runs out of candidates or time before it has all the points asked for
+    """
+
+    def __init__(self, message: str, points: np.ndarray):
+        super().__init__(message)
+        # the points accepted before the budget ran out
+        self.points = points
+
+
+class AliasTable:
+    """
+    Walker alias table for drawing indices in proportion to a list of weights in constant time per draw
+    """
+
+    def __init__(self, weights):
+        """
+        Args:
+            weights: non-negative weights, one per index, must not all be zero
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        if len(weights) == 0 or np.any(weights < 0) or not np.isfinite(weights).all() or weights.sum() <= 0:
+            raise ValueError('weights must be finite, non-negative and not all zero')
+        size = len(weights)
+        scaled = weights * size / weights.sum()
+        self.prob = np.ones(size, dtype=np.float64)
+        self.alias = np.arange(size)
+        small = [i for i in range(size) if scaled[i] < 1.0]
+        large = [i for i in range(size) if scaled[i] >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # anything left over is only off from one due to floating point error
+
+    def sample(self, rng: np.random.Generator, count: int) -> np.ndarray:
+        """
+        Draw weighted indices
+
+        Args:
+            rng: random generator to draw with
+            count: number of indices to draw
+
+        Returns:
+            array of count indices
+        """
+        columns = rng.integers(0, len(self.prob), size=count)
+        keep = rng.random(count) < self.prob[columns]
+        return np.where(keep, columns, self.alias[columns])
+
+
+class RejectionSampler:
+    """
+    Draws candidate points uniformly inside the bounds of the polygon and keeps those the polygon contains. Candidates
+    are drawn and tested as NumPy arrays, so the cost of each containment test is amortized across the batch.
+    """
+
+    def __init__(self, polygon, precision=None):
+        """
+        Args:
+            polygon: shapely polygon to sample points from
+            precision: number of decimal places to round candidates to before testing, None for no rounding
+        """
+        self.polygon = polygon
+        self.precision = precision
+        self.bounds = polygon.bounds
+        # estimated fraction of candidates that land inside the polygon, refined as we sample
+        bounds_area = _bounds_area(self.bounds)
+        self.rate = max(polygon.area / bounds_area, _MIN_RATE) if bounds_area > 0 else 1.0
+        # running totals of the candidates tested, how many were inside the polygon and the time spent testing them
+        self.candidates = 0
+        self.accepted = 0
+        self.seconds = 0.0
+        shapely.prepare(polygon)
+
+    def sample(self, rng: np.random.Generator, count: int, max_candidates=None, deadline=None) -> np.ndarray:
+        """
+        Sample points from inside the polygon
+
+        Args:
+            rng: random generator to draw candidates with
+            count: number of points to return
+            max_candidates: most candidates to test before giving up, None for no limit
+            deadline: time.perf_counter value to give up at, None for no limit
+
+        Returns:
+            array of shape (count, 2) with the x (longitude), y (latitude) of each point
+
+        Raises:
+            BudgetExceeded: if the candidate or time budget runs out first
+        """
+        min_x, min_y, max_x, max_y = self.bounds
+
+        def draw(size: int):
+            return rng.uniform(min_x, max_x, size), rng.uniform(min_y, max_y, size)
+
+        def contains(xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+            return shapely.contains_xy(self.polygon, xs, ys)
+
+        return _reject_loop(self, draw, contains, count, max_candidates, deadline)
+
+
+class BoxSampler:
+    """
+    Draws points uniformly inside a longitude and latitude box, every candidate is accepted
+    """
+
+    def __init__(self, bounds, precision=None):
+        """
+        Args:
+            bounds: (min x, min y, max x, max y) of the box
+            precision: number of decimal places to round points to, None for no rounding
+        """
+        self.bounds = bounds
+        self.precision = precision
+        self.area = _bounds_area(bounds)
+
+    def sample(self, rng: np.random.Generator, count: int) -> np.ndarray:
+        """
+        Sample points from inside the box
+
+        Args:
+            rng: random generator to draw points with
+            count: number of points to return
+
+        Returns:
+            array of shape (count, 2) with the x (longitude), y (latitude) of each point
+        """
+        min_x, min_y, max_x, max_y = self.bounds
+        points = np.empty((count, 2), dtype=np.float64)
+        points[:, 0] = rng.uniform(min_x, max_x, count)
+        points[:, 1] = rng.uniform(min_y, max_y, count)
+        if self.precision is not None:
+            np.round(points, self.precision, out=points)
+        return points
+
+
+def _reject_loop(sampler, draw, contains, count: int, max_candidates, deadline) -> np.ndarray:
+    """
+    Draw batches of candidates and keep the ones inside until there are enough, for the samplers that reject. The batch
+    size follows the acceptance rate seen so far. Updates the rate and the running totals of the sampler.
+
+    Args:
+        sampler: with the rate, precision, candidates, accepted and seconds attributes
+        draw: takes the number of candidates and returns arrays of their x and y
+        contains: takes the arrays of x and y and returns the boolean mask of the candidates that are inside
+        count: number of points to return
+        max_candidates: most candidates to test before giving up, None for no limit
+        deadline: time.perf_counter value to give up at, None for no limit
+
+    Returns:
+        array of shape (count, 2) with the x (longitude), y (latitude) of each point
+
+    Raises:
+        BudgetExceeded: if the candidate or time budget runs out first
+    """
+    points = np.empty((count, 2), dtype=np.float64)
+    filled = 0
+    tested = 0
+    while filled < count:
+        needed = count - filled
+        size = min(int(needed / sampler.rate * 1.1) + 16, _MAX_CANDIDATES)
+        xs, ys = draw(size)
+        if sampler.precision is not None:
+            xs = np.round(xs, sampler.precision)
+            ys = np.round(ys, sampler.precision)
+        start = time.perf_counter()
+        mask = contains(xs, ys)
+        sampler.seconds += time.perf_counter() - start
+        hits = int(np.count_nonzero(mask))
+        sampler.rate = max(hits / size, _MIN_RATE)
+        sampler.candidates += size
+        sampler.accepted += hits
+        take = min(hits, needed)
+        points[filled:filled + take, 0] = xs[mask][:take]
+        points[filled:filled + take, 1] = ys[mask][:take]
+        filled += take
+        tested += size
+        if filled < count:
+            _check_budget(tested, max_candidates, deadline, points[:filled])
+    return points
+
+
+def _check_budget(tested: int, max_candidates, deadline, points: np.ndarray):
+    if max_candidates is not None and tested >= max_candidates:
+        raise BudgetExceeded(f'only {len(points)} points accepted from {tested} candidates', points)
+    if deadline is not None and time.perf_counter() > deadline:
+        raise BudgetExceeded(f'ran out of time with {len(points)} points accepted from {tested} candidates', points)
+
+
+def _bounds_area(bounds):
+    min_x, min_y, max_x, max_y = bounds
+    return (max_x - min_x) * (max_y - min_y)
+
+
+class Triangulation:
+    """
+    Triangles that cover a polygon, with the cumulative areas to pick them by
+    """
+
+    def __init__(self, polygon):
+        """
+        Args:
+            polygon: shapely polygon or multipolygon to triangulate, holes are supported
+        """
+        self.polygon = polygon
+        triangles = shapely.get_parts(shapely.constrained_delaunay_triangles(polygon))
+        # each triangle is a closed ring of four coordinates, the last repeats the first
+        coords = shapely.get_coordinates(triangles).reshape(-1, 4, 2)
+        self.origins = coords[:, 0]
+        self.edges_b = coords[:, 1] - self.origins
+        self.edges_c = coords[:, 2] - self.origins
+        areas = np.abs(self.edges_b[:, 0] * self.edges_c[:, 1] - self.edges_b[:, 1] * self.edges_c[:, 0]) / 2
+        if len(areas) == 0 or areas.sum() <= 0:
+            raise ValueError('polygon has no area to sample from')
+        self.cumulative = np.cumsum(areas)
+        shapely.prepare(polygon)
+
+
+class TriangulationSampler:
+    """
+    Samples points by picking a triangle of the triangulated polygon weighted by its area and drawing a uniform point
+    inside of it using barycentric coordinates. Every draw lands inside the polygon, so the work per point does not
+    depend on how much of the bounding box the polygon covers. Rounding can move a point out of the polygon, so
+    rounded points are tested and the ones that miss are drawn again.
+    """
+
+    def __init__(self, triangulation: Triangulation, precision=None):
+        """
+        Args:
+            triangulation: triangles of the polygon to sample
+            precision: number of decimal places to round points to, None for no rounding
+        """
+        self.triangulation = triangulation
+        self.precision = precision
+        self.rate = 1.0
+        # running totals of the candidates tested, how many were inside the polygon and the time spent testing them
+        self.candidates = 0
+        self.accepted = 0
+        self.seconds = 0.0
+
+    def sample(self, rng: np.random.Generator, count: int, max_candidates=None, deadline=None) -> np.ndarray:
+        """
+        Sample points from inside the polygon
+
+        Args:
+            rng: random generator to draw points with
+            count: number of points to return
+            max_candidates: most candidates to test before giving up, None for no limit
+            deadline: time.perf_counter value to give up at, None for no limit
+
+        Returns:
+            array of shape (count, 2) with the x (longitude), y (latitude) of each point
+
+        Raises:
+            BudgetExceeded: if the candidate or time budget runs out first
+        """
+        triangles = self.triangulation
+
+        def draw(size: int):
+            picks = rng.uniform(0, triangles.cumulative[-1], size)
+            indices = np.minimum(np.searchsorted(triangles.cumulative, picks, side='right'),
+                                 len(triangles.cumulative) - 1)
+            r1 = rng.random(size)
+            r2 = rng.random(size)
+            # reflect the points that fall in the other half of the parallelogram back into the triangle
+            flip = r1 + r2 > 1
+            r1[flip] = 1 - r1[flip]
+            r2[flip] = 1 - r2[flip]
+            points = (triangles.origins[indices]
+                      + r1[:, None] * triangles.edges_b[indices]
+                      + r2[:, None] * triangles.edges_c[indices])
+            return points[:, 0], points[:, 1]
+
+        if self.precision is None:
+            # unrounded draws are always inside
+            xs, ys = draw(count)
+            self.candidates += count
+            self.accepted += count
+            return np.column_stack([xs, ys])
+
+        def contains(xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+            return shapely.contains_xy(triangles.polygon, xs, ys)
+
+        return _reject_loop(self, draw, contains, count, max_candidates, deadline)
+
+
+class GridIndex:
+    """
+    Regular grid laid over the bounds of a polygon. Each cell is marked as fully inside, fully outside or on the
+    boundary of the polygon. Boundary cells keep the part of the polygon that falls inside of them, so exact tests only
+    need to consider the few vertices near that cell.
+    """
+
+    def __init__(self, polygon, grid_size: int):
+        """
+        Args:
+            polygon: shapely polygon to index
+            grid_size: number of cells along each side of the grid
+        """
+        if grid_size < 1:
+            raise ValueError(f'grid_size must be a positive integer: {grid_size}')
+        self.bounds = polygon.bounds
+        self.area = polygon.area
+        self.grid_size = grid_size
+        min_x, min_y, max_x, max_y = self.bounds
+        self.cell_width = (max_x - min_x) / grid_size
+        self.cell_height = (max_y - min_y) / grid_size
+        self.states = np.full(grid_size * grid_size, _OUTSIDE, dtype=np.int8)
+        self.pieces = np.full(grid_size * grid_size, None, dtype=object)
+        self._classify(polygon, 0, grid_size, 0, grid_size)
+        shapely.prepare(self.pieces[self.states == _BOUNDARY])
+        # cells that can contain points, all the same size so they can be chosen uniformly
+        self.cells = np.flatnonzero(self.states != _OUTSIDE)
+
+    def _classify(self, piece, col_start: int, col_end: int, row_start: int, row_end: int):
+        """
+        Quadtree style subdivision of the block of cells, each level only clips the part of the polygon left over
+        from the level above. Blocks that are empty or completely covered are marked without going any deeper.
+        Blocks are clipped with a small margin, so points that sit exactly on the edge of a cell are still inside
+        the piece kept for that cell when they are inside the polygon.
+        """
+        min_x, min_y, _, _ = self.bounds
+        margin = 1e-5 * max(self.cell_width, self.cell_height)
+        box = (min_x + col_start * self.cell_width - margin, min_y + row_start * self.cell_height - margin,
+               min_x + col_end * self.cell_width + margin, min_y + row_end * self.cell_height + margin)
+        piece = shapely.clip_by_rect(piece, *box)
+        if piece.is_empty:
+            return
+        box_area = (box[2] - box[0]) * (box[3] - box[1])
+        if piece.area >= box_area * (1 - 1e-13):
+            for row in range(row_start, row_end):
+                self.states[row * self.grid_size + col_start:row * self.grid_size + col_end] = _INSIDE
+            return
+        if col_end - col_start == 1 and row_end - row_start == 1:
+            self.states[row_start * self.grid_size + col_start] = _BOUNDARY
+            self.pieces[row_start * self.grid_size + col_start] = piece
+            return
+        col_mid = (col_start + col_end + 1) // 2
+        row_mid = (row_start + row_end + 1) // 2
+        for cols in _halves(col_start, col_mid, col_end):
+            for rows in _halves(row_start, row_mid, row_end):
+                self._classify(piece, cols[0], cols[1], rows[0], rows[1])
+
+    @property
+    def inside_count(self) -> int:
+        """ number of cells fully inside the polygon """
+        return int(np.count_nonzero(self.states == _INSIDE))
+
+    @property
+    def boundary_count(self) -> int:
+        """ number of cells that cross the boundary of the polygon """
+        return int(np.count_nonzero(self.states == _BOUNDARY))
+
+    def cell_of(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """ flat index of the cell each point falls in, -1 for points outside of the grid """
+        min_x, min_y, _, _ = self.bounds
+        cols = np.floor((xs - min_x) / self.cell_width).astype(np.int64)
+        rows = np.floor((ys - min_y) / self.cell_height).astype(np.int64)
+        # points on the max edges belong to the last cell
+        cols[cols == self.grid_size] = self.grid_size - 1
+        rows[rows == self.grid_size] = self.grid_size - 1
+        valid = (cols >= 0) & (cols < self.grid_size) & (rows >= 0) & (rows < self.grid_size)
+        return np.where(valid, rows * self.grid_size + cols, -1)
+
+    def contains_xy(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """
+        Test which points are inside the polygon, only points in boundary cells need a geometry test
+
+        Args:
+            xs: x (longitude) of points
+            ys: y (latitude) of points
+
+        Returns:
+            boolean mask of the points inside the polygon
+        """
+        cells = self.cell_of(xs, ys)
+        states = np.where(cells >= 0, self.states[cells], _OUTSIDE)
+        result = states == _INSIDE
+        edge = states == _BOUNDARY
+        if edge.any():
+            result[edge] = shapely.contains_xy(self.pieces[cells[edge]], xs[edge], ys[edge])
+        return result
+
+
+def _halves(start: int, mid: int, end: int) -> list:
+    """ split the range in two, or leave it whole if it can not be split """
+    if end - start == 1:
+        return [(start, end)]
+    return [(start, mid), (mid, end)]
+
+
+class GridSampler:
+    """
+    Samples cells of a grid index that are not outside of the polygon. Points in cells fully inside of the polygon
+    are accepted without a geometry test, points in boundary cells are tested against the part of the polygon in
+    that cell only.
+    """
+
+    def __init__(self, index: GridIndex, precision=None):
+        """
+        Args:
+            index: grid index for the polygon to sample
+            precision: number of decimal places to round candidates to before testing, None for no rounding
+        """
+        if len(index.cells) == 0:
+            raise ValueError('polygon does not cover any grid cells')
+        self.index = index
+        self.precision = precision
+        cell_area = index.cell_width * index.cell_height
+        self.rate = max(index.area / (len(index.cells) * cell_area), _MIN_RATE) if cell_area > 0 else 1.0
+        # running totals of the candidates tested, how many were inside the polygon and the time spent testing them
+        self.candidates = 0
+        self.accepted = 0
+        self.seconds = 0.0
+
+    def sample(self, rng: np.random.Generator, count: int, max_candidates=None, deadline=None) -> np.ndarray:
+        """
+        Sample points from inside the polygon
+
+        Args:
+            rng: random generator to draw candidates with
+            count: number of points to return
+            max_candidates: most candidates to test before giving up, None for no limit
+            deadline: time.perf_counter value to give up at, None for no limit
+
+        Returns:
+            array of shape (count, 2) with the x (longitude), y (latitude) of each point
+
+        Raises:
+            BudgetExceeded: if the candidate or time budget runs out first
+        """
+        index = self.index
+        min_x, min_y, _, _ = index.bounds
+
+        def draw(size: int):
+            cells = index.cells[rng.integers(0, len(index.cells), size)]
+            xs = min_x + (cells % index.grid_size + rng.random(size)) * index.cell_width
+            ys = min_y + (cells // index.grid_size + rng.random(size)) * index.cell_height
+            return xs, ys
+
+        return _reject_loop(self, draw, index.contains_xy, count, max_candidates, deadline)
+
+
+class WeightedSampler:
+    """
+    Picks grid cells in proportion to their weight, draws a uniform point inside each cell and keeps the points that
+    are inside the boundary. A cell that is only partly inside the boundary is chosen in proportion to its full weight,
+    so the density within each cell stays even.
+    """
+
+    def __init__(self, table, parts: list, precision=None):
+        """
+        Args:
+            table: density.WeightTable with the cumulative weights of the grid cells that overlap the boundary
+            parts: polygons of the boundary
+            precision: number of decimal places to round candidates to before testing, None for no rounding
+        """
+        self.table = table
+        self.parts = parts
+        self.precision = precision
+        self.tree = shapely.STRtree(parts) if len(parts) > 1 else None
+        self.rate = 1.0
+        # running totals of the candidates tested, how many were inside the boundary and the time spent testing them
+        self.candidates = 0
+        self.accepted = 0
+        self.seconds = 0.0
+
+    def sample(self, rng: np.random.Generator, count: int, max_candidates=None, deadline=None) -> np.ndarray:
+        """
+        Sample points from inside the boundary
+
+        Args:
+            rng: random generator to draw candidates with
+            count: number of points to return
+            max_candidates: most candidates to test before giving up, None for no limit
+            deadline: time.perf_counter value to give up at, None for no limit
+
+        Returns:
+            array of shape (count, 2) with the x (longitude), y (latitude) of each point
+
+        Raises:
+            BudgetExceeded: if the candidate or time budget runs out first
+        """
+        grid = self.table.grid
+        min_x, _, _, max_y = grid.bounds
+
+        def draw(size: int):
+            rows, cols = self.table.cells(rng.uniform(0, self.table.total, size))
+            xs = min_x + (cols + rng.random(size)) * grid.cell_width
+            ys = max_y - (rows + rng.random(size)) * grid.cell_height
+            return xs, ys
+
+        return _reject_loop(self, draw, self._contains, count, max_candidates, deadline)
+
+    def _contains(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        if self.tree is None:
+            return shapely.contains_xy(self.parts[0], xs, ys)
+        mask = np.zeros(len(xs), dtype=bool)
+        inside, _ = self.tree.query(shapely.points(xs, ys), predicate='within')
+        mask[inside] = True
+        return mask
+
+
+class AdaptiveSampler:
+    """
+    Wraps a sampler that rejects candidates. Each call gets a budget of candidates per point, and optionally of time per
+    point. When a call runs out of budget, or the observed acceptance rate drops below the minimum, the sampler switches
+    for good to the exact sampler built by the fallback, i.e. one that triangulates the polygon.
+    """
+
+    def __init__(self, sampler, fallback=None, **kwargs):
+        """
+        Args:
+            sampler: with a sample method that takes max_candidates and deadline
+            fallback: builds the exact sampler to switch to, raises ValueError if it can't
+
+        Keyword Args:
+            max_attempts(int): number of candidates per point to test before giving up, default is 1000
+            time_budget(float): seconds per point to spend before giving up, default is no limit
+            min_acceptance(float): switch when the acceptance rate is below this, default is 0.01
+            min_candidates(int): number of candidates to test before the acceptance rate is trusted, default is 10000
+            label(str): to describe the polygon with in log messages
+        """
+        self.sampler = sampler
+        self.fallback = fallback
+        self.max_attempts = int(kwargs.get('max_attempts', 1000))
+        self.time_budget = kwargs.get('time_budget')
+        self.min_acceptance = float(kwargs.get('min_acceptance', _MIN_RATE))
+        self.min_candidates = int(kwargs.get('min_candidates', 10000))
+        self.label = kwargs.get('label', 'polygon')
+        # totals from samplers that have been switched away from, and points from ones that never reject
+        self.retired_candidates = 0
+        self.retired_accepted = 0
+        self.retired_seconds = 0.0
+        self.direct = 0
+        self.switched = False
+
+    @property
+    def candidates(self) -> int:
+        """ total number of candidates tested """
+        return self.retired_candidates + getattr(self.sampler, 'candidates', 0) + self.direct
+
+    @property
+    def accepted(self) -> int:
+        """ total number of candidates inside the polygon """
+        return self.retired_accepted + getattr(self.sampler, 'accepted', 0) + self.direct
+
+    @property
+    def seconds(self) -> float:
+        """ total time spent testing candidates """
+        return self.retired_seconds + getattr(self.sampler, 'seconds', 0.0)
+
+    def sample(self, rng: np.random.Generator, count: int) -> np.ndarray:
+        """
+        Sample points from inside the polygon
+
+        Args:
+            rng: random generator to draw candidates with
+            count: number of points to return
+
+        Returns:
+            array of shape (count, 2) with the x (longitude), y (latitude) of each point
+
+        Raises:
+            BudgetExceeded: if the budget runs out and there is no exact sampler to switch to
+        """
+        tested = getattr(self.sampler, 'candidates', 0)
+        if self.fallback is not None and tested >= self.min_candidates:
+            rate = self.sampler.accepted / tested
+            if rate < self.min_acceptance:
+                self._switch(f'acceptance rate {rate:.5f} is below {self.min_acceptance}')
+        try:
+            return self._sample(rng, count)
+        except BudgetExceeded as err:
+            if self.fallback is None or not self._switch(str(err)):
+                raise
+            return np.concatenate([err.points, self.sample(rng, count - len(err.points))])
+
+    def _sample(self, rng: np.random.Generator, count: int) -> np.ndarray:
+        if not hasattr(self.sampler, 'candidates'):
+            # every draw lands inside the polygon
+            self.direct += count
+            return self.sampler.sample(rng, count)
+        deadline = None
+        if self.time_budget is not None:
+            deadline = time.perf_counter() + self.time_budget * count
+        return self.sampler.sample(rng, count, max_candidates=self.max_attempts * count, deadline=deadline)
+
+    def _switch(self, reason: str) -> bool:
+        """ switch to the fallback sampler, False if it can't be built """
+        fallback, self.fallback = self.fallback, None
+        try:
+            exact = fallback()
+        except ValueError as err:
+            _log.warning('Unable to switch %s to an exact sampler after %s: %s', self.label, reason, err)
+            return False
+        _log.warning('Switching %s to %s, %s', self.label, type(exact).__name__, reason)
+        self.retired_candidates += self.sampler.candidates
+        self.retired_accepted += self.sampler.accepted
+        self.retired_seconds += self.sampler.seconds
+        self.sampler = exact
+        self.switched = True
+        return True
@@ -1,59 +1,223 @@
+import functools
+import json
 import logging
+import os
 import random
+from typing import Callable, Union
 
-import mgrs  # type: ignore
+import numpy as np
 import utm  # type: ignore
 
-from shapely.geometry import shape, Point  # type: ignore
-
 import datacraft
 
+from . import boundaries, cache, cells, metrics, mgrs_batch, pools, sampling, templates, tracks, utm_batch, zones
+
 _log = logging.getLogger(__name__)
 
+_REJECTION_SAMPLER = 'rejection'
+_TRIANGULATE_SAMPLER = 'triangulate'
+_GRID_SAMPLER = 'grid'
+_SAMPLERS = [_REJECTION_SAMPLER, _TRIANGULATE_SAMPLER, _GRID_SAMPLER]
+_WEIGHT_BY_AREA = 'area'
+_WEIGHT_BY_UNIFORM = 'uniform'
+_WEIGHT_BY_PROPERTY = 'property'
+_WEIGHT_BY = [_WEIGHT_BY_AREA, _WEIGHT_BY_UNIFORM, _WEIGHT_BY_PROPERTY]
+_UTM_FIELDS = ['easting', 'northing', 'zone_number', 'zone_letter', 'zn', 'zl']
+
+
+class _BatchedSupplier(datacraft.ValueSupplierInterface):
+    """
+    Base for the suppliers that make their values a batch at a time as NumPy arrays. next_batch hands out the arrays,
+    next hands out the values of the same batches one at a time, so the two can be mixed.
+    """
+
+    def __init__(self, batch_size: int):
+        self.batch_size = batch_size
+        # the current batch as made, and as the values next returns
+        self.batch = np.empty(0)
+        self.buffer: list = []
+        self.position = 0
 
-class _MgrsSupplier(datacraft.ValueSupplierInterface):
-    def __init__(self, pair_supplier, lat_first):
+    def next(self, iteration: int):
+        if self.position >= len(self.buffer):
+            self.batch = self._make(iteration, self.batch_size)
+            self.buffer = self._values(self.batch)
+            self.position = 0
+        value = self.buffer[self.position]
+        self.position += 1
+        return value
+
+    def next_batch(self, start: int, count: int) -> np.ndarray:
+        """
+        Get the next values as an array, starting with any left in the current batch
+
+        Args:
+            start: iteration of the first value
+            count: number of values
+
+        Returns:
+            array of the next count values
+        """
+        return self._output(self._take(start, count))
+
+    def _take(self, start: int, count: int) -> np.ndarray:
+        """ the next count values as made, starting with any left in the current batch """
+        take = min(len(self.buffer) - self.position, count)
+        if take == 0:
+            return self._make(start, count)
+        left = self.batch[self.position:self.position + take]
+        self.position += take
+        if take == count:
+            return left
+        return np.concatenate([left, self._make(start + take, count - take)])
+
+    def _make(self, iteration: int, count: int) -> np.ndarray:
+        """ make the next count values """
+        raise NotImplementedError()
+
+    def _values(self, batch: np.ndarray) -> list:
+        """ the values of the batch as returned by next """
+        return batch.tolist()
+
+    def _output(self, batch: np.ndarray) -> np.ndarray:
+        """ the values of the batch as returned by next_batch """
+        return batch
+
+
+class _MgrsSupplier(_BatchedSupplier):
+    def __init__(self, pair_supplier, lat_first, precision=5, batch_size=1000):
+        super().__init__(batch_size)
         self.pair_supplier = pair_supplier
-        self.mgrs = mgrs.MGRS()
         self.lat_first = lat_first
+        self.precision = precision
+        self.metrics = metrics.Metrics('mgrs')
 
-    def next(self, iteration: int):
-        geo_pair = self.pair_supplier.next(iteration)
-        if self.lat_first:
-            return self.mgrs.toMGRS(geo_pair[0], geo_pair[1])
-        return self.mgrs.toMGRS(geo_pair[1], geo_pair[0])
+    def _make(self, iteration: int, count: int) -> np.ndarray:
+        """ fixed width ASCII byte strings, i.e. dtype S15 for 1 m precision """
+        points = _next_points(self.pair_supplier, iteration, count, self.lat_first)
+        with self.metrics.timer('convert'):
+            values = mgrs_batch.to_mgrs(points[:, 1], points[:, 0], self.precision)
+        self.metrics.count('values', len(values))
+        return values
 
+    def _values(self, batch: np.ndarray) -> list:
+        return batch.astype(str).tolist()
 
-def mgrs_supplier(pair_supplier: datacraft.ValueSupplierInterface, lat_first: bool):
+
+def mgrs_supplier(pair_supplier: datacraft.ValueSupplierInterface, lat_first: bool, **kwargs):
     """
 
     Args:
         pair_supplier: supplies tuples/list of (lat, long)
         lat_first: if latitude is the first output of the pair_supplier
 
+    Keyword Args:
+        precision(int): number of digits for each of the easting and northing, 5 (1 m, default) to 0 (100 km)
+        batch_size(int): number of coordinates to convert at a time, default is geo_batch_size
+
     Returns:
         a value supplier for the MGRS coordinates
     """
-    return _MgrsSupplier(pair_supplier, lat_first)
+    precision = kwargs.get('precision', 5)
+    batch_size = int(kwargs.get('batch_size', datacraft.registries.get_default('geo_batch_size')))
+    return _MgrsSupplier(pair_supplier, lat_first, precision, batch_size)
 
 
-class _UtmSupplier(datacraft.ValueSupplierInterface):
-    def __init__(self, pair_supplier, engine, lat_first):
+class _CellSupplier(_BatchedSupplier):
+    def __init__(self, pair_supplier, lat_first, grid: cells.CellGrid, as_id=False, batch_size=1000):
+        super().__init__(batch_size)
         self.pair_supplier = pair_supplier
+        self.lat_first = lat_first
+        self.grid = grid
+        self.as_id = as_id
+        self.metrics = metrics.Metrics(grid.name)
+
+    def _make(self, iteration: int, count: int) -> np.ndarray:
+        """ uint64 ids, or fixed width ASCII byte strings for the tokens """
+        points = _next_points(self.pair_supplier, iteration, count, self.lat_first)
+        with self.metrics.timer('convert'):
+            values = self.grid.ids(points[:, 0], points[:, 1])
+            if not self.as_id:
+                values = self.grid.tokens(values)
+        self.metrics.count('values', len(values))
+        return values
+
+    def _values(self, batch: np.ndarray) -> list:
+        if self.as_id:
+            return batch.tolist()
+        return batch.astype(str).tolist()
+
+
+def cell_supplier(pair_supplier: datacraft.ValueSupplierInterface, grid: cells.CellGrid, lat_first: bool, **kwargs):
+    """
+    Creates a value supplier for the cells the points are in
+
+    Args:
+        pair_supplier: supplies tuples/list of (lat, long)
+        grid: geohash, S2 or hex cells at some level, see cells.grid_for
+        lat_first: if latitude is the first output of the pair_supplier
+
+    Keyword Args:
+        cell_format(str): token (default) for the string token of the cell, or id for the integer id
+        batch_size(int): number of coordinates to convert at a time, default is geo_batch_size
+
+    Returns:
+        a value supplier for the cells
+    """
+    cell_format = kwargs.get('cell_format', 'token')
+    if cell_format not in ['token', 'id']:
+        raise datacraft.SpecException(f'Unknown cell_format {cell_format}, must be token or id')
+    batch_size = int(kwargs.get('batch_size', datacraft.registries.get_default('geo_batch_size')))
+    return _CellSupplier(pair_supplier, lat_first, grid, cell_format == 'id', batch_size)
+
+
+def _next_points(pair_supplier: datacraft.ValueSupplierInterface,
+                 iteration: int,
+                 count: int,
+                 lat_first: bool) -> np.ndarray:
+    """ pull count points from the pair supplier as an (n, 2) array of long, lat """
+    if isinstance(pair_supplier, _PointInBoundsSupplier):
+        return pair_supplier.next_points(count)
+    if hasattr(pair_supplier, 'next_batch'):
+        pairs = np.asarray(pair_supplier.next_batch(iteration, count), dtype=np.float64)
+    else:
+        pairs = np.array([pair_supplier.next(iteration + i) for i in range(count)], dtype=np.float64)
+    if lat_first:
+        return pairs[:, ::-1]
+    return pairs
+
+
+class _UtmSupplier(_BatchedSupplier):
+    def __init__(self, pair_supplier, engine, lat_first, formatter=None, batch_size=1000, **kwargs):
+        super().__init__(batch_size)
+        self.pair_supplier = pair_supplier
+        self.force_zone_number = kwargs.get('force_zone_number')
+        self.force_zone_letter = kwargs.get('force_zone_letter')
         self.engine = engine
         self.lat_first = lat_first
+        self.formatter = formatter
+        self.metrics = metrics.Metrics('utm')
 
-    def next(self, iteration: int):
-        geo_pair = self.pair_supplier.next(iteration)
-        if self.lat_first:
-            lat, long = geo_pair
-        else:
-            long, lat = geo_pair
+    def _make(self, iteration: int, count: int) -> np.ndarray:
+        """ the formatted values as a fixed width unicode array """
+        return np.array(self._convert(_next_points(self.pair_supplier, iteration, count, self.lat_first)), dtype=str)
+
+    def _convert(self, points: np.ndarray) -> list:
         try:
-            easting, northing, zone_number, zone_letter = utm.from_latlon(lat, long)
+            with self.metrics.timer('convert'):
+                easting, northing, zone_number, zone_letter = utm_batch.from_latlon(
+                    points[:, 1], points[:, 0], self.force_zone_number, self.force_zone_letter)
         except utm.error.OutOfRangeError as err:
-            _log.warning("Unable to convert %s: %s", str(geo_pair), str(err))
+            self.metrics.count('conversion_failures')
+            _log.warning("Unable to convert %s: %s", str(_first_out_of_range(points)), str(err))
             raise err
+        polar = zone_number == utm_batch.UPS_ZONE_NUMBER
+        self.metrics.count('values', len(points))
+        self.metrics.count('polar_values', int(np.count_nonzero(polar)))
+        if polar.any():
+            # UPS coordinates have no zone number, leave it out instead of rendering a zero
+            zone_number = zone_number.astype(object)
+            zone_number[polar] = ''
 
         data = {
             "easting": easting,
@@ -63,58 +227,209 @@ class _UtmSupplier(datacraft.ValueSupplierInterface):
             "zn": zone_number,
             "zl": zone_letter,
         }
-        return self.engine.process(data)
+        with self.metrics.timer('template'):
+            if self.formatter is not None:
+                rendered = self.formatter(data)
+            else:
+                columns = {key: values.tolist() for key, values in data.items()}
+                rendered = [self.engine.process({key: values[i] for key, values in columns.items()})
+                            for i in range(len(points))]
+        for i in np.flatnonzero(polar).tolist():
+            rendered[i] = rendered[i].strip()
+        return rendered
 
 
 def utm_supplier(pair_supplier: datacraft.ValueSupplierInterface,
                  engine: datacraft.RecordProcessor,
-                 lat_first: bool) -> datacraft.ValueSupplierInterface:
+                 lat_first: bool,
+                 **kwargs) -> datacraft.ValueSupplierInterface:
     """Creates a Value Supplier for utm coordinates
 
     Args:
-        lat_first:
         pair_supplier: supplies tuples/list of (lat, long)
         engine: for processing the utm pieces into a string
         lat_first: if latitude is the first output of the pair_supplier
 
+    Keyword Args:
+        template(str): the template used by the engine, simple templates are rendered without the engine
+        batch_size(int): number of coordinates to convert at a time, default is geo_batch_size
+        force_zone_number(int): convert all points in this UTM zone
+        force_zone_letter(str): use this zone letter, and the hemisphere it is in, for all points
+
     Returns:
         a value supplier for the utm coordinates output according to the specified template
     """
-    return _UtmSupplier(pair_supplier, engine, lat_first)
+    formatter = templates.compile_template(kwargs.get('template'), _UTM_FIELDS)
+    batch_size = int(kwargs.get('batch_size', datacraft.registries.get_default('geo_batch_size')))
+    return _UtmSupplier(pair_supplier, engine, lat_first, formatter, batch_size,
+                        force_zone_number=kwargs.get('force_zone_number'),
+                        force_zone_letter=kwargs.get('force_zone_letter'))
 
 
-class _PointInBoundsSupplier(datacraft.ValueSupplierInterface):
+def _first_out_of_range(points: np.ndarray) -> list:
+    """ the first long, lat pair that can't be converted to UTM """
+    bad = (points[:, 1] < -90) | (points[:, 1] > 90) | (points[:, 0] < -180) | (points[:, 0] > 180)
+    return points[np.argmax(bad)].tolist()
+
+
+class _PointInBoundsSupplier(_BatchedSupplier):
+    """ batches are (n, 2) float64 arrays of long, lat, or lat, long with lat_first """
+    _METRICS_KIND = 'point'
+
     def __init__(self,
-                 polygons: list,
-                 pair_suppliers: list,
+                 samplers: list,
+                 selector: sampling.AliasTable,
+                 rng: np.random.Generator,
+                 part_features: Union[list, None] = None,
+                 feature_properties: Union[list, None] = None,
                  **kwargs):
-        self.polygons = polygons
-        self.pair_suppliers = pair_suppliers
+        super().__init__(int(kwargs.get('batch_size', datacraft.registries.get_default('geo_clip_batch_size'))))
+        self.samplers = samplers
+        self.selector = selector
+        self.rng = rng
         self.lat_first = kwargs.get('lat_first', False)
         self.join_with = kwargs.get('join_with', None)
+        self.pair_format = _pair_format(**kwargs)
+        if part_features is None:
+            part_features = [None] * len(samplers)
+        self.metrics = metrics.Metrics(self._METRICS_KIND, part_features)
+        # the feature each point came from is tracked when the polygons come from GeoJSON features
+        self.feature_properties = feature_properties
+        self.part_feature_index = None
+        if feature_properties is not None and len(part_features) > 0:
+            self.part_feature_index = np.asarray(part_features, dtype=np.int64)
+        # polygon of each point from the last call to _fill
+        self.parts = np.zeros(0, dtype=np.int64)
+        # feature of each point in the current batch, of the last point from next and of the points from next_batch
+        self.features: list = []
+        self.feature: Union[int, None] = None
+        self.batch_features = np.zeros(0, dtype=np.int64)
 
-    def next(self, i: int):
-        # sample one of our polygons
-        idx = random.randrange(0, len(self.polygons))
-        polygon = self.polygons[idx]
-        pair_supplier = self.pair_suppliers[idx]
-
-        x, y = pair_supplier.next(i)
-        point = Point(x, y)
-        count = 0
-        # not super efficient, but gets the job done
-        while not polygon.contains(point):
-            x, y = pair_supplier.next(i)
-            point = Point(x, y)
-            count += 1
-        _log.debug("%s points outside of bounds before hit", count)
-        if self.lat_first:
-            return_val = [y, x]
-        else:
-            return_val = [x, y]
+    def next(self, iteration: int):
+        refill = self.position >= len(self.buffer)
+        value = super().next(iteration)
+        if self.part_feature_index is not None:
+            if refill:
+                self.features = self.part_feature_index[self.parts].tolist()
+            self.feature = self.features[self.position - 1]
+        return value
+
+    def next_points(self, count: int) -> np.ndarray:
+        """ the next count points as an (n, 2) array of long, lat, whatever the order of the output """
+        return self._take(0, count)
+
+    def _take(self, start: int, count: int) -> np.ndarray:
+        if self.part_feature_index is None:
+            return super()._take(start, count)
+        take = min(len(self.buffer) - self.position, count)
+        left = self.features[self.position:self.position + take]
+        points = super()._take(start, count)
+        made = self.part_feature_index[self.parts] if take < count else np.zeros(0, dtype=np.int64)
+        self.batch_features = np.concatenate([np.array(left, dtype=np.int64), made])
+        return points
+
+    def _make(self, iteration: int, count: int) -> np.ndarray:
+        return self._fill(count)
+
+    def _values(self, batch: np.ndarray) -> list:
+        pairs = self._output(batch).tolist()
+        if self.pair_format:
+            pair_format = self.pair_format
+            return [pair_format % (first, second) for first, second in pairs]
         if self.join_with:
-            return self.join_with.join([str(v) for v in return_val])
-        return return_val
+            return [self.join_with.join([str(first), str(second)]) for first, second in pairs]
+        return pairs
+
+    def _output(self, batch: np.ndarray) -> np.ndarray:
+        if self.lat_first:
+            return np.ascontiguousarray(batch[:, ::-1])
+        return batch
+
+    def _fill(self, count: int) -> np.ndarray:
+        """ sample count points spread across our polygons """
+        part_metrics = self.metrics
+        with part_metrics.timer('sample'):
+            indices = self.selector.sample(self.rng, count)
+            self.parts = indices
+            points = np.empty((count, 2), dtype=np.float64)
+            for idx, sampler in enumerate(self.samplers):
+                mask = indices == idx
+                num = int(np.count_nonzero(mask))
+                if num > 0:
+                    try:
+                        points[mask] = sampler.sample(self.rng, num)
+                    except sampling.BudgetExceeded as err:
+                        raise datacraft.SupplierException(
+                            f'Unable to sample points in polygon {idx} of feature {part_metrics.part_features[idx]}, '
+                            f'{err}. Check the geometry, or raise max_attempts or time_budget') from err
+                    part_metrics.part_points[idx] += num
+                    # samplers that draw directly inside the polygon accept every candidate
+                    part_metrics.part_candidates[idx] = getattr(sampler, 'candidates', part_metrics.part_points[idx])
+                    part_metrics.part_accepted[idx] = getattr(sampler, 'accepted', part_metrics.part_points[idx])
+                    part_metrics.part_seconds[idx] = getattr(sampler, 'seconds', 0.0)
+        part_metrics.count('points', count)
+        return points
+
+
+class _PoolSupplier(_PointInBoundsSupplier):
+    """ points served by index from a pool sampled ahead of time """
+    _METRICS_KIND = 'pool'
+
+    def __init__(self, points: np.ndarray, order: pools.PoolOrder, rng: np.random.Generator, **kwargs):
+        super().__init__([], sampling.AliasTable([1.0]), rng, **kwargs)
+        self.points = points
+        self.order = order
+
+    def _fill(self, count: int) -> np.ndarray:
+        with self.metrics.timer('sample'):
+            points = self.points[self.order.next(self.rng, count)]
+        self.metrics.count('points', count)
+        return points
+
+
+class _TrackSupplier(_PointInBoundsSupplier):
+    """ points along a number of tracks, one step of each track in turn, so record i is from track i % tracks """
+    _METRICS_KIND = 'track'
+
+    def __init__(self, state: tracks.Tracks, rng: np.random.Generator, precision: int, part_features=None,
+                 feature_properties=None, **kwargs):
+        super().__init__(state.samplers, state.selector, rng, part_features, feature_properties, **kwargs)
+        self.state = state
+        self.precision = precision
+        self.positions = np.empty((0, 2), dtype=np.float64)
+        self.cursor = 0
+
+    def _fill(self, count: int) -> np.ndarray:
+        """ the next count points, stepping the tracks each time every track has had its turn """
+        state = self.state
+        points = np.empty((count, 2), dtype=np.float64)
+        self.parts = np.empty(count, dtype=np.int64)
+        filled = 0
+        blocked, waypoints = state.blocked, state.waypoints
+        with self.metrics.timer('step'):
+            try:
+                while filled < count:
+                    if self.cursor >= len(self.positions):
+                        positions = state.step(self.rng) if len(state.x) > 0 else state.start(self.rng)
+                        self.positions = np.round(positions, self.precision)
+                        self.cursor = 0
+                    take = min(count - filled, len(self.positions) - self.cursor)
+                    points[filled:filled + take] = self.positions[self.cursor:self.cursor + take]
+                    self.parts[filled:filled + take] = state.part[self.cursor:self.cursor + take]
+                    self.cursor += take
+                    filled += take
+            except sampling.BudgetExceeded as err:
+                raise datacraft.SupplierException(
+                    f'Unable to draw track points, {err}. Check the geometry, or raise max_attempts or time_budget') \
+                    from err
+        self.metrics.count('points', count)
+        self.metrics.count('blocked', state.blocked - blocked)
+        self.metrics.count('waypoints', state.waypoints - waypoints)
+        for idx, sampler in enumerate(self.samplers):
+            self.metrics.part_candidates[idx] = getattr(sampler, 'candidates', 0)
+            self.metrics.part_accepted[idx] = getattr(sampler, 'accepted', 0)
+            self.metrics.part_seconds[idx] = getattr(sampler, 'seconds', 0.0)
+        return points
 
 
 def point_in_bounds(geojson: dict, **kwargs):
@@ -127,29 +442,391 @@ def point_in_bounds(geojson: dict, **kwargs):
     Keyword Args:
         join_with(bool): if the values should be joined by some given string, instead of returned as a list
         lat_first(bool): if latitude should be the first value in the list, default is longitude first
+        batch_size(int): number of points to sample at a time, default is geo_clip_batch_size
+        sampler(str): how to sample points, rejection (default), triangulate or grid
+        grid_size(int): number of cells along each side of the grid index, default is geo_grid_size
+        weight_by(str): how to choose between polygons, area (default), uniform or property
+        weight_property(str): name of the numeric feature property to weight by
+        max_attempts(int): candidates per point to test before giving up, default is geo_max_attempts
+        time_budget(float): seconds per point to spend before giving up, default is geo_time_budget
+        min_acceptance(float): acceptance rate below which to switch to an exact sampler, default is geo_min_acceptance
+        make_valid(bool): repair invalid geometries, default is true, false raises a SpecException for them instead
+        simplify_tolerance(float): meters the polygons can move by when they are simplified, once, before sampling
+        precision(int): number of digits after the decimal place, default is geo_precision, joined values are
+                        formatted with exactly this many digits if it is given
+        rng(numpy.random.Generator): generator to draw points with, default is one seeded from the random module
 
     Returns:
         A value supplier interface that returns the bounded points
     """
-    feature_type = geojson.get('type')
-    if feature_type == 'FeatureCollection':
-        polygons = [shape(feature['geometry']) for feature in geojson['features']]
-    elif feature_type == 'Feature':
-        polygons = [shape(geojson['geometry'])]
-    else:
-        raise datacraft.SpecException('Invalid GeoJSON, must contain Feature or FeatureCollection')
+    geometries = cache.load_geojson(geojson)
+    tolerance = kwargs.pop('simplify_tolerance', None)
+    if tolerance:
+        geometries = boundaries.combine(geometries, tolerance=float(tolerance))
+    return point_in_geometries(geometries, **kwargs)
+
+
+def point_in_geometries(geometries: cache.Geometries, **kwargs):
+    """Creates a value supplier that will create points in the bounds of the already loaded geometries. Takes the same
+    keyword args as point_in_bounds.
+
+    Args:
+        geometries: loaded from the geometry cache to clip points by
+
+    Returns:
+        A value supplier interface that returns the bounded points
+    """
+    _check_valid(geometries, **kwargs)
+    weights = _part_weights(geometries, **kwargs)
+
+    sampler_type = kwargs.get('sampler', _REJECTION_SAMPLER)
+    samplers = [_sampler_for_part(geometries, idx, sampler_type, **kwargs) for idx in range(len(geometries.parts))]
+    try:
+        selector = sampling.AliasTable(weights)
+    except ValueError as err:
+        raise datacraft.SpecException(f'Unable to weight polygons by {kwargs.get("weight_by")}: {err}') from err
+    rng = _pop_rng(kwargs)
+    supplier = _PointInBoundsSupplier(samplers, selector, rng, geometries.part_features,
+                                      [properties for _, properties in geometries.features], **kwargs)
+    if geometries.simplified_from is not None:
+        supplier.metrics.count('vertices_before_simplify', geometries.simplified_from)
+        supplier.metrics.count('vertices_after_simplify', geometries.vertex_count())
+    return supplier
+
+
+def point_in_weighted_grid(geometries: cache.Geometries, weights: str, **kwargs):
+    """Creates a value supplier for points inside the geometries, spread in proportion to the weights of a grid, i.e.
+    population. The grid and the table of cumulative weights are memory mapped, and the table is kept with the cached
+    geometries. Takes the same keyword args as point_in_bounds, other than those for choosing between polygons and
+    samplers.
+
+    Args:
+        geometries: loaded from the geometry cache to clip points by
+        weights: path to a .npy or ESRI ASCII grid of non-negative weights
+
+    Keyword Args:
+        weights_bounds(list): [min Longitude, min Latitude, max Longitude, max Latitude] covered by the grid, required
+                              for .npy grids, overrides the header of ASCII grids
+        weights_cache(bool|str): keep the binary copy of an ASCII grid next to it, or in the given directory, so later
+                                 runs skip parsing it
+
+    Returns:
+        A value supplier interface that returns the weighted points
+    """
+    from . import density
+    _check_valid(geometries, **kwargs)
+    if geometries.bounds is None:
+        raise datacraft.SpecException('No polygons in the geojson to weight points in')
+    bounds = kwargs.get('weights_bounds')
+    weights_cache = kwargs.get('weights_cache')
+    try:
+        stat = os.stat(weights)
+    except OSError as err:
+        raise datacraft.SpecException(f'Unable to read weight grid {weights}: {err}') from err
+    key = ('weighted', os.path.realpath(weights), stat.st_mtime_ns, json.dumps(bounds))
+
+    def build():
+        grid = density.load_weight_grid(weights, bounds, weights_cache)
+        return density.WeightTable(grid, grid.window(geometries.bounds))
+
+    try:
+        table = geometries.index(key, build)
+    except (OSError, ValueError) as err:
+        raise datacraft.SpecException(f'Unable to load weight grid {weights}: {err}') from err
+    precision = _precision(**kwargs)
+    sampler = sampling.AdaptiveSampler(
+        sampling.WeightedSampler(table, geometries.parts, precision),
+        max_attempts=kwargs.get('max_attempts', datacraft.registries.get_default('geo_max_attempts')),
+        time_budget=kwargs.get('time_budget', datacraft.registries.get_default('geo_time_budget')),
+        label=f'weight grid {weights}')
+    rng = _pop_rng(kwargs)
+    return _PointInBoundsSupplier([sampler], sampling.AliasTable([1.0]), rng, **kwargs)
+
+
+def point_pool(build: Callable[[], datacraft.ValueSupplierInterface], size: int, path: Union[str, None] = None,
+               **kwargs):
+    """Creates a value supplier that serves points from a pool sampled ahead of time. The pool is read from the path
+    if it is there, otherwise it is filled from the supplier made by build, and written to the path if there is one.
+
+    Args:
+        build: makes the clipped point supplier to fill the pool from, only called if the pool has to be filled
+        size: number of points in the pool
+        path: .npy file to keep the pool in for later runs, None to keep it in memory
 
-    pair_suppliers = [_point_supplier_for_polygon(polygon) for polygon in polygons]
-    return _PointInBoundsSupplier(polygons, pair_suppliers, **kwargs)
+    Keyword Args:
+        replacement(bool): if points may repeat before every point in the pool has been served, default is true
+        join_with(bool): if the values should be joined by some given string, instead of returned as a list
+        lat_first(bool): if latitude should be the first value in the list, default is longitude first
+        batch_size(int): number of points to serve at a time, default is geo_clip_batch_size
+        rng(numpy.random.Generator): generator to pick points with, default is one seeded from the random module
 
+    Returns:
+        A value supplier interface that returns points from the pool
+    """
+    try:
+        order = pools.PoolOrder(int(size), datacraft.utils.is_affirmative('replacement', kwargs, True))
+    except ValueError as err:
+        raise datacraft.SpecException(str(err)) from err
+    points = pools.load_pool(path, order.size) if path is not None else None
+    if points is None:
+        supplier = build()
+        try:
+            points = pools.build_pool(supplier.next_points, order.size, path)
+        except OSError as err:
+            _log.warning('Unable to write point pool %s: %s', path, err)
+            points = pools.build_pool(supplier.next_points, order.size)
+    rng = _pop_rng(kwargs)
+    return _PoolSupplier(points, order, rng, **kwargs)
 
-def _point_supplier_for_polygon(polygon):
-    start_long, start_lat, end_long, end_lat = polygon.bounds
-    return datacraft.suppliers.geo_pair(start_lat=start_lat,
-                                        start_long=start_long,
-                                        end_lat=end_lat,
-                                        end_long=end_long,
-                                        as_list=True)
+
+def point_in_box(**kwargs):
+    """Creates a value supplier for points spread evenly across a bounding box, the same as the datacraft geo.pair
+    type but drawn in batches from the supplier's own random generator.
+
+    Keyword Args:
+        start_lat(float): minimum value for latitude, default is -90
+        end_lat(float): maximum value for latitude, default is 90
+        start_long(float): minimum value for longitude, default is -180
+        end_long(float): maximum value for longitude, default is 180
+        bbox(list): [min Longitude, min Latitude, max Longitude, max Latitude], overridden by any of the above
+        precision(int): number of digits after decimal place, default is geo_precision
+        lat_first(bool): if latitude should be the first value in the list, default is longitude first
+        batch_size(int): number of points to sample at a time, default is geo_clip_batch_size
+        rng(numpy.random.Generator): generator to draw points with, default is one seeded from the random module
+
+    Returns:
+        A value supplier interface that returns points in the box
+    """
+    precision = _precision(**kwargs)
+    min_long, min_lat, max_long, max_lat = -180.0, -90.0, 180.0, 90.0
+    if 'bbox' in kwargs:
+        bbox = kwargs['bbox']
+        if not isinstance(bbox, list) or len(bbox) != 4:
+            raise datacraft.SpecException(
+                'Bounding box must be list of size 4 with format: [min Longitude, min Latitude, max Longitude, '
+                'max Latitude]')
+        min_long, min_lat, max_long, max_lat = bbox
+    bounds = (float(kwargs.get('start_long', min_long)), float(kwargs.get('start_lat', min_lat)),
+              float(kwargs.get('end_long', max_long)), float(kwargs.get('end_lat', max_lat)))
+    rng = _pop_rng(kwargs)
+    sampler = sampling.BoxSampler(bounds, precision)
+    return _PointInBoundsSupplier([sampler], sampling.AliasTable([1.0]), rng, **kwargs)
+
+
+def _precision(**kwargs) -> int:
+    """ number of digits after the decimal place to round points to """
+    precision = kwargs.get('precision', datacraft.registries.get_default('geo_precision'))
+    if not str(precision).isnumeric():
+        raise datacraft.SpecException(f'precision for geo should be valid integer >= 0: {precision}')
+    return int(precision)
+
+
+def _pair_format(**kwargs) -> Union[str, None]:
+    """ printf style format for joined pairs with a fixed number of decimal places, if the precision is configured """
+    join_with = kwargs.get('join_with')
+    if not join_with or 'precision' not in kwargs:
+        return None
+    precision = _precision(**kwargs)
+    return f'%.{precision}f{join_with.replace("%", "%%")}%.{precision}f'
+
+
+def default_rng() -> np.random.Generator:
+    """ a generator seeded from the random module, so that random.seed still makes the output reproducible """
+    return np.random.default_rng(random.getrandbits(64))
+
+
+def _pop_rng(kwargs: dict) -> np.random.Generator:
+    """ remove the rng keyword arg from the factory kwargs, or a new default_rng if it isn't there """
+    rng = kwargs.pop('rng', None)
+    return rng if rng is not None else default_rng()
+
+
+def point_in_zones(designators: list, **kwargs):
+    """Creates a value supplier for points spread evenly across the given UTM zones. Takes the same keyword args as
+    point_in_bounds, other than those for choosing between polygons.
+
+    Args:
+        designators: UTM zone numbers, or zone numbers with latitude bands, i.e. [33, "34U"]
+
+    Returns:
+        A value supplier interface that returns points in the zones
+    """
+    try:
+        samplers = [sampling.BoxSampler(box) for designator in designators for box in zones.zone_boxes(designator)]
+    except ValueError as err:
+        raise datacraft.SpecException(str(err)) from err
+    if len(samplers) == 0:
+        raise datacraft.SpecException('At least one UTM zone is required')
+    selector = sampling.AliasTable([zones.box_area(sampler.bounds) for sampler in samplers])
+    rng = _pop_rng(kwargs)
+    return _PointInBoundsSupplier(samplers, selector, rng, **kwargs)
+
+
+def point_in_mgrs_squares(designators: list, **kwargs):
+    """Creates a value supplier for points spread evenly across the given MGRS 100 km grid squares. Takes the same
+    keyword args as point_in_bounds, other than those for choosing between polygons.
+
+    Args:
+        designators: MGRS grid squares, i.e. ["33TWN", "33TWM"]
+
+    Returns:
+        A value supplier interface that returns points in the grid squares
+    """
+    try:
+        samplers = [sampler for designator in designators for sampler in zones.square_samplers(designator)]
+    except ValueError as err:
+        raise datacraft.SpecException(str(err)) from err
+    if len(samplers) == 0:
+        raise datacraft.SpecException('At least one MGRS grid square is required')
+    selector = sampling.AliasTable([sampler.acceptance for sampler in samplers])
+    rng = _pop_rng(kwargs)
+    return _PointInBoundsSupplier(samplers, selector, rng, **kwargs)
+
+
+def track_supplier(geometries: cache.Geometries, **kwargs):
+    """Creates a value supplier for points along random walk or waypoint tracks that stay inside the geometries. Each
+    track only keeps its position, heading and waypoint, so the memory used grows with the number of tracks, not with
+    the number of steps. Record i is step i // tracks of track i % tracks. Start points and waypoints are drawn with the
+    same samplers as point_in_bounds, and take the same keyword args for them.
+
+    Args:
+        geometries: loaded from the geometry cache to keep the tracks inside of
+
+    Keyword Args:
+        tracks(int): number of tracks to interleave, default is 1
+        mode(str): walk (default) or waypoints
+        step_meters(float): distance moved each step, default is 100
+        turn_degrees(float): standard deviation of the change in heading each step of a walk, default is 30
+        grid_size(int): number of cells along each side of the grid the steps are tested with, default is geo_grid_size
+
+    Returns:
+        A value supplier interface that returns the track points
+    """
+    _check_valid(geometries, **kwargs)
+    count = int(kwargs.get('tracks', 1))
+    if count < 1:
+        raise datacraft.SpecException(f'tracks must be a positive integer: {count}')
+    grid_size = int(kwargs.get('grid_size', datacraft.registries.get_default('geo_grid_size')))
+    try:
+        index = geometries.index(('track', grid_size), lambda: tracks.EdgeIndex(geometries.parts, grid_size))
+    except ValueError as err:
+        raise datacraft.SpecException(f'Unable to index polygons for tracks: {err}') from err
+    sampler_type = kwargs.get('sampler', _REJECTION_SAMPLER)
+    samplers = [_sampler_for_part(geometries, idx, sampler_type, **kwargs) for idx in range(len(geometries.parts))]
+    try:
+        selector = sampling.AliasTable(_part_weights(geometries, **kwargs))
+    except ValueError as err:
+        raise datacraft.SpecException(f'Unable to weight polygons by {kwargs.get("weight_by")}: {err}') from err
+    try:
+        state = tracks.Tracks(index, samplers, selector, count, **kwargs)
+    except ValueError as err:
+        raise datacraft.SpecException(str(err)) from err
+    rng = _pop_rng(kwargs)
+    precision = _precision(**kwargs)
+    return _TrackSupplier(state, rng, precision, geometries.part_features,
+                          [properties for _, properties in geometries.features], **kwargs)
+
+
+def _check_valid(geometries: cache.Geometries, **kwargs):
+    """ invalid geometries are repaired when loaded, unless make_valid is off """
+    if len(geometries.invalid) == 0:
+        return
+    reasons = '; '.join(f'feature {feature_index}: {reason}' for feature_index, reason in geometries.invalid[:5])
+    if not datacraft.utils.is_affirmative('make_valid', kwargs, True):
+        raise datacraft.SpecException(
+            f'GeoJSON has {len(geometries.invalid)} invalid geometries ({reasons}), fix them or set make_valid to '
+            f'repair them')
+    _log.warning('Repaired %s invalid geometries: %s', len(geometries.invalid), reasons)
+
+
+def _sampler_for_part(geometries: cache.Geometries, part_index: int, sampler_type: str, **kwargs):
+    """ samplers are cheap to create, the expensive indexes behind them are kept with the cached geometries """
+    polygon = geometries.parts[part_index]
+    precision = _precision(**kwargs)
+    grid_size = int(kwargs.get('grid_size', datacraft.registries.get_default('geo_grid_size')))
+    if sampler_type == _REJECTION_SAMPLER:
+        sampler = sampling.RejectionSampler(polygon, precision)
+    elif sampler_type == _GRID_SAMPLER:
+        try:
+            sampler = sampling.GridSampler(_grid_index(geometries, part_index, grid_size), precision)
+        except ValueError as err:
+            raise datacraft.SpecException(f'Unable to index polygon: {err}') from err
+    elif sampler_type == _TRIANGULATE_SAMPLER:
+        try:
+            sampler = sampling.TriangulationSampler(_triangulation(geometries, part_index), precision)
+        except ValueError as err:
+            raise datacraft.SpecException(f'Unable to triangulate polygon: {err}') from err
+    else:
+        raise datacraft.SpecException(f'Unknown sampler {sampler_type}, must be one of {_SAMPLERS}')
+    # partial instead of a closure so the sampler can be pickled, triangulation is already the exact sampler
+    fallback = None
+    if sampler_type != _TRIANGULATE_SAMPLER:
+        fallback = functools.partial(_exact_sampler, geometries, part_index, sampler_type, grid_size, precision)
+    return sampling.AdaptiveSampler(
+        sampler,
+        fallback,
+        max_attempts=kwargs.get('max_attempts', datacraft.registries.get_default('geo_max_attempts')),
+        time_budget=kwargs.get('time_budget', datacraft.registries.get_default('geo_time_budget')),
+        min_acceptance=kwargs.get('min_acceptance', datacraft.registries.get_default('geo_min_acceptance')),
+        label=f'polygon {part_index} of feature {geometries.part_features[part_index]}')
+
+
+def _grid_index(geometries: cache.Geometries, part_index: int, grid_size: int) -> sampling.GridIndex:
+    return geometries.index((_GRID_SAMPLER, part_index, grid_size),
+                            lambda: sampling.GridIndex(geometries.parts[part_index], grid_size))
+
+
+def _triangulation(geometries: cache.Geometries, part_index: int) -> sampling.Triangulation:
+    return geometries.index((_TRIANGULATE_SAMPLER, part_index),
+                            lambda: sampling.Triangulation(geometries.parts[part_index]))
+
+
+def _exact_sampler(geometries: cache.Geometries, part_index: int, sampler_type: str, grid_size: int, precision: int):
+    """ the sampler to switch to when the acceptance rate is too low, triangulation, or else the grid """
+    try:
+        return sampling.TriangulationSampler(_triangulation(geometries, part_index), precision)
+    except ValueError:
+        if sampler_type == _GRID_SAMPLER:
+            raise
+    return sampling.GridSampler(_grid_index(geometries, part_index, grid_size), precision)
+
+
+def _part_weights(geometries: cache.Geometries, **kwargs) -> list:
+    """ the weight to select each of the polygon parts by """
+    weight_property = kwargs.get('weight_property')
+    weight_by = kwargs.get('weight_by', _WEIGHT_BY_PROPERTY if weight_property else _WEIGHT_BY_AREA)
+    if weight_by not in _WEIGHT_BY:
+        raise datacraft.SpecException(f'Unknown weight_by {weight_by}, must be one of {_WEIGHT_BY}')
+    if weight_by == _WEIGHT_BY_PROPERTY and weight_property is None:
+        raise datacraft.SpecException(f'weight_property is required when weight_by is {_WEIGHT_BY_PROPERTY}')
+    if len(geometries.parts) == 0:
+        raise datacraft.SpecException('GeoJSON does not contain any polygons with area to sample points from')
+
+    feature_areas = [0.0] * len(geometries.features)
+    for polygon, feature_index in zip(geometries.parts, geometries.part_features):
+        feature_areas[feature_index] += polygon.area
+
+    weights = []
+    for polygon, feature_index in zip(geometries.parts, geometries.part_features):
+        if weight_by == _WEIGHT_BY_AREA:
+            feature_weight = feature_areas[feature_index]
+        elif weight_by == _WEIGHT_BY_UNIFORM:
+            feature_weight = 1.0
+        else:
+            properties = geometries.features[feature_index][1]
+            feature_weight = _property_weight(properties, weight_property)  # type: ignore
+        # parts share the weight of their feature in proportion to their area
+        weights.append(feature_weight * polygon.area / feature_areas[feature_index])
+    return weights
+
+
+def _property_weight(properties: dict, weight_property: str) -> float:
+    value = properties.get(weight_property)
+    try:
+        return float(value)  # type: ignore
+    except (TypeError, ValueError) as err:
+        raise datacraft.SpecException(
+            f'Feature property {weight_property} must be numeric to weight by, found: {value}') from err
 
 
 class _IndexedPairValueSupplier(datacraft.ValueSupplierInterface):
@@ -163,6 +840,162 @@ class _IndexedPairValueSupplier(datacraft.ValueSupplierInterface):
         pair = self.pair_supplier.next(iteration)
         return pair[self.index]
 
+    def next_batch(self, start: int, count: int) -> np.ndarray:
+        """ the values at the index of the next count pairs, as a contiguous float64 array """
+        if hasattr(self.pair_supplier, 'next_batch'):
+            pairs = self.pair_supplier.next_batch(start, count)
+        else:
+            pairs = np.array([self.pair_supplier.next(start + i) for i in range(count)], dtype=np.float64)
+        return np.ascontiguousarray(pairs[:, self.index], dtype=np.float64)
+
+
+class _SharedPairSupplier(datacraft.ValueSupplierInterface):
+    """
+    Hands out the same pair to every caller for an iteration, and the same batch for a start and count, so the lat and
+    long fields of a point group read the same points
+    """
+
+    def __init__(self, pair_supplier: datacraft.ValueSupplierInterface):
+        self.pair_supplier = pair_supplier
+        self.iteration = None
+        self.value = None
+        self.batch_key = None
+        self.batch = np.empty((0, 2))
+        # the feature the shared point and points were drawn from
+        self.feature = None
+        self.batch_features = None
+
+    def next(self, iteration):
+        if iteration != self.iteration:
+            self.value = self.pair_supplier.next(iteration)
+            self.feature = getattr(self.pair_supplier, 'feature', None)
+            self.iteration = iteration
+        return self.value
+
+    def next_batch(self, start: int, count: int) -> np.ndarray:
+        if (start, count) != self.batch_key:
+            self.batch = self.pair_supplier.next_batch(start, count)
+            self.batch_features = getattr(self.pair_supplier, 'batch_features', None)
+            self.batch_key = (start, count)
+        return self.batch
+
+
+class _GroupPairSupplier(datacraft.ValueSupplierInterface):
+    """ the pairs of a point group, which are longitude first, in the order and format of one field """
+
+    def __init__(self, shared: _SharedPairSupplier, lat_first: bool, join_with: Union[str, None],
+                 pair_format: Union[str, None] = None):
+        self.shared = shared
+        self.lat_first = lat_first
+        self.join_with = join_with
+        self.pair_format = pair_format
+
+    def next(self, iteration):
+        long, lat = self.shared.next(iteration)
+        pair = [lat, long] if self.lat_first else [long, lat]
+        if self.pair_format:
+            return self.pair_format % (pair[0], pair[1])
+        if self.join_with:
+            return self.join_with.join([str(value) for value in pair])
+        return pair
+
+    def next_batch(self, start: int, count: int) -> np.ndarray:
+        pairs = self.shared.next_batch(start, count)
+        if self.lat_first:
+            return np.ascontiguousarray(pairs[:, ::-1])
+        return pairs
+
+
+class _RegionSupplier(datacraft.ValueSupplierInterface):
+    """ a value for the feature each point of a shared pair supplier was drawn from """
+
+    def __init__(self, shared: _SharedPairSupplier, values: list):
+        self.shared = shared
+        self.values = values
+        self.column = _column(values)
+
+    def next(self, iteration):
+        self.shared.next(iteration)
+        return self.values[self.shared.feature]
+
+    def next_batch(self, start: int, count: int) -> np.ndarray:
+        self.shared.next_batch(start, count)
+        return self.column[self.shared.batch_features]
+
+
+def _column(values: list) -> np.ndarray:
+    """ values as an array, typed when they are all numbers or all strings """
+    kinds = {type(value) for value in values}
+    if len(kinds) == 1 and kinds <= {int, float, str, bool}:
+        return np.array(values)
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
+def group_pair_supplier(shared: datacraft.ValueSupplierInterface, **kwargs) -> datacraft.ValueSupplierInterface:
+    """
+    Pairs from the shared pair supplier of a point group
+
+    Args:
+        shared: from shared_pairs
+
+    Keyword Args:
+        lat_first(bool): if latitude should be the first value in the list, default is longitude first
+        join_with(str): if the values should be joined by some given string, instead of returned as a list
+        precision(int): number of digits after the decimal place to format joined values with
+
+    Returns:
+        the pair supplier for a field in the group
+    """
+    join_with = kwargs.get('join_with')
+    return _GroupPairSupplier(shared, kwargs.get('lat_first', False), join_with,  # type: ignore
+                              _pair_format(**kwargs))
+
+
+def region_supplier(shared: datacraft.ValueSupplierInterface, **kwargs) -> datacraft.ValueSupplierInterface:
+    """
+    Supplies the feature each point from the shared pair supplier was drawn from, without testing the point again
+
+    Args:
+        shared: from shared_pairs, wrapping a supplier of points drawn from GeoJSON features
+
+    Keyword Args:
+        property(str): name of the feature property to supply
+        properties(list): names of the feature properties to supply as a dictionary
+        default is the index of the feature in the GeoJSON
+
+    Returns:
+        the region value supplier
+    """
+    source = shared.pair_supplier  # type: ignore
+    feature_properties = getattr(source, 'feature_properties', None)
+    if getattr(source, 'part_feature_index', None) is None or feature_properties is None:
+        raise datacraft.SpecException('Regions are only known for points drawn from the polygons of GeoJSON features, '
+                                      'not for weights or point pools')
+    if 'property' in kwargs:
+        name = kwargs['property']
+        values = [properties.get(name) for properties in feature_properties]
+    elif 'properties' in kwargs:
+        names = kwargs['properties'] if isinstance(kwargs['properties'], list) else [kwargs['properties']]
+        values = [{name: properties.get(name) for name in names} for properties in feature_properties]
+    else:
+        values = list(range(len(feature_properties)))
+    return _RegionSupplier(shared, values)  # type: ignore
+
+
+def shared_pairs(pair_supplier: datacraft.ValueSupplierInterface) -> datacraft.ValueSupplierInterface:
+    """
+    Wraps a pair supplier so that the suppliers reading from it get the same pair for each iteration
+
+    Args:
+        pair_supplier: to share
+
+    Returns:
+        the shared pair supplier
+    """
+    return _SharedPairSupplier(pair_supplier)
+
 
 def lat_supplier(pair_supplier: datacraft.ValueSupplierInterface, **config):
     lat_first = config.get('lat_first', datacraft.registries.get_default('geo_lat_first'))
@@ -0,0 +1,77 @@
+"""
+Compiles simple output templates to plain Python string formatting, so batches of values can be rendered without going
+through Jinja for every record
+"""
+import re
+from typing import Callable, Union
+
+import numpy as np
+
+# {{ name }} or {{ name | int }}
+_SIMPLE_FIELD = re.compile(r'\{\{\s*([A-Za-z_]\w*)\s*(?:\|\s*(int)\s*)?\}\}')
+_JINJA_SYNTAX = ('{{', '}}', '{%', '%}', '{#', '#}')
+
+
+def compile_template(template: Union[str, None], fields: list) -> Union[Callable[[dict], list], None]:
+    """
+    Compile a template made up of plain text and fields with an optional int filter, i.e.
+    ``{{ zone_number }} {{ easting | int }}``, into a function that renders a whole batch at once
+
+    Args:
+        template: Jinja template string
+        fields: names of the fields that can be used in the template
+
+    Returns:
+        function that takes a dictionary of field name to array of values and returns the list of rendered strings,
+        or None if the template needs the full Jinja engine
+    """
+    if not template or template.endswith('\n'):
+        return None
+    format_parts = []
+    columns = []
+    position = 0
+    for match in _SIMPLE_FIELD.finditer(template):
+        literal = template[position:match.start()]
+        if any(syntax in literal for syntax in _JINJA_SYNTAX):
+            return None
+        name, value_filter = match.groups()
+        if name not in fields:
+            return None
+        format_parts.append(literal.replace('{', '{{').replace('}', '}}'))
+        format_parts.append('{}')
+        columns.append((name, value_filter))
+        position = match.end()
+    literal = template[position:]
+    if any(syntax in literal for syntax in _JINJA_SYNTAX):
+        return None
+    format_parts.append(literal.replace('{', '{{').replace('}', '}}'))
+    format_string = ''.join(format_parts)
+
+    def render(values: dict) -> list:
+        selected = [_column(values[name], value_filter) for name, value_filter in columns]
+        if not selected:
+            return [format_string.format()] * len(next(iter(values.values())))
+        return [format_string.format(*row) for row in zip(*selected)]
+
+    return render
+
+
+def _column(values, value_filter: Union[str, None]) -> list:
+    """ plain Python values render the same way Jinja renders them """
+    values = np.asarray(values)
+    if value_filter == 'int' and values.dtype.kind == 'f':
+        return np.trunc(values).astype(np.int64).tolist()
+    if value_filter == 'int' and values.dtype.kind != 'i':
+        return [_jinja_int(value) for value in values.tolist()]
+    return values.tolist()
+
+
+def _jinja_int(value) -> int:
+    """ the Jinja int filter falls back to 0 for values that aren't numbers """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return 0
@@ -0,0 +1,242 @@
+"""
+Random walk and waypoint tracks that stay inside of polygon boundaries
+
+The state of each track is a few numbers kept in flat arrays, so any number of tracks are advanced together one step at
+a time. A step is only taken if it stays inside the boundary, which is tested against the edges of the boundary in the
+grid cells the step passes through rather than the whole polygon.
+"""
+import math
+
+import numpy as np
+import shapely  # type: ignore
+
+from . import sampling
+
+WALK = 'walk'
+WAYPOINTS = 'waypoints'
+MODES = [WALK, WAYPOINTS]
+# meters in a degree of latitude
+_METERS_PER_DEGREE = 111_320.0
+# random headings to try for a walk step that would leave the boundary, before the track stays put for the step
+_MAX_TURNS = 8
+
+
+class EdgeIndex:
+    """
+    Grid index over the union of polygons, with the edges of the boundary clipped to each grid cell they cross
+    """
+
+    def __init__(self, parts: list, grid_size: int):
+        """
+        Args:
+            parts: polygons the tracks stay inside of
+            grid_size: number of cells along each side of the grid
+        """
+        if len(parts) == 0:
+            raise ValueError('no polygons to keep tracks inside of')
+        region = shapely.union_all(parts)
+        self.grid = sampling.GridIndex(region, grid_size)
+        cells = grid_size * grid_size
+        self.edges = np.full(cells, None, dtype=object)
+        self._clip(region.boundary, 0, grid_size, 0, grid_size)
+        self.has_edges = np.not_equal(self.edges, None)
+        shapely.prepare(self.edges[self.has_edges])
+
+    def _clip(self, lines, col_start: int, col_end: int, row_start: int, row_end: int):
+        """ quadtree style clipping of the edges to the cells, as for the pieces of the grid index """
+        grid = self.grid
+        min_x, min_y, _, _ = grid.bounds
+        margin = 1e-5 * max(grid.cell_width, grid.cell_height)
+        lines = shapely.clip_by_rect(lines,
+                                     min_x + col_start * grid.cell_width - margin,
+                                     min_y + row_start * grid.cell_height - margin,
+                                     min_x + col_end * grid.cell_width + margin,
+                                     min_y + row_end * grid.cell_height + margin)
+        if lines.is_empty:
+            return
+        if col_end - col_start == 1 and row_end - row_start == 1:
+            self.edges[row_start * grid.grid_size + col_start] = lines
+            return
+        col_mid = (col_start + col_end + 1) // 2
+        row_mid = (row_start + row_end + 1) // 2
+        for cols in sampling._halves(col_start, col_mid, col_end):
+            for rows in sampling._halves(row_start, row_mid, row_end):
+                self._clip(lines, cols[0], cols[1], rows[0], rows[1])
+
+    def allowed(self, x0: np.ndarray, y0: np.ndarray, x1: np.ndarray, y1: np.ndarray) -> np.ndarray:
+        """
+        Test which steps stay inside the boundary. The steps must start inside the boundary.
+
+        Args:
+            x0: x (longitude) of the start of each step
+            y0: y (latitude) of the start of each step
+            x1: x (longitude) of the end of each step
+            y1: y (latitude) of the end of each step
+
+        Returns:
+            boolean mask of the steps that end inside the boundary without crossing it
+        """
+        result = self.grid.contains_xy(x1, y1)
+        steps = np.flatnonzero(result)
+        if len(steps) == 0:
+            return result
+        grid = self.grid
+        min_x, min_y, _, _ = grid.bounds
+        col_start, col_end = _span(np.minimum(x0[steps], x1[steps]), np.maximum(x0[steps], x1[steps]), min_x,
+                                   grid.cell_width, grid.grid_size)
+        row_start, row_end = _span(np.minimum(y0[steps], y1[steps]), np.maximum(y0[steps], y1[steps]), min_y,
+                                   grid.cell_height, grid.grid_size)
+        # every cell in the box around each step, only those with edges in them need testing
+        cols = col_end - col_start + 1
+        counts = cols * (row_end - row_start + 1)
+        which = np.repeat(np.arange(len(steps)), counts)
+        offsets = np.arange(len(which)) - np.repeat(np.cumsum(counts) - counts, counts)
+        cells = (row_start[which] + offsets // cols[which]) * grid.grid_size + col_start[which] + offsets % cols[which]
+        near = self.has_edges[cells]
+        which, cells = which[near], cells[near]
+        if len(which) == 0:
+            return result
+        step = steps[which]
+        lines = shapely.linestrings(np.stack([np.column_stack([x0[step], y0[step]]),
+                                              np.column_stack([x1[step], y1[step]])], axis=1))
+        crossed = shapely.intersects(self.edges[cells], lines)
+        result[step[crossed]] = False
+        return result
+
+
+def _span(low: np.ndarray, high: np.ndarray, origin: float, size: float, grid_size: int):
+    """ first and last cell along one axis covered by each range """
+    start = np.clip(np.floor((low - origin) / size).astype(np.int64), 0, grid_size - 1)
+    end = np.clip(np.floor((high - origin) / size).astype(np.int64), 0, grid_size - 1)
+    return start, end
+
+
+class Tracks:
+    """
+    The position of each of a number of tracks inside the polygons. A random walk track moves a fixed distance each
+    step with a heading that drifts by a random turn, and turns at random when a step would leave the polygons. A
+    waypoint track moves a fixed distance each step in a straight line towards a point drawn from the same polygon it
+    started in, and draws a new point when it gets there or when the way there leaves the polygons.
+    """
+
+    def __init__(self, index: EdgeIndex, samplers: list, selector: sampling.AliasTable, count: int, **kwargs):
+        """
+        Args:
+            index: for testing the steps against the boundary
+            samplers: for each polygon, to draw start points and waypoints with
+            selector: picks the polygon each track starts in
+            count: number of tracks
+
+        Keyword Args:
+            mode(str): walk (default) or waypoints
+            step_meters(float): distance moved each step, default is 100
+            turn_degrees(float): standard deviation of the change in heading each step of a walk, default is 30
+        """
+        self.index = index
+        self.samplers = samplers
+        self.selector = selector
+        self.count = count
+        self.mode = kwargs.get('mode', WALK)
+        if self.mode not in MODES:
+            raise ValueError(f'Unknown track mode {self.mode}, must be one of {MODES}')
+        self.step_meters = float(kwargs.get('step_meters', 100.0))
+        if not self.step_meters > 0:
+            raise ValueError(f'step_meters must be positive: {self.step_meters}')
+        self.turn = math.radians(float(kwargs.get('turn_degrees', 30.0)))
+        self.x = np.empty(0)
+        self.y = np.empty(0)
+        self.heading = np.empty(0)
+        self.part = np.empty(0, dtype=np.int32)
+        self.target_x = np.empty(0)
+        self.target_y = np.empty(0)
+        # running totals of the steps that stayed put and the waypoints drawn
+        self.blocked = 0
+        self.waypoints = 0
+
+    def start(self, rng: np.random.Generator) -> np.ndarray:
+        """
+        Place the tracks at their start points
+
+        Args:
+            rng: random generator to draw with
+
+        Returns:
+            array of shape (count, 2) with the x (longitude), y (latitude) of each track
+        """
+        self.part = self.selector.sample(rng, self.count).astype(np.int32)
+        tracks = np.arange(self.count)
+        start = self._draw(rng, tracks)
+        self.x, self.y = start[:, 0].copy(), start[:, 1].copy()
+        self.heading = rng.uniform(0, 2 * math.pi, self.count)
+        if self.mode == WAYPOINTS:
+            self.target_x, self.target_y = np.empty(self.count), np.empty(self.count)
+            self._new_waypoints(rng, tracks)
+        return start
+
+    def step(self, rng: np.random.Generator) -> np.ndarray:
+        """
+        Move every track one step
+
+        Args:
+            rng: random generator to draw with
+
+        Returns:
+            array of shape (count, 2) with the x (longitude), y (latitude) of each track
+        """
+        if self.mode == WALK:
+            self._walk(rng)
+        else:
+            self._to_waypoints(rng)
+        return np.column_stack([self.x, self.y])
+
+    def _walk(self, rng: np.random.Generator):
+        heading = self.heading + rng.normal(0, self.turn, self.count)
+        tracks = np.arange(self.count)
+        for _ in range(_MAX_TURNS):
+            x1, y1 = self._moved(tracks, heading[tracks], self.step_meters)
+            ok = self.index.allowed(self.x[tracks], self.y[tracks], x1, y1)
+            moved = tracks[ok]
+            self.x[moved], self.y[moved] = x1[ok], y1[ok]
+            self.heading[moved] = heading[moved]
+            tracks = tracks[~ok]
+            if len(tracks) == 0:
+                return
+            heading[tracks] = rng.uniform(0, 2 * math.pi, len(tracks))
+        self.blocked += len(tracks)
+
+    def _to_waypoints(self, rng: np.random.Generator):
+        scale = _METERS_PER_DEGREE * np.cos(np.radians(self.y))
+        dx = self.target_x - self.x
+        dy = self.target_y - self.y
+        distance = np.hypot(dx * scale, dy * _METERS_PER_DEGREE)
+        arrived = distance <= self.step_meters
+        fraction = np.where(arrived, 1.0, self.step_meters / np.maximum(distance, self.step_meters))
+        x1 = self.x + dx * fraction
+        y1 = self.y + dy * fraction
+        ok = self.index.allowed(self.x, self.y, x1, y1)
+        self.x[ok], self.y[ok] = x1[ok], y1[ok]
+        self.blocked += int(np.count_nonzero(~ok))
+        # tracks that got to their waypoint, or can't get there in a straight line, head somewhere else
+        self._new_waypoints(rng, np.flatnonzero(arrived | ~ok))
+
+    def _moved(self, tracks: np.ndarray, heading: np.ndarray, meters: float):
+        """ position of the tracks after moving the distance along the headings, clockwise from north """
+        y = self.y[tracks]
+        scale = _METERS_PER_DEGREE * np.maximum(np.cos(np.radians(y)), 1e-6)
+        return self.x[tracks] + meters * np.sin(heading) / scale, y + meters * np.cos(heading) / _METERS_PER_DEGREE
+
+    def _new_waypoints(self, rng: np.random.Generator, tracks: np.ndarray):
+        if len(tracks) == 0:
+            return
+        targets = self._draw(rng, tracks)
+        self.target_x[tracks], self.target_y[tracks] = targets[:, 0], targets[:, 1]
+        self.waypoints += len(tracks)
+
+    def _draw(self, rng: np.random.Generator, tracks: np.ndarray) -> np.ndarray:
+        """ a point for each track from the polygon it started in """
+        points = np.empty((len(tracks), 2), dtype=np.float64)
+        parts = self.part[tracks]
+        for part in np.unique(parts):
+            mask = parts == part
+            points[mask] = self.samplers[part].sample(rng, int(np.count_nonzero(mask)))
+        return points
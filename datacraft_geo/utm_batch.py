@@ -0,0 +1,140 @@
+"""
+Vectorized conversion of latitude and longitude to UTM coordinates.
+
+The utm package accepts NumPy arrays, but works out the zone from the first point only. Points are grouped by zone and
+hemisphere here so that each group can be converted with a single call that gives the same values as converting the
+points one at a time. Points in the polar regions are converted to UPS.
+"""
+import math
+from typing import Union
+
+import numpy as np
+import utm  # type: ignore
+
+_ZONE_LETTERS = np.array(list("CDEFGHJKLMNPQRSTUVWXX"))
+
+# WGS 84 ellipsoid with the UPS scale factor and false origin
+_A = 6378137.0
+_F = 1 / 298.257223563
+_E = math.sqrt(2 * _F - _F * _F)
+_UPS_SCALE = 0.994
+_UPS_FALSE_ORIGIN = 2000000.0
+_UPS_RHO_FACTOR = 2 * _A * _UPS_SCALE / math.sqrt((1 + _E) ** (1 + _E) * (1 - _E) ** (1 - _E))
+# UPS coordinates have no zone number
+UPS_ZONE_NUMBER = 0
+
+
+def from_latlon(lats, longs, force_zone_number: Union[int, None] = None, force_zone_letter: Union[str, None] = None):
+    """
+    Convert arrays of latitude and longitude in degrees to UTM, or to UPS for points north of 84 deg N or south of
+    80 deg S
+
+    Args:
+        lats: latitudes in degrees
+        longs: longitudes in degrees, between 180 deg W and 180 deg E
+        force_zone_number: convert all the UTM points in this zone
+        force_zone_letter: use this zone letter for all the UTM points, also sets the hemisphere
+
+    Returns:
+        tuple of arrays of easting, northing, zone number and zone letter
+
+    Raises:
+        utm.error.OutOfRangeError if any of the points can't be converted
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    longs = np.asarray(longs, dtype=np.float64)
+    eastings = np.empty(len(lats), dtype=np.float64)
+    northings = np.empty(len(lats), dtype=np.float64)
+    if len(lats) == 0:
+        return eastings, northings, np.empty(0, dtype=np.int64), np.empty(0, dtype='<U1')
+    if not ((lats >= -90) & (lats <= 90)).all():
+        raise utm.error.OutOfRangeError('latitude out of range (must be between 90 deg S and 90 deg N)')
+    if not ((longs >= -180) & (longs <= 180)).all():
+        raise utm.error.OutOfRangeError('longitude out of range (must be between 180 deg W and 180 deg E)')
+    check_forced_zone(force_zone_number, force_zone_letter)
+
+    polar = (lats < -80) | (lats > 84)
+    if force_zone_number is None:
+        zone_numbers = latlon_to_zone_numbers(lats, longs)
+    else:
+        zone_numbers = np.full(len(lats), force_zone_number, dtype=np.int64)
+    if force_zone_letter is None:
+        zone_letters = latitude_to_zone_letters(np.clip(lats, -80, 84))
+    else:
+        zone_letters = np.full(len(lats), force_zone_letter.upper(), dtype='<U1')
+    northern = zone_letters >= 'N'
+    groups = np.where(polar, -1, zone_numbers * 2 + northern)
+    for group in np.unique(groups):
+        mask = groups == group
+        if group < 0:
+            eastings[mask], northings[mask], zone_letters[mask] = to_ups(lats[mask], longs[mask])
+            zone_numbers[mask] = UPS_ZONE_NUMBER
+            continue
+        easting, northing, _, _ = utm.from_latlon(lats[mask], longs[mask],
+                                                  force_zone_number=int(group // 2),
+                                                  force_northern=bool(group % 2))
+        eastings[mask] = easting
+        northings[mask] = northing
+    return eastings, northings, zone_numbers, zone_letters
+
+
+def check_forced_zone(force_zone_number: Union[int, None], force_zone_letter: Union[str, None]):
+    """
+    Check the zone number and letter to force conversions into
+
+    Args:
+        force_zone_number: UTM zone number or None
+        force_zone_letter: UTM zone letter or None
+
+    Raises:
+        utm.error.OutOfRangeError if either is not valid
+    """
+    if force_zone_number is not None:
+        if not isinstance(force_zone_number, int) or isinstance(force_zone_number, bool):
+            raise utm.error.OutOfRangeError(f'zone number must be an integer: {force_zone_number}')
+        utm.conversion.check_valid_zone_number(force_zone_number)
+    if force_zone_letter is not None:
+        if not isinstance(force_zone_letter, str) or len(force_zone_letter) != 1:
+            raise utm.error.OutOfRangeError(f'zone letter must be a single letter: {force_zone_letter}')
+        utm.conversion.check_valid_zone_letter(force_zone_letter)
+
+
+def to_ups(lats: np.ndarray, longs: np.ndarray):
+    """
+    Convert latitude and longitude in degrees to Universal Polar Stereographic coordinates
+
+    Args:
+        lats: latitudes in degrees
+        longs: longitudes in degrees
+
+    Returns:
+        tuple of arrays of easting, northing and zone letter, A or B in the south and Y or Z in the north
+    """
+    north = lats > 0
+    phi = np.radians(np.abs(lats))
+    lam = np.radians(longs)
+    e_sin = _E * np.sin(phi)
+    t = np.tan(np.pi / 4 - phi / 2) / np.power((1 - e_sin) / (1 + e_sin), _E / 2)
+    rho = _UPS_RHO_FACTOR * t
+    eastings = _UPS_FALSE_ORIGIN + rho * np.sin(lam)
+    northings = np.where(north, _UPS_FALSE_ORIGIN - rho * np.cos(lam), _UPS_FALSE_ORIGIN + rho * np.cos(lam))
+    letters = np.where(north, np.where(longs < 0, 'Y', 'Z'), np.where(longs < 0, 'A', 'B'))
+    return eastings, northings, letters
+
+
+def latlon_to_zone_numbers(lats: np.ndarray, longs: np.ndarray) -> np.ndarray:
+    """ vectorized utm.latlon_to_zone_number, including the Norway and Svalbard zones """
+    longs = (longs % 360 + 540) % 360 - 180
+    zones = ((longs + 180) / 6).astype(np.int64) + 1
+    zones[(lats >= 56) & (lats < 64) & (longs >= 3) & (longs < 12)] = 32
+    svalbard = (lats >= 72) & (lats <= 84) & (longs >= 0)
+    zones[svalbard & (longs < 42)] = 37
+    zones[svalbard & (longs < 33)] = 35
+    zones[svalbard & (longs < 21)] = 33
+    zones[svalbard & (longs < 9)] = 31
+    return zones
+
+
+def latitude_to_zone_letters(lats: np.ndarray) -> np.ndarray:
+    """ vectorized utm.latitude_to_zone_letter for latitudes between 80 deg S and 84 deg N """
+    return _ZONE_LETTERS[(lats + 80).astype(np.int64) >> 3]
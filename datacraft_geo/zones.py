@@ -0,0 +1,182 @@
+"""
+Areas covered by UTM zones and MGRS 100 km grid squares, so points can be generated directly inside them
+"""
+import re
+from typing import List, Tuple
+
+import numpy as np
+import utm  # type: ignore
+
+from . import mgrs_batch
+
+_BAND_LETTERS = 'CDEFGHJKLMNPQRSTUVWX'
+_COLUMN_LETTERS = 'ABCDEFGHJKLMNPQRSTUVWXYZ'
+_ROW_LETTERS = 'ABCDEFGHJKLMNPQRSTUV'
+_ZONE_DESIGNATOR = re.compile(r'^(\d{1,2})([C-HJ-NP-X])?$')
+_SQUARE_DESIGNATOR = re.compile(r'^(\d{1,2})([C-HJ-NP-X])([A-HJ-NP-Z])([A-HJ-NP-V])$')
+# the wider and narrower zones around Norway and Svalbard, as min and max longitude
+_SPECIAL_ZONES = {
+    (31, 'V'): (0, 3), (32, 'V'): (3, 12),
+    (31, 'X'): (0, 9), (32, 'X'): None, (33, 'X'): (9, 21), (34, 'X'): None,
+    (35, 'X'): (21, 33), (36, 'X'): None, (37, 'X'): (33, 42)
+}
+_SQUARE_SIZE = 100000.0
+_PROBE_SIZE = 4096
+
+
+def zone_boxes(designator) -> List[Tuple[float, float, float, float]]:
+    """
+    Get the latitude and longitude boxes that make up a UTM zone
+
+    Args:
+        designator: zone number, i.e. 33, or zone number and latitude band, i.e. 33T
+
+    Returns:
+        list of (min long, min lat, max long, max lat)
+
+    Raises:
+        ValueError if the designator is not a valid UTM zone
+    """
+    match = _ZONE_DESIGNATOR.match(str(designator).strip().upper())
+    if match is None:
+        raise ValueError(f'Invalid UTM zone: {designator}')
+    zone_number = int(match.group(1))
+    if not 1 <= zone_number <= 60:
+        raise ValueError(f'UTM zone number must be between 1 and 60: {designator}')
+    letters = [match.group(2)] if match.group(2) else list(_BAND_LETTERS)
+    boxes = [box for box in (_band_box(zone_number, letter) for letter in letters) if box is not None]
+    if len(boxes) == 0:
+        raise ValueError(f'UTM zone {designator} does not exist')
+    return boxes
+
+
+def box_area(box: Tuple[float, float, float, float]) -> float:
+    """
+    Get the area a latitude and longitude box covers on the unit sphere. Boxes of the same size in degrees cover less
+    of the earth the further they are from the equator, so the boxes of a zone are chosen in proportion to this area.
+    Within a box points are still drawn uniformly in degrees.
+
+    Args:
+        box: (min long, min lat, max long, max lat)
+
+    Returns:
+        the area in steradians
+    """
+    min_long, min_lat, max_long, max_lat = box
+    return np.radians(max_long - min_long) * (np.sin(np.radians(max_lat)) - np.sin(np.radians(min_lat)))
+
+
+def _band_box(zone_number: int, letter: str):
+    band = _BAND_LETTERS.index(letter)
+    min_lat = -80 + band * 8
+    max_lat = 84 if letter == 'X' else min_lat + 8
+    min_long = (zone_number - 1) * 6 - 180
+    max_long = min_long + 6
+    if (zone_number, letter) in _SPECIAL_ZONES:
+        longs = _SPECIAL_ZONES[(zone_number, letter)]
+        if longs is None:
+            return None
+        min_long, max_long = longs
+    return min_long, min_lat, max_long, max_lat
+
+
+class SquareSampler:
+    """
+    Samples points inside an MGRS 100 km grid square. Points are drawn in easting and northing space and converted to
+    latitude and longitude. Squares cut by a zone or latitude band boundary are only partly valid, points that land in
+    a neighboring square are drawn again.
+    """
+
+    def __init__(self, square: str, zone_number: int, northern: bool, min_easting: float, min_northing: float,
+                 acceptance: float):
+        self.square = square
+        self.zone_number = zone_number
+        self.northern = northern
+        self.min_easting = min_easting
+        self.min_northing = min_northing
+        self.acceptance = acceptance
+
+    def sample(self, rng: np.random.Generator, count: int) -> np.ndarray:
+        """
+        Sample points from inside the grid square
+
+        Args:
+            rng: random generator to draw candidates with
+            count: number of points to return
+
+        Returns:
+            array of shape (count, 2) with the x (longitude), y (latitude) of each point
+        """
+        points = np.empty((count, 2), dtype=np.float64)
+        filled = 0
+        while filled < count:
+            needed = count - filled
+            draw = needed if self.acceptance >= 1 else int(needed / self.acceptance) + 16
+            accepted = self.inside(rng.random((draw, 2)))[:needed]
+            points[filled:filled + len(accepted)] = accepted
+            filled += len(accepted)
+        return points
+
+    def inside(self, unit: np.ndarray) -> np.ndarray:
+        """
+        Place points from the unit square in the grid square and keep the ones that are in it
+
+        Args:
+            unit: array of shape (n, 2) with values between 0 and 1 for the easting and northing of each point
+
+        Returns:
+            array of shape (m, 2) with the x (longitude), y (latitude) of the points that are inside the grid square
+        """
+        eastings = self.min_easting + unit[:, 0] * _SQUARE_SIZE
+        northings = self.min_northing + unit[:, 1] * _SQUARE_SIZE
+        lats, longs = utm.to_latlon(eastings, northings, self.zone_number, northern=self.northern, strict=False)
+        inside = mgrs_batch.to_mgrs(lats, longs, 0) == self.square.encode('ascii')
+        return np.column_stack([longs[inside], lats[inside]])
+
+
+def square_samplers(designator: str) -> List[SquareSampler]:
+    """
+    Get samplers for the parts of an MGRS 100 km grid square. The letters of a square repeat every 2000 km of
+    northing, the latitude band picks out which of the repeats is meant.
+
+    Args:
+        designator: zone number, latitude band and the two grid square letters, i.e. 33TWN
+
+    Returns:
+        list of samplers for the square, usually only one
+
+    Raises:
+        ValueError if the designator is not a valid MGRS grid square
+    """
+    square = str(designator).strip().upper()
+    match = _SQUARE_DESIGNATOR.match(square)
+    if match is None:
+        raise ValueError(f'Invalid MGRS grid square: {designator}')
+    zone_number = int(match.group(1))
+    if not 1 <= zone_number <= 60:
+        raise ValueError(f'UTM zone number must be between 1 and 60: {designator}')
+    band, column, row = match.group(2), match.group(3), match.group(4)
+    square = f'{zone_number:02d}{band}{column}{row}'
+
+    # same lettering scheme as the GeoTrans MGRS code
+    set_number = zone_number % 6 or 6
+    first_column = {1: 'A', 4: 'A', 2: 'J', 5: 'J', 3: 'S', 6: 'S'}[set_number]
+    column_index = _COLUMN_LETTERS.index(column) - _COLUMN_LETTERS.index(first_column)
+    if not 0 <= column_index < 8:
+        raise ValueError(f'MGRS grid square {designator} does not exist')
+    min_easting = (column_index + 1) * _SQUARE_SIZE
+    pattern_offset = 500000.0 if set_number % 2 == 0 else 0.0
+    base_northing = (_ROW_LETTERS.index(row) * _SQUARE_SIZE - pattern_offset) % 2000000.0
+    northern = band >= 'N'
+
+    probe = np.random.default_rng(0).random((_PROBE_SIZE, 2))
+    samplers = []
+    for repeat in range(5):
+        sampler = SquareSampler(square, zone_number, northern, min_easting, base_northing + repeat * 2000000.0, 1.0)
+        acceptance = len(sampler.inside(probe)) / _PROBE_SIZE
+        if acceptance > 0:
+            sampler.acceptance = acceptance
+            samplers.append(sampler)
+    if len(samplers) == 0:
+        raise ValueError(f'MGRS grid square {designator} does not exist')
+    return samplers
@@ -0,0 +1,44 @@
+import pytest
+from shapely.geometry import shape
+
+from benchmarks import geometries, run
+
+
+@pytest.mark.parametrize('name', list(geometries.MATRIX))
+def test_geometries_valid(name):
+    geojson = geometries.MATRIX[name]()
+    features = geojson['features'] if geojson['type'] == 'FeatureCollection' else [geojson]
+    assert all(shape(feature['geometry']).is_valid for feature in features)
+
+
+def test_run_case():
+    result = run.run_case('geo.lat.clip', 'sliver', 'rejection', 200)
+
+    assert result['records'] == 200
+    assert result['records_per_second'] > 0
+    assert result['p50_us'] <= result['p99_us']
+    # the sliver covers under a fifth of its bounds
+    assert 0 < result['acceptance'] < 0.2
+
+
+def test_triangulate_accepts_nearly_everything():
+    # every draw is inside, only the few that rounding moves onto or over the edge are drawn again
+    assert run.run_case('geo.mgrs', 'holes', 'triangulate', 50)['acceptance'] > 0.99
+
+
+def test_compare():
+    baseline = run.run(['geo.pair.clip'], ['bbox'], ['grid'], 50, isolate=False)
+    current = run.run(['geo.pair.clip'], ['bbox', 'holes'], ['grid'], 50, isolate=False)
+
+    lines = run.compare(baseline, current)
+
+    assert len(lines) == 1
+    assert lines[0].startswith('geo.pair.clip bbox grid')
+
+
+def test_run_case_simplified():
+    result = run.run_case('geo.pair.clip', 'coastline', 'rejection', 100,
+                          config={"simplify_tolerance": 500, "precision": 5, "join_with": ","})
+
+    assert result['vertices_before'] == 5001
+    assert 0 < result['vertices_after'] < result['vertices_before']
@@ -0,0 +1,113 @@
+import json
+
+import numpy as np
+import pytest
+import shapely
+from shapely.geometry import shape, Point
+
+import datacraft
+from datacraft.loader import field_loader
+
+from benchmarks import geometries as matrix
+from datacraft_geo import boundaries, cache
+
+# one degree box from 10 to 11 long and 50 to 51 lat
+_BOX = {"type": "Feature", "properties": {"name": "box"}, "geometry": {"type": "Polygon", "coordinates": [
+    [[10, 50], [11, 50], [11, 51], [10, 51], [10, 50]]]}}
+_HOLE = {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [
+    [[10.2, 50.2], [10.8, 50.2], [10.8, 50.8], [10.2, 50.8], [10.2, 50.2]]]}}
+# 5 km along a meridian in degrees of latitude
+_FIVE_KM = 5000 / 6371008.8 * 180 / 3.141592653589793
+
+
+@pytest.mark.parametrize('meters', [5000, -5000])
+def test_buffer_in_meters(meters):
+    geometry = boundaries.combine(cache.load_geojson(_BOX), meters=meters).features[0][0]
+    min_x, min_y, max_x, max_y = geometry.bounds
+    offset = _FIVE_KM if meters > 0 else -_FIVE_KM
+    assert min_y == pytest.approx(50 - offset, abs=1e-5)
+    assert max_y == pytest.approx(51 + offset, abs=1e-5)
+
+
+def test_buffer_simplified():
+    geometry = boundaries.combine(cache.load_geojson(_BOX), meters=5000).features[0][0]
+    # a round corner with 8 segments per quarter would have 37 points, and the long edges are split in to 10
+    assert len(geometry.exterior.coords) < 80
+
+
+def test_combined_cached():
+    geometries = cache.load_geojson(_BOX)
+    exclude = cache.load_geojson(_HOLE)
+    assert boundaries.combine(geometries, exclude, 100) is boundaries.combine(geometries, exclude, 100)
+    assert boundaries.combine(geometries) is geometries
+
+
+def test_excluded_points(tmp_path):
+    path = tmp_path / 'restricted.geojson'
+    path.write_text(json.dumps(_HOLE))
+    spec = {
+        "point": {
+            "type": "geo.pair.clip",
+            "config": {"geojson": _BOX, "exclude_geojson": str(path), "buffer_meters": -5000, "seed": 3}
+        }
+    }
+    hole = shape(_HOLE['geometry'])
+    inner = shape(_BOX['geometry']).buffer(-_FIVE_KM * 0.9)
+    for entry in datacraft.entries(spec, 500, enforce_schema=True):
+        point = Point(entry['point'])
+        assert not hole.contains(point)
+        assert inner.contains(point)
+
+
+def test_feature_kept_when_excluded():
+    other = {"type": "Feature", "properties": {"name": "other"}, "geometry": {"type": "Polygon", "coordinates": [
+        [[20, 50], [21, 50], [21, 51], [20, 51], [20, 50]]]}}
+    collection = {"type": "FeatureCollection", "features": [_BOX, other]}
+    geometries = boundaries.combine(cache.load_geojson(collection), cache.load_geojson(_BOX))
+    assert len(geometries.features) == 2
+    assert geometries.part_features == [1]
+
+
+def test_nothing_left():
+    spec = {"point": {"type": "geo.pair.clip", "config": {"geojson": _BOX, "exclude_geojson": _BOX}}}
+    with pytest.raises(datacraft.SpecException):
+        datacraft.entries(spec, 1)
+
+
+def test_simplified_within_tolerance():
+    coastline = matrix.coastline()
+    original = shape(coastline['geometry'])
+    simplified = boundaries.combine(cache.load_geojson(coastline), tolerance=200)
+    assert simplified.simplified_from == 5001
+    assert simplified.vertex_count() < simplified.simplified_from / 4
+    # 200 m is under 0.0025 degrees of longitude at 42 degrees north
+    assert original.hausdorff_distance(simplified.features[0][0]) < 0.0025
+
+
+def test_simplified_points_spec():
+    spec = {"point": {"type": "geo.pair.clip",
+                      "config": {"geojson": _BOX, "simplify_tolerance": 50, "precision": 4, "join_with": ","}}}
+    for entry in datacraft.entries(spec, 100, enforce_schema=True):
+        long, lat = entry['point'].split(',')
+        assert 10 <= float(long) <= 11 and 50 <= float(lat) <= 51
+        assert len(long.split('.')[1]) == 4
+
+
+@pytest.mark.parametrize('sampler_config', [
+    {"sampler": "rejection"},
+    {"sampler": "grid"},
+    {"sampler": "triangulate"},
+    # the coastline covers well under all of its bounds, so this always switches to the exact sampler
+    {"sampler": "rejection", "min_acceptance": 0.99}
+])
+def test_rounded_points_inside(sampler_config):
+    coastline = matrix.coastline()
+    config = dict(geojson=coastline, simplify_tolerance=200, precision=3, seed=4, **sampler_config)
+    supplier = field_loader({"point": {"type": "geo.pair.clip", "config": config}}).get('point')
+    polygon = boundaries.combine(cache.load_geojson(coastline), tolerance=200).features[0][0]
+    # the acceptance rate is only trusted after 10000 candidates, the switch happens between the batches
+    points = np.concatenate([supplier.next_batch(start, 10000) for start in range(0, 30000, 10000)])
+    assert np.array_equal(np.round(points, 3), points)
+    assert shapely.contains_xy(polygon, points[:, 0], points[:, 1]).all()
+    if 'min_acceptance' in sampler_config:
+        assert supplier.samplers[0].switched
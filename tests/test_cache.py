@@ -0,0 +1,63 @@
+import json
+import os
+
+import pytest
+import datacraft
+
+from datacraft_geo import cache
+
+
+@pytest.fixture()
+def geo_filter():
+    return {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [
+        [[23.0843, 53.1544], [23.0845, 53.1544], [23.0859, 53.1535], [23.0843, 53.1544]]]}}
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.geometry_cache().clear()
+    yield
+    cache.geometry_cache().clear()
+
+
+def test_inline_geojson_cached(geo_filter):
+    first = cache.load_geojson(geo_filter)
+    second = cache.load_geojson(json.loads(json.dumps(geo_filter)))
+    assert first is second
+    assert cache.cache_stats()['hits'] == 1
+    assert cache.cache_stats()['misses'] == 1
+
+
+def test_file_reloaded_when_modified(tmp_path, geo_filter):
+    path = tmp_path / 'clip.geo.json'
+    path.write_text(json.dumps(geo_filter))
+    first = cache.load_geojson_file(str(path))
+    assert cache.load_geojson_file(str(path)) is first
+
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.load_geojson_file(str(path)) is not first
+    assert cache.cache_stats()['misses'] == 2
+
+
+def test_lru_eviction():
+    geometry_cache = cache.GeometryCache(max_size=2)
+    for key in ['a', 'b', 'a', 'c']:
+        geometry_cache.get(key, lambda: cache.Geometries([]))
+    stats = geometry_cache.stats()
+    assert stats == {"hits": 1, "misses": 3, "evictions": 1, "size": 2, "max_size": 2}
+    # b was the least recently used
+    assert list(geometry_cache.entries.keys()) == ['a', 'c']
+
+
+def test_lat_long_fields_share_file(tmp_path, geo_filter):
+    path = tmp_path / 'clip.geo.json'
+    path.write_text(json.dumps(geo_filter))
+    spec = {
+        "lat": {"type": "geo.lat.clip", "config": {"geojson": str(path)}},
+        "lon": {"type": "geo.long.clip", "config": {"geojson": str(path)}}
+    }
+    datacraft.entries(spec, 5)
+    stats = cache.cache_stats()
+    assert stats['misses'] == 1
+    assert stats['hits'] == 1
@@ -0,0 +1,96 @@
+import collections
+
+import numpy as np
+import pytest
+from shapely.geometry import shape, Point
+
+import datacraft
+from datacraft.loader import field_loader
+
+from datacraft_geo import cache, cells
+
+_BOX = {"type": "Feature", "properties": {}, "geometry": {"type": "Polygon", "coordinates": [
+    [[10, 50], [10.2, 50], [10.2, 50.1], [10, 50.1], [10, 50]]]}}
+
+
+def test_geohash_known_value():
+    grid = cells.GeohashGrid(11)
+    assert grid.tokens(grid.ids(np.array([10.40744]), np.array([57.64911]))).tolist() == [b'u4pruydqqvj']
+
+
+def test_geohash_prefixes():
+    points = np.random.default_rng(1).uniform(-80, 80, (100, 2))
+    long_hashes = cells.GeohashGrid(9).tokens(cells.GeohashGrid(9).ids(points[:, 0], points[:, 1])).astype(str)
+    short_hashes = cells.GeohashGrid(4).tokens(cells.GeohashGrid(4).ids(points[:, 0], points[:, 1])).astype(str)
+    assert all(long.startswith(short) for long, short in zip(long_hashes, short_hashes))
+
+
+def test_s2_known_values():
+    # the values of the S2 geometry library for the same points
+    leaf = cells.S2Grid(30).ids(np.array([0.0]), np.array([0.0]))
+    assert int(leaf[0]) == 0x1000000000000001
+    grid = cells.S2Grid(10)
+    tokens = grid.tokens(grid.ids(np.array([-74.0, -122.4194]), np.array([40.7, 37.7749])))
+    assert tokens.tolist() == [b'89c25b', b'808581']
+    faces = cells.S2Grid(0)
+    assert faces.tokens(faces.ids(np.array([0.0, 90.0, 0.0]), np.array([0.0, 0.0, 90.0]))).tolist() == \
+        [b'1', b'3', b'5']
+
+
+def test_s2_parent_ids():
+    points = np.random.default_rng(2).uniform(-80, 80, (100, 2))
+    leaf = cells.S2Grid(30).ids(points[:, 0], points[:, 1])
+    parent = cells.S2Grid(12).ids(points[:, 0], points[:, 1])
+    # the cell at a level contains the leaf cells within lsb of its id
+    lsb = np.uint64(1 << 36)
+    assert np.all((leaf >= parent - (lsb - np.uint64(1))) & (leaf <= parent + (lsb - np.uint64(1))))
+
+
+def test_hex_cover_matches_ids():
+    grid = cells.HexGrid(6)
+    ids, polygons = grid.cover((10, 50, 10.2, 50.1))
+    points = np.random.default_rng(3).uniform([10, 50], [10.2, 50.1], (200, 2))
+    point_ids = grid.ids(points[:, 0], points[:, 1])
+    lookup = dict(zip(ids.tolist(), polygons))
+    for point, point_id in zip(points, point_ids.tolist()):
+        assert lookup[point_id].buffer(1e-9).contains(Point(point))
+
+
+def test_geohash_spec():
+    spec = {"hash": {"type": "geo.geohash", "config": {"geojson": _BOX, "geohash_precision": 5}}}
+    polygon = shape(_BOX['geometry'])
+    grid = cells.GeohashGrid(5)
+    ids, boxes = grid.cover(polygon.bounds)
+    touched = set(grid.tokens(ids[[box.intersects(polygon) for box in boxes]]).astype(str).tolist())
+    for entry in datacraft.entries(spec, 200, enforce_schema=True):
+        assert entry['hash'] in touched
+
+
+def test_per_cell_uniform():
+    spec = {"cell": {"type": "geo.cell", "config": {"geojson": _BOX, "cell_type": "hex", "level": 4,
+                                                    "per_cell": True, "seed": 5}}}
+    counts = collections.Counter(entry['cell'] for entry in datacraft.entries(spec, 3000, enforce_schema=True))
+    geometries = cells.cell_geometries(cache.load_geojson(_BOX), cells.HexGrid(4))
+    assert set(counts) == {properties['cell'] for _, properties in geometries.features}
+    expected = 3000 / len(counts)
+    assert all(abs(count - expected) < expected * 0.2 for count in counts.values())
+
+
+def test_cell_ids_batch():
+    spec = {"type": "geo.cell", "config": {"geojson": _BOX, "level": 8, "cell_format": "id"}}
+    supplier = field_loader({"field": spec}).get('field')
+    batch = supplier.next_batch(0, 50)
+    assert batch.dtype == np.uint64
+    assert isinstance(supplier.next(50), int)
+
+
+@pytest.mark.parametrize('config', [
+    {"cell_type": "s2", "per_cell": True},
+    {"cell_type": "hex", "level": 16},
+    {"cell_type": "square"},
+    {"cell_type": "geohash", "level": 12, "per_cell": True}
+])
+def test_invalid_cell_config(config):
+    spec = {"cell": {"type": "geo.cell", "config": dict(geojson=_BOX, **config)}}
+    with pytest.raises(datacraft.SpecException):
+        datacraft.entries(spec, 1)
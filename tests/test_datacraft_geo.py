@@ -1,9 +1,19 @@
+import json
+import random
+import subprocess
+import sys
+
 import pytest
 
 import datacraft
 
 import datacraft_geo.suppliers as impl
 
+_TRIANGLE = {
+    "type": "Feature",
+    "geometry": {"type": "Polygon", "coordinates": [[[0, 0], [10, 0], [10, 10], [0, 0]]]}
+}
+
 
 @pytest.fixture()
 def pair_supplier():
@@ -46,3 +56,80 @@ def test_utm_from_spec():
     }
     one = datacraft.entries(spec, 1)[0]
     assert len(one['utm']) <= 19
+
+
+@pytest.fixture()
+def geo_seed():
+    datacraft.registries.set_default('geo_seed', 1234)
+    yield
+    datacraft.registries.set_default('geo_seed', None)
+
+
+def test_seeded_field_stable_when_spec_changes(geo_seed):
+    spec = {"mgrs": {"type": "geo.mgrs"}, "clip": {"type": "geo.pair.clip", "config": {"geojson": _TRIANGLE}}}
+    bigger = {"number": {"type": "rand_range", "data": [0, 10]}, "utm": {"type": "geo.utm"}, **spec}
+
+    first = datacraft.entries(spec, 20)
+    second = datacraft.entries(bigger, 20)
+
+    assert [record['mgrs'] for record in first] == [record['mgrs'] for record in second]
+    assert [record['clip'] for record in first] == [record['clip'] for record in second]
+
+
+def test_seed_from_config():
+    spec = {"mgrs": {"type": "geo.mgrs", "config": {"seed": 5}}}
+
+    first = datacraft.entries(spec, 10)
+    random.random()
+    second = datacraft.entries(spec, 10)
+
+    assert first == second
+
+
+def test_identical_seeded_fields_differ(geo_seed):
+    spec = {"one": {"type": "geo.mgrs"}, "two": {"type": "geo.mgrs"}}
+
+    records = datacraft.entries(spec, 10)
+
+    assert [record['one'] for record in records] != [record['two'] for record in records]
+
+
+def test_invalid_seed():
+    spec = {"mgrs": {"type": "geo.mgrs", "config": {"seed": "abc"}}}
+    with pytest.raises(datacraft.SpecException):
+        datacraft.entries(spec, 1)
+
+
+def test_point_in_box():
+    supplier = impl.point_in_box(bbox=[10, 20, 11, 21], start_lat=20.5, precision=2, lat_first=True)
+
+    points = [supplier.next(i) for i in range(100)]
+
+    assert all(20.5 <= lat <= 21 and 10 <= long <= 11 for lat, long in points)
+    assert all(round(lat, 2) == lat and round(long, 2) == long for lat, long in points)
+
+
+def test_point_in_box_invalid_bbox():
+    with pytest.raises(datacraft.SpecException):
+        impl.point_in_box(bbox=[10, 20, 11])
+
+
+@pytest.mark.parametrize('imports', ['datacraft, datacraft_geo', 'datacraft_geo'])
+def test_plugin_import_is_light(imports):
+    heavy = ("numpy", "shapely", "utm", "mgrs", "datacraft_geo.suppliers")
+    script = f'import json, sys, {imports}; print(json.dumps([name for name in {heavy!r} if name in sys.modules]))'
+    # datacraft may import numpy itself, only the modules the plugin adds count
+    stand_in = ('import sys, types; sys.modules["datacraft_geo"] = types.ModuleType("datacraft_geo"); '
+                'sys.modules["datacraft_geo"].load_custom = lambda: None; ')
+    loaded = []
+    for prefix in ('', stand_in):
+        output = subprocess.run([sys.executable, '-c', prefix + script], capture_output=True, text=True, check=True)
+        loaded.append(json.loads(output.stdout))
+    assert [name for name in loaded[0] if name not in loaded[1]] == []
+
+
+def test_submodules_load_on_access():
+    import datacraft_geo
+    assert datacraft_geo.cache.cache_stats()['max_size'] > 0
+    with pytest.raises(AttributeError):
+        datacraft_geo.missing
@@ -0,0 +1,136 @@
+import os
+import pickle
+
+import numpy as np
+import pytest
+from shapely.geometry import shape, Point
+
+import datacraft
+
+import datacraft_geo.suppliers as impl
+from datacraft_geo import cache, density
+
+# box from 0 to 4 long and 0 to 4 lat, with a 4 x 4 grid of one degree cells over it
+_BOX = {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [
+    [[0.0, 0.0], [4.0, 0.0], [4.0, 4.0], [0.0, 4.0], [0.0, 0.0]]]}}
+_TRIANGLE = {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [
+    [[0.0, 0.0], [4.0, 0.0], [0.0, 4.0], [0.0, 0.0]]]}}
+_FAR_AWAY = {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [
+    [[50.0, 50.0], [51.0, 50.0], [51.0, 51.0], [50.0, 50.0]]]}}
+
+
+@pytest.fixture()
+def npy_grid(tmp_path):
+    values = np.zeros((4, 4), dtype=np.float32)
+    # first row is the northern most, this is the cell from 1 to 2 long and 2 to 3 lat
+    values[1, 1] = 10.0
+    path = tmp_path / 'weights.npy'
+    np.save(path, values)
+    return str(path)
+
+
+@pytest.fixture()
+def ascii_grid(tmp_path):
+    path = tmp_path / 'weights.asc'
+    path.write_text('ncols 4\nnrows 4\nxllcorner 0\nyllcorner 0\ncellsize 1\nNODATA_value -9999\n'
+                    '0 0 0 0\n'
+                    '0 0 0 -9999\n'
+                    '0 0 0 0\n'
+                    '3 0 0 1\n')
+    return str(path)
+
+
+def test_npy_grid_points_in_weighted_cell(npy_grid):
+    supplier = impl.point_in_weighted_grid(cache.load_geojson(_BOX), npy_grid, weights_bounds=[0, 0, 4, 4])
+    points = np.array([supplier.next(i) for i in range(200)])
+    assert np.all((points[:, 0] >= 1) & (points[:, 0] <= 2))
+    assert np.all((points[:, 1] >= 2) & (points[:, 1] <= 3))
+
+
+def test_ascii_grid_weights_and_nodata(ascii_grid):
+    supplier = impl.point_in_weighted_grid(cache.load_geojson(_BOX), ascii_grid)
+    points = np.array([supplier.next(i) for i in range(2000)])
+    # only the south west and south east cells have weight, three times as many land in the south west
+    assert np.all(points[:, 1] <= 1)
+    west = np.count_nonzero(points[:, 0] <= 1)
+    east = np.count_nonzero(points[:, 0] >= 3)
+    assert west + east == len(points)
+    assert 2.5 < west / east < 3.5
+
+
+def test_points_clipped_to_boundary(tmp_path):
+    path = tmp_path / 'weights.npy'
+    np.save(path, np.ones((8, 8)))
+    polygon = shape(_TRIANGLE['geometry'])
+    supplier = impl.point_in_weighted_grid(cache.load_geojson(_TRIANGLE), str(path), weights_bounds=[0, 0, 4, 4])
+    for i in range(500):
+        assert polygon.intersects(Point(supplier.next(i)))
+
+
+def test_negative_weights(tmp_path):
+    path = tmp_path / 'weights.npy'
+    np.save(path, np.array([[1.0, -1.0], [1.0, 1.0]]))
+    with pytest.raises(datacraft.SpecException):
+        impl.point_in_weighted_grid(cache.load_geojson(_BOX), str(path), weights_bounds=[0, 0, 4, 4])
+
+
+def test_grid_does_not_overlap(npy_grid):
+    with pytest.raises(datacraft.SpecException):
+        impl.point_in_weighted_grid(cache.load_geojson(_FAR_AWAY), npy_grid, weights_bounds=[0, 0, 4, 4])
+
+
+def test_npy_grid_needs_bounds(npy_grid):
+    with pytest.raises(datacraft.SpecException):
+        impl.point_in_weighted_grid(cache.load_geojson(_BOX), npy_grid)
+
+
+def test_ascii_grid_cache_reused(ascii_grid, tmp_path):
+    cache_dir = tmp_path / 'cache'
+    cache_dir.mkdir()
+    density.load_weight_grid(ascii_grid, cache=str(cache_dir))
+    cached = os.listdir(cache_dir)
+    assert len(cached) == 1 and cached[0].endswith('.npy')
+    grid = density.load_weight_grid(ascii_grid, cache=str(cache_dir))
+    assert isinstance(grid.values, np.memmap)
+    assert os.listdir(cache_dir) == cached
+    assert grid.values[3, 0] == 3.0
+
+
+def test_table_pickled_from_source(npy_grid):
+    grid = density.load_weight_grid(npy_grid, [0, 0, 4, 4])
+    table = density.WeightTable(grid, grid.window((0, 0, 4, 4)))
+    copy = pickle.loads(pickle.dumps(table))
+    assert copy.total == table.total
+    assert isinstance(copy.grid.values, np.memmap)
+
+
+def test_weighted_spec(npy_grid):
+    spec = {
+        "point": {
+            "type": "geo.pair.weighted",
+            "config": {"geojson": _BOX, "weights": npy_grid, "weights_bounds": [0, 0, 4, 4], "seed": 7}
+        }
+    }
+    first = datacraft.entries(spec, 20, enforce_schema=True)
+    second = datacraft.entries(spec, 20, enforce_schema=True)
+    assert first == second
+    for entry in first:
+        long, lat = entry['point']
+        assert 1 <= long <= 2 and 2 <= lat <= 3
+
+
+def test_weighted_mgrs(npy_grid):
+    spec = {
+        "mgrs": {
+            "type": "geo.mgrs",
+            "config": {"geojson": _BOX, "weights": npy_grid, "weights_bounds": [0, 0, 4, 4]}
+        }
+    }
+    entries = datacraft.entries(spec, 10)
+    assert all(entry['mgrs'].startswith('31N') for entry in entries)
+
+
+def test_weighted_requires_weights():
+    spec = {"point": {"type": "geo.pair.weighted", "config": {"geojson": _BOX}}}
+    with pytest.raises(datacraft.SpecException):
+        datacraft.entries(spec, 1)
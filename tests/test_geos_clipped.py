@@ -1,9 +1,16 @@
+import random
+
+import numpy as np
 import pytest
+import shapely
 import datacraft
 from shapely.geometry import shape, Point
 import mgrs
 import utm
 
+import datacraft_geo.suppliers as impl
+from datacraft_geo import sampling
+
 
 @pytest.fixture()
 def geo_filter():
@@ -102,3 +109,256 @@ invalid_geojson_specs = [
 def test_invalid_geojson(spec):
     with pytest.raises(datacraft.SpecException):
         datacraft.entries(spec, 1)
+
+
+def test_point_in_bounds_batched(geo_filter):
+    supplier = impl.point_in_bounds(geo_filter, batch_size=7)
+    polygon = shape(geo_filter['geometry'])
+    for i in range(50):
+        x, y = supplier.next(i)
+        assert polygon.contains(Point(x, y))
+
+
+def test_point_in_bounds_reproducible_with_seed(geo_filter):
+    random.seed(42)
+    supplier = impl.point_in_bounds(geo_filter)
+    first = [supplier.next(i) for i in range(10)]
+    random.seed(42)
+    supplier = impl.point_in_bounds(geo_filter)
+    second = [supplier.next(i) for i in range(10)]
+    assert first == second
+
+
+@pytest.fixture()
+def donut_filter():
+    return {"type": "Feature", "geometry": {"type": "MultiPolygon", "coordinates": [
+        [[[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]], [[2, 2], [8, 2], [8, 8], [2, 8], [2, 2]]],
+        [[[20, 20], [21, 20], [20.5, 20.1], [20, 20]]]]}}
+
+
+def test_triangulate_sampler(geo_filter):
+    supplier = impl.point_in_bounds(geo_filter, sampler='triangulate')
+    polygon = shape(geo_filter['geometry'])
+    for i in range(100):
+        x, y = supplier.next(i)
+        assert polygon.covers(Point(x, y))
+
+
+def test_triangulate_sampler_with_holes(donut_filter):
+    supplier = impl.point_in_bounds(donut_filter, sampler='triangulate')
+    polygon = shape(donut_filter['geometry'])
+    for i in range(500):
+        x, y = supplier.next(i)
+        assert polygon.covers(Point(x, y))
+
+
+def test_triangulate_sampler_from_spec(geo_filter):
+    spec = {
+        "coords": {
+            "type": "geo.pair.clip",
+            "config": {
+                "geojson": geo_filter,
+                "sampler": "triangulate"
+            }
+        }
+    }
+    polygon = shape(geo_filter['geometry'])
+    for entry in datacraft.entries(spec, 20, enforce_schema=True):
+        assert polygon.covers(Point(*entry['coords']))
+
+
+def test_triangulate_sampler_precision(donut_filter):
+    supplier = impl.point_in_bounds(donut_filter, sampler='triangulate', precision=1)
+    polygon = shape(donut_filter['geometry'])
+    for i in range(200):
+        x, y = supplier.next(i)
+        assert round(x, 1) == x and round(y, 1) == y
+        assert polygon.contains(Point(x, y))
+
+
+def test_unknown_sampler(geo_filter):
+    with pytest.raises(datacraft.SpecException):
+        impl.point_in_bounds(geo_filter, sampler='nope')
+
+
+def _square(x, y, size, **properties):
+    return {"type": "Feature", "properties": properties, "geometry": {"type": "Polygon", "coordinates": [
+        [[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]]]}}
+
+
+@pytest.fixture()
+def big_and_small():
+    return {"type": "FeatureCollection", "features": [_square(0, 0, 10, weight=1), _square(50, 50, 1, weight=3)]}
+
+
+def _fraction_in_small(supplier, count=4000):
+    return sum(1 for i in range(count) if supplier.next(i)[0] >= 50) / count
+
+
+def test_weight_by_area_default(big_and_small):
+    fraction = _fraction_in_small(impl.point_in_bounds(big_and_small))
+    assert fraction == pytest.approx(1 / 101, abs=0.01)
+
+
+def test_weight_by_uniform(big_and_small):
+    fraction = _fraction_in_small(impl.point_in_bounds(big_and_small, weight_by='uniform'))
+    assert fraction == pytest.approx(0.5, abs=0.05)
+
+
+def test_weight_by_property(big_and_small):
+    fraction = _fraction_in_small(impl.point_in_bounds(big_and_small, weight_property='weight'))
+    assert fraction == pytest.approx(0.75, abs=0.05)
+
+
+def test_weight_by_missing_property(big_and_small):
+    with pytest.raises(datacraft.SpecException):
+        impl.point_in_bounds(big_and_small, weight_by='property', weight_property='missing')
+
+
+def test_geometry_collection_flattened():
+    geojson = {"type": "Feature", "geometry": {"type": "GeometryCollection", "geometries": [
+        _square(0, 0, 1)['geometry'],
+        {"type": "MultiPolygon", "coordinates": [_square(10, 10, 1)['geometry']['coordinates']]},
+        {"type": "Point", "coordinates": [5, 5]}
+    ]}}
+    supplier = impl.point_in_bounds(geojson)
+    assert len(supplier.samplers) == 2
+    polygon = shape(geojson['geometry'])
+    for i in range(100):
+        assert polygon.covers(Point(*supplier.next(i)))
+
+
+def test_grid_sampler(donut_filter):
+    supplier = impl.point_in_bounds(donut_filter, sampler='grid', grid_size=8)
+    polygon = shape(donut_filter['geometry'])
+    for i in range(500):
+        x, y = supplier.next(i)
+        assert polygon.covers(Point(x, y))
+
+
+def test_grid_sampler_sliver(geo_filter):
+    supplier = impl.point_in_bounds(geo_filter, sampler='grid')
+    polygon = shape(geo_filter['geometry'])
+    for i in range(100):
+        x, y = supplier.next(i)
+        assert polygon.contains(Point(x, y))
+
+
+def test_grid_index_classifies_cells():
+    polygon = shape(_square(0, 0, 8)['geometry']).difference(shape(_square(3, 3, 2)['geometry']))
+    index = sampling.GridIndex(polygon, 8)
+    # cells touching the outer edge or the edge of the hole need an exact test, the rest are inside
+    assert index.inside_count == 20
+    assert index.boundary_count == 44
+
+
+def test_grid_index_reused_across_fields(donut_filter):
+    first = impl.point_in_bounds(donut_filter, sampler='grid')
+    second = impl.point_in_bounds(donut_filter, sampler='grid')
+    assert first.samplers[0].sampler.index is second.samplers[0].sampler.index
+
+
+def test_point_group_shares_point(geo_filter):
+    spec = {
+        "lat": {"type": "geo.lat.clip", "config": {"geojson": geo_filter, "point_group": "home"}},
+        "lon": {"type": "geo.long.clip", "config": {"geojson": geo_filter, "point_group": "home", "lat_first": True}},
+        "other_lat": {"type": "geo.lat.clip", "config": {"geojson": geo_filter, "point_group": "work"}}
+    }
+    polygon = shape(geo_filter['geometry'])
+    for entry in datacraft.entries(spec, 100, enforce_schema=True):
+        assert polygon.contains(Point(entry['lon'], entry['lat']))
+
+
+@pytest.fixture()
+def thin_filter():
+    # far too thin for any rounded candidate to land inside of it
+    return {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [
+        [[0, 0], [10, 7.00001], [10, 7.0000105], [0, 0]]]}}
+
+
+@pytest.mark.parametrize('sampler', ['rejection', 'grid'])
+def test_switches_to_exact_sampler(thin_filter, sampler):
+    supplier = impl.point_in_bounds(thin_filter, sampler=sampler)
+    polygon = shape(thin_filter['geometry']).buffer(1e-9)
+    for i in range(100):
+        assert polygon.contains(Point(*supplier.next(i)))
+    assert supplier.samplers[0].switched
+
+
+def test_default_sampler_switch_stays_inside():
+    # a thin diagonal strip, too little of its bounds for the default rejection sampler
+    strip = {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [
+        [[0, 0], [10, 10], [10, 10.001], [0, 0.001], [0, 0]]]}}
+    spec = {"point": {"type": "geo.pair.clip", "config": {"geojson": strip, "seed": 2}}}
+    polygon = shape(strip['geometry'])
+    points = np.array([entry['point'] for entry in datacraft.entries(spec, 2000)])
+    assert shapely.contains_xy(polygon, points[:, 0], points[:, 1]).all()
+
+
+def test_budget_exceeded_without_fallback(thin_filter, monkeypatch):
+    def no_triangulation(geometries, part_index):
+        raise ValueError('no triangulation')
+
+    monkeypatch.setattr(impl, '_triangulation', no_triangulation)
+    supplier = impl.point_in_bounds(thin_filter, sampler='grid', max_attempts=5)
+    with pytest.raises(datacraft.SupplierException):
+        supplier.next(0)
+
+
+def test_time_budget(thin_filter):
+    polygon = shape(thin_filter['geometry'])
+    sampler = sampling.AdaptiveSampler(sampling.RejectionSampler(polygon, 4), time_budget=1e-9)
+    with pytest.raises(sampling.BudgetExceeded):
+        sampler.sample(np.random.default_rng(0), 10)
+
+
+def test_switches_on_low_acceptance():
+    # covers half of its bounds
+    polygon = shapely.Polygon([(0, 0), (1, 0), (1, 1), (0, 0)])
+    fallback = sampling.BoxSampler((0, 0, 1, 1))
+    sampler = sampling.AdaptiveSampler(sampling.RejectionSampler(polygon), lambda: fallback,
+                                       min_acceptance=0.6, min_candidates=100)
+    rng = np.random.default_rng(0)
+
+    sampler.sample(rng, 100)
+    assert not sampler.switched
+    sampler.sample(rng, 10)
+    assert sampler.sampler is fallback
+    assert sampler.accepted <= sampler.candidates
+
+
+@pytest.fixture()
+def bowtie_filter():
+    return {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [
+        [[0, 0], [2, 2], [2, 0], [0, 2], [0, 0]]]}}
+
+
+def test_invalid_geometry_repaired(bowtie_filter):
+    supplier = impl.point_in_bounds(bowtie_filter)
+    repaired = shapely.make_valid(shape(bowtie_filter['geometry']))
+    assert len(supplier.samplers) == 2
+    for i in range(100):
+        assert repaired.covers(Point(*supplier.next(i)))
+
+
+def test_invalid_geometry_not_repaired(bowtie_filter):
+    spec = {"coords": {"type": "geo.pair.clip", "config": {"geojson": bowtie_filter, "make_valid": False}}}
+    with pytest.raises(datacraft.SpecException, match='Self-intersection'):
+        datacraft.entries(spec, 1, enforce_schema=True)
+
+
+def test_precision_fixed_format(geo_filter):
+    spec = {"coords": {"type": "geo.pair.clip",
+                       "config": {"geojson": geo_filter, "precision": 6, "join_with": " ", "lat_first": True}}}
+    polygon = shape(geo_filter['geometry']).buffer(1e-6)
+    for entry in datacraft.entries(spec, 200, enforce_schema=True):
+        lat, long = entry['coords'].split(' ')
+        assert len(lat.split('.')[1]) == 6 and len(long.split('.')[1]) == 6
+        assert polygon.contains(Point(float(long), float(lat)))
+
+
+def test_precision_rounds_points(geo_filter):
+    supplier = impl.point_in_bounds(geo_filter, precision=5)
+    for i in range(100):
+        long, lat = supplier.next(i)
+        assert round(long, 5) == long and round(lat, 5) == lat
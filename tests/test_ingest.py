@@ -0,0 +1,92 @@
+import json
+
+import pytest
+import datacraft
+
+from datacraft_geo import ingest
+
+
+def _square(x, y, size, **properties):
+    return {"type": "Feature", "properties": properties, "geometry": {"type": "Polygon", "coordinates": [
+        [[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]]]}}
+
+
+@pytest.fixture()
+def collection():
+    return {
+        "type": "FeatureCollection",
+        "name": "has \"features\": [ in it",
+        "crs": {"type": "name", "properties": {"features": ["not", "these"]}},
+        "features": [
+            _square(0, 0, 1, ISO_A2="PL", note="brackets ] and { in \\\"strings\\\""),
+            _square(5, 5, 1, ISO_A2="DE"),
+            _square(9, 9, 1, ISO_A2="PL")
+        ]
+    }
+
+
+@pytest.fixture()
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(ingest, '_CHUNK_SIZE', 7)
+
+
+def test_iter_feature_collection(tmp_path, collection, small_chunks):
+    path = tmp_path / 'clip.geo.json'
+    path.write_text(json.dumps(collection, indent=2))
+    assert list(ingest.iter_features(str(path))) == collection['features']
+
+
+def test_iter_single_feature(tmp_path, small_chunks):
+    path = tmp_path / 'clip.geo.json'
+    path.write_text(json.dumps(_square(0, 0, 1)))
+    assert list(ingest.iter_features(str(path))) == [_square(0, 0, 1)]
+
+
+def test_iter_ndjson_with_filter(tmp_path, collection):
+    path = tmp_path / 'clip.geojsonl'
+    path.write_text('\n'.join(json.dumps(feature) for feature in collection['features']) + '\n\n')
+    features = list(ingest.iter_features(str(path), where={"ISO_A2": "PL"}))
+    assert [feature['properties']['ISO_A2'] for feature in features] == ['PL', 'PL']
+
+
+def test_where_list_of_values(collection):
+    assert ingest.matches(collection['features'][1], {"ISO_A2": ["PL", "DE"]})
+    assert not ingest.matches(collection['features'][1], {"ISO_A2": ["PL"]})
+
+
+def test_truncated_file(tmp_path, collection, small_chunks):
+    path = tmp_path / 'clip.geo.json'
+    path.write_text(json.dumps(collection)[:-40])
+    with pytest.raises(datacraft.SpecException):
+        list(ingest.iter_features(str(path)))
+
+
+def test_wkb_cache_round_trip(tmp_path, collection):
+    path = tmp_path / 'clip.geo.json'
+    path.write_text(json.dumps(collection))
+    where = {"ISO_A2": "PL"}
+    features = ingest.load_features(str(path), where, wkb_cache=str(tmp_path))
+    cache_files = list(tmp_path.glob('*.wkb'))
+    assert len(cache_files) == 1
+
+    cached = ingest.read_wkb_cache(str(cache_files[0]), str(path))
+    assert [props for _, props in cached] == [props for _, props in features]
+    assert all(a.equals(b) for (a, _), (b, _) in zip(cached, features))
+
+    # touching the source makes the cache stale
+    path.write_text(json.dumps(collection) + ' ')
+    assert ingest.read_wkb_cache(str(cache_files[0]), str(path)) is None
+
+
+def test_spec_with_where(tmp_path, collection):
+    path = tmp_path / 'clip.geo.json'
+    path.write_text(json.dumps(collection))
+    spec = {
+        "coords": {
+            "type": "geo.pair.clip",
+            "config": {"geojson": str(path), "where": {"ISO_A2": "DE"}, "wkb_cache": True}
+        }
+    }
+    for entry in datacraft.entries(spec, 20):
+        x, y = entry['coords']
+        assert 5 <= x <= 6 and 5 <= y <= 6
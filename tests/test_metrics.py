@@ -0,0 +1,118 @@
+import gc
+import json
+
+import pytest
+import utm
+
+import datacraft
+
+import datacraft_geo.suppliers as impl
+from datacraft_geo import metrics
+
+
+def _triangle(x, y):
+    return {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [
+        [[x, y], [x + 1, y], [x + 1, y + 1], [x, y]]]}}
+
+
+@pytest.fixture(autouse=True)
+def reset():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_point_metrics_per_polygon():
+    geojson = {"type": "FeatureCollection", "features": [_triangle(0, 0), _triangle(10, 10)]}
+    supplier = impl.point_in_bounds(geojson, batch_size=100)
+
+    for i in range(250):
+        supplier.next(i)
+
+    snapshot = metrics.snapshot()
+    parts = snapshot['suppliers'][0]['parts']
+    assert [part['feature'] for part in parts] == [0, 1]
+    assert sum(part['points'] for part in parts) == 300
+    assert all(part['candidates'] - part['rejected'] >= part['points'] for part in parts)
+    assert all(part['rejected'] > 0 for part in parts)
+    totals = snapshot['totals']
+    assert totals['counters']['points'] == 300
+    assert totals['counters']['rejected'] == sum(part['rejected'] for part in parts)
+    assert totals['seconds']['sample'] >= totals['seconds']['containment'] > 0
+
+
+def test_triangulate_metrics_rarely_reject():
+    supplier = impl.point_in_bounds(_triangle(0, 0), sampler='triangulate', batch_size=1000)
+    supplier.next(0)
+
+    part = metrics.snapshot()['suppliers'][0]['parts'][0]
+    assert part['points'] == 1000
+    # only points rounded onto the edge of the triangle are rejected
+    assert part['rejected'] < part['candidates'] * 0.01
+
+
+def test_mgrs_metrics():
+    supplier = impl.mgrs_supplier(impl.point_in_bounds(_triangle(0, 0)), False, batch_size=50)
+    supplier.next(0)
+
+    kinds = {entry['kind']: entry for entry in metrics.snapshot()['suppliers']}
+    assert kinds['mgrs']['counters'] == {'values': 50}
+    assert kinds['mgrs']['seconds']['convert'] > 0
+    assert kinds['point']['counters'] == {'points': 50}
+
+
+def test_utm_metrics():
+    engine = datacraft.outputs.processor(template="{{ zn }}{{ zl }}")
+    supplier = impl.utm_supplier(datacraft.suppliers.values([[89.0, 0.0]]), engine, True, batch_size=5)
+    supplier.next(0)
+
+    entry = metrics.snapshot()['suppliers'][0]
+    assert entry['counters'] == {'values': 5, 'polar_values': 5}
+    assert set(entry['seconds']) == {'convert', 'template'}
+
+
+def test_utm_conversion_failures():
+    engine = datacraft.outputs.processor(template="{{ zn }}{{ zl }}")
+    supplier = impl.utm_supplier(datacraft.suppliers.values([[95.0, 0.0]]), engine, True, batch_size=5)
+    with pytest.raises(utm.error.OutOfRangeError):
+        supplier.next(0)
+
+    assert metrics.snapshot()['totals']['counters'] == {'conversion_failures': 1}
+
+
+def test_dump_at_exit(tmp_path):
+    path = tmp_path / 'metrics.json'
+    impl.point_in_bounds(_triangle(0, 0), batch_size=10).next(0)
+    datacraft.registries.set_default('geo_metrics_file', str(path))
+    try:
+        metrics._dump_at_exit()
+    finally:
+        datacraft.registries.set_default('geo_metrics_file', None)
+
+    assert json.loads(path.read_text())['totals']['counters']['points'] == 10
+
+
+def test_collected_suppliers_kept_in_totals():
+    kept = impl.point_in_bounds(_triangle(0, 0), batch_size=10)
+    kept.next(0)
+    dropped = impl.point_in_bounds(_triangle(10, 10), batch_size=20)
+    dropped.next(0)
+    del dropped
+    gc.collect()
+
+    snapshot = metrics.snapshot()
+    assert len(snapshot['suppliers']) == 1
+    assert snapshot['totals']['counters']['points'] == 30
+
+
+def test_no_dump_in_child_process(tmp_path, monkeypatch):
+    path = tmp_path / 'metrics.json'
+    impl.point_in_bounds(_triangle(0, 0), batch_size=10).next(0)
+    monkeypatch.setattr(metrics.multiprocessing, 'parent_process', lambda: object())
+    datacraft.registries.set_default('geo_metrics_file', str(path))
+    try:
+        metrics._dump_at_exit()
+    finally:
+        datacraft.registries.set_default('geo_metrics_file', None)
+
+    assert not path.exists()
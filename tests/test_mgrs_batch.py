@@ -0,0 +1,149 @@
+import mgrs
+import numpy as np
+import pytest
+
+import datacraft
+
+import datacraft_geo.suppliers as impl
+from datacraft_geo import mgrs_batch, zones
+
+EDGE_CASES = [
+    (0.0, 0.0), (-0.0, 3.0), (-1e-10, 0.5), (0.0, 180.0), (0.0, -180.0), (0.0, 6.0),
+    (84.0, 0.0), (-80.0, 0.0), (84.0, 179.99), (-80.0, -179.999),
+    (56.0, 3.0), (64.0, 3.0), (60.0, 2.9999999), (63.999, 11.999),
+    (72.0, 9.0), (72.0, 21.0), (72.0, 33.0), (83.9, 41.999),
+    (90.0, 0.0), (-90.0, 0.0), (85.0, 45.0), (-85.0, -120.0)
+]
+
+
+def _corpus():
+    rng = np.random.default_rng(42)
+    lats = np.concatenate([
+        rng.uniform(-90, 90, 20000),
+        rng.uniform(55, 65, 5000),
+        rng.uniform(71, 85, 5000),
+        rng.uniform(-1e-3, 1e-3, 2000),
+        np.round(rng.uniform(-80, 84, 2000), 4),
+        [lat for lat, _ in EDGE_CASES]
+    ])
+    longs = np.concatenate([
+        rng.uniform(-180, 180, 20000),
+        rng.uniform(-2, 13, 5000),
+        rng.uniform(-2, 43, 5000),
+        rng.uniform(-180, 180, 2000),
+        np.round(rng.uniform(-180, 180, 2000) / 6) * 6,
+        [long for _, long in EDGE_CASES]
+    ])
+    return lats, longs
+
+
+@pytest.mark.parametrize('precision', [0, 1, 2, 3, 4, 5])
+def test_matches_mgrs_package(precision):
+    lats, longs = _corpus()
+    converter = mgrs.MGRS()
+    expected = [converter.toMGRS(lat, long, MGRSPrecision=precision)
+                for lat, long in zip(lats.tolist(), longs.tolist())]
+
+    actual = [value.decode('ascii') for value in mgrs_batch.to_mgrs(lats, longs, precision)]
+
+    assert actual == expected
+
+
+def test_empty_input():
+    assert len(mgrs_batch.to_mgrs([], [])) == 0
+
+
+@pytest.mark.parametrize('precision,expected', [
+    ('1m', 5), ('10m', 4), ('100m', 3), ('1km', 2), ('10KM', 1), ('100km', 0), (3, 3), ('2', 2)
+])
+def test_parse_precision(precision, expected):
+    assert mgrs_batch.parse_precision(precision) == expected
+
+
+@pytest.mark.parametrize('precision', [6, -1, '5km', None])
+def test_parse_precision_invalid(precision):
+    with pytest.raises(ValueError):
+        mgrs_batch.parse_precision(precision)
+
+
+def test_supplier_buffers_batches():
+    pair_supplier = datacraft.suppliers.geo_pair(as_list=True, start_lat=-80, end_lat=84)
+    supplier = impl.mgrs_supplier(pair_supplier, False, precision=2, batch_size=10)
+
+    values = [supplier.next(i) for i in range(25)]
+
+    assert all(len(value) == 9 for value in values)
+    assert len(supplier.buffer) == 10
+
+
+def test_supplier_lat_first():
+    pair_supplier = datacraft.suppliers.values([[48.8584, 2.2945]])
+    supplier = impl.mgrs_supplier(pair_supplier, True, batch_size=3)
+
+    assert supplier.next(0) == mgrs.MGRS().toMGRS(48.8584, 2.2945)
+
+
+def test_mgrs_precision_from_spec():
+    spec = {
+        "mgrs": {
+            "type": "geo.mgrs",
+            # polar points are UPS, which has no zone number
+            "config": {"mgrs_precision": "1km", "start_lat": -80, "end_lat": 84}
+        }
+    }
+    records = datacraft.entries(spec, 5, enforce_schema=True)
+    assert all(len(record['mgrs']) == 9 for record in records)
+
+
+def test_mgrs_precision_invalid_from_spec():
+    spec = {
+        "mgrs": {
+            "type": "geo.mgrs",
+            "config": {"mgrs_precision": "2km"}
+        }
+    }
+    with pytest.raises(datacraft.SpecException):
+        datacraft.entries(spec, 1)
+
+
+@pytest.mark.parametrize('square', ['33TWN', '31UDQ', '32VKM', '01CDM', '18SUJ'])
+def test_mgrs_squares_from_spec(square):
+    spec = {
+        "mgrs": {
+            "type": "geo.mgrs",
+            "config": {"mgrs_squares": square, "mgrs_precision": "1km"}
+        }
+    }
+    records = datacraft.entries(spec, 200, enforce_schema=True)
+    assert {record['mgrs'][:5] for record in records} == {square}
+
+
+def test_mgrs_squares_partial():
+    # cut by the zone 31 / 32 boundary
+    samplers = zones.square_samplers('31UGR')
+    assert 0 < sum(sampler.acceptance for sampler in samplers) < 1
+    points = samplers[0].sample(np.random.default_rng(1), 500)
+    assert set(mgrs_batch.to_mgrs(points[:, 1], points[:, 0], 0).tolist()) == {b'31UGR'}
+
+
+def test_zone_box_area():
+    # half of the unit sphere
+    assert zones.box_area((-180, 0, 180, 90)) == pytest.approx(2 * np.pi)
+    assert zones.box_area((0, 72, 6, 80)) < zones.box_area((0, 0, 6, 8)) / 3
+
+
+@pytest.mark.parametrize('square', ['33TAN', '33TWW', '32XMA', '33T'])
+def test_mgrs_squares_invalid(square):
+    with pytest.raises(ValueError):
+        zones.square_samplers(square)
+
+
+def test_mgrs_zones_from_spec():
+    spec = {
+        "mgrs": {
+            "type": "geo.mgrs",
+            "config": {"zones": ["32V"], "mgrs_precision": 0}
+        }
+    }
+    records = datacraft.entries(spec, 200, enforce_schema=True)
+    assert {record['mgrs'][:3] for record in records} == {'32V'}
@@ -0,0 +1,90 @@
+import copy
+
+import mgrs
+import numpy as np
+import pytest
+
+import datacraft
+from datacraft.loader import field_loader
+
+import datacraft_geo.suppliers as impl
+
+_BOX = {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [
+    [[10, 40], [12, 40], [12, 42], [10, 42], [10, 40]]]}}
+
+
+def _supplier(spec):
+    # configuring a field consumes parts of its config
+    return field_loader({"field": copy.deepcopy(spec)}).get('field')
+
+
+def test_pair_batch_matches_scalar():
+    # the same batch sizes draw the same points
+    spec = {"type": "geo.pair.clip", "config": {"geojson": _BOX, "seed": 4, "batch_size": 10}}
+    supplier = _supplier(spec)
+    scalar = [supplier.next(i) for i in range(20)]
+    supplier = _supplier(spec)
+    batch = np.concatenate([supplier.next_batch(0, 10), supplier.next_batch(10, 10)])
+    assert batch.dtype == np.float64 and batch.shape == (20, 2)
+    assert batch.tolist() == scalar
+
+
+def test_pair_batch_lat_first():
+    supplier = _supplier({"type": "geo.pair.clip", "config": {"geojson": _BOX, "lat_first": True}})
+    batch = supplier.next_batch(0, 50)
+    assert batch.flags['C_CONTIGUOUS']
+    assert np.all((batch[:, 0] >= 40) & (batch[:, 0] <= 42))
+    assert np.all((batch[:, 1] >= 10) & (batch[:, 1] <= 12))
+
+
+def test_mixed_scalar_and_batch():
+    spec = {"type": "geo.pair.clip", "config": {"geojson": _BOX, "seed": 8, "batch_size": 10}}
+    supplier = _supplier(spec)
+    expected = [supplier.next(i) for i in range(10)]
+    supplier = _supplier(spec)
+    mixed = [supplier.next(i) for i in range(3)]
+    # the rest of the current batch comes first
+    mixed.extend(supplier.next_batch(3, 20).tolist())
+    assert mixed[:10] == expected
+    assert len(mixed) == 23
+
+
+@pytest.mark.parametrize('type_name,index,low,high', [('geo.lat.clip', 0, 40, 42), ('geo.long.clip', 1, 10, 12)])
+def test_column_batches(type_name, index, low, high):
+    supplier = _supplier({"type": type_name, "config": {"geojson": _BOX}})
+    column = supplier.next_batch(0, 100)
+    assert column.dtype == np.float64 and column.shape == (100,) and column.flags['C_CONTIGUOUS']
+    assert np.all((column >= low) & (column <= high))
+
+
+def test_point_group_batches_share_points():
+    config = {"geojson": _BOX, "point_group": "home"}
+    loader = field_loader({"lat": {"type": "geo.lat.clip", "config": dict(config)},
+                           "lon": {"type": "geo.long.clip", "config": dict(config)}})
+    lats = loader.get('lat').next_batch(0, 10)
+    longs = loader.get('lon').next_batch(0, 10)
+    assert len(set(zip(lats.tolist(), longs.tolist()))) == 10
+    assert np.all((longs >= 10) & (longs <= 12))
+
+
+def test_mgrs_batch_fixed_width():
+    spec = {"type": "geo.mgrs", "config": {"geojson": _BOX, "seed": 2, "batch_size": 25}}
+    batch = _supplier(spec).next_batch(0, 25)
+    assert batch.dtype == np.dtype('S15')
+    supplier = _supplier(spec)
+    assert [value.decode('ascii') for value in batch] == [supplier.next(i) for i in range(25)]
+
+
+def test_utm_batch():
+    spec = {"type": "geo.utm", "config": {"geojson": _BOX, "seed": 2, "batch_size": 25}}
+    batch = _supplier(spec).next_batch(0, 25)
+    assert batch.dtype.kind == 'U'
+    supplier = _supplier(spec)
+    assert batch.tolist() == [supplier.next(i) for i in range(25)]
+
+
+def test_mgrs_batch_from_plain_pairs():
+    pair_supplier = datacraft.suppliers.values([[48.8584, 2.2945]])
+    supplier = impl.mgrs_supplier(pair_supplier, True, batch_size=3)
+    expected = mgrs.MGRS().toMGRS(48.8584, 2.2945)
+    assert supplier.next_batch(0, 4).tolist() == [expected.encode('ascii')] * 4
@@ -0,0 +1,81 @@
+import pickle
+import random
+
+import pytest
+import shapely
+
+import datacraft_geo.suppliers as impl
+from datacraft_geo import cache, parallel
+
+
+@pytest.fixture
+def spec():
+    return {
+        "point": {
+            "type": "geo.pair.clip",
+            "config": {
+                "geojson": {
+                    "type": "Feature",
+                    "geometry": {"type": "Polygon", "coordinates": [[[0, 0], [10, 0], [10, 10], [0, 0]]]}
+                },
+                "sampler": "grid"
+            }
+        },
+        "mgrs": {"type": "geo.mgrs", "config": {"zones": "33T"}},
+        "count": {"type": "rand_int_range", "data": [0, 100]}
+    }
+
+
+def test_same_output_for_any_worker_count(spec):
+    single = parallel.entries(spec, 1000, 42, workers=1, chunk_size=150, template='{{ point }} {{ mgrs }} {{ count }}')
+    pooled = parallel.entries(spec, 1000, 42, workers=3, chunk_size=150, template='{{ point }} {{ mgrs }} {{ count }}')
+
+    assert len(single) == 1000
+    assert single == pooled
+
+
+def test_spawned_workers(spec):
+    single = parallel.entries(spec, 300, 7, workers=1, chunk_size=100)
+    spawned = parallel.entries(spec, 300, 7, workers=2, chunk_size=100, start_method='spawn')
+
+    assert single == spawned
+
+
+def test_unordered_chunks(spec):
+    chunks = list(parallel.chunks(spec, 1000, 42, workers=2, chunk_size=300, ordered=False))
+
+    assert sorted(index for index, _ in chunks) == [0, 1, 2, 3]
+    assert [len(records) for _, records in sorted(chunks)] == [300, 300, 300, 100]
+    assert [record for _, records in sorted(chunks) for record in records] == parallel.entries(
+        spec, 1000, 42, workers=1, chunk_size=300)
+
+
+def test_in_process_keeps_random_state(spec):
+    random.seed(3)
+    expected = random.random()
+    random.seed(3)
+    parallel.entries(spec, 200, 42, workers=1, chunk_size=50)
+    assert random.random() == expected
+
+
+def test_seed_changes_output(spec):
+    assert parallel.entries(spec, 10, 1, workers=1) != parallel.entries(spec, 10, 2, workers=1)
+
+
+def test_negative_seed(spec):
+    with pytest.raises(ValueError):
+        parallel.entries(spec, 10, -1, workers=1)
+
+
+def test_pickle_geometries():
+    geometries = cache.Geometries([(shapely.box(0, 0, 2, 1), {"name": "box"})])
+    supplier = impl.point_in_geometries(geometries, sampler='grid', grid_size=4)
+
+    restored = pickle.loads(pickle.dumps(supplier))
+
+    assert restored.next(0) == supplier.next(0)
+    assert isinstance(restored.samplers[0].sampler.index, type(supplier.samplers[0].sampler.index))
+    loaded = pickle.loads(pickle.dumps(geometries))
+    assert loaded.features[0][1] == {"name": "box"}
+    assert loaded.parts[0].equals(geometries.parts[0])
+    assert list(loaded._indexes.keys()) == list(geometries._indexes.keys())
@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+import pytest
+from shapely.geometry import shape, Point
+
+import datacraft
+
+from datacraft_geo import pools
+
+_U_SHAPE = {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [
+    [[0, 0], [3, 0], [3, 3], [2, 3], [2, 1], [1, 1], [1, 3], [0, 3], [0, 0]]]}}
+
+
+def _spec(**config):
+    return {"point": {"type": "geo.pair.clip", "config": dict(geojson=_U_SHAPE, **config)}}
+
+
+@pytest.mark.parametrize('size', [1, 2, 10, 97, 100])
+def test_without_replacement_is_permutation(size):
+    order = pools.PoolOrder(size, replacement=False)
+    rng = np.random.default_rng(1)
+    for _ in range(3):
+        assert sorted(order.next(rng, size).tolist()) == list(range(size))
+
+
+def test_without_replacement_across_calls():
+    order = pools.PoolOrder(10, replacement=False)
+    rng = np.random.default_rng(2)
+    first = np.concatenate([order.next(rng, 3), order.next(rng, 3), order.next(rng, 4)])
+    assert sorted(first.tolist()) == list(range(10))
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        pools.PoolOrder(0)
+
+
+def test_pool_points_inside():
+    polygon = shape(_U_SHAPE['geometry'])
+    entries = datacraft.entries(_spec(pool_size=50), 200, enforce_schema=True)
+    points = {tuple(entry['point']) for entry in entries}
+    assert len(points) <= 50
+    assert all(polygon.covers(Point(point)) for point in points)
+
+
+def test_pool_kept_on_disk(tmp_path):
+    spec = _spec(pool_size=100, pool_cache=str(tmp_path), seed=5)
+    first = datacraft.entries(spec, 20, enforce_schema=True)
+    files = os.listdir(tmp_path)
+    assert len(files) == 1
+    stored = np.load(tmp_path / files[0])
+    assert stored.shape == (100, 2)
+    assert datacraft.entries(spec, 20, enforce_schema=True) == first
+    assert os.listdir(tmp_path) == files
+    served = {tuple(entry['point']) for entry in first}
+    assert served <= {tuple(point) for point in stored.tolist()}
+
+
+def test_pool_keyed_by_seed_and_config(tmp_path):
+    datacraft.entries(_spec(pool_size=10, pool_cache=str(tmp_path), seed=1), 1)
+    datacraft.entries(_spec(pool_size=10, pool_cache=str(tmp_path), seed=2), 1)
+    datacraft.entries(_spec(pool_size=10, pool_cache=str(tmp_path), seed=1, sampler='triangulate'), 1)
+    # serving config shares the pool
+    datacraft.entries(_spec(pool_size=10, pool_cache=str(tmp_path), seed=1, join_with=','), 1)
+    assert len(os.listdir(tmp_path)) == 3
+
+
+def test_pool_not_kept_without_seed(tmp_path):
+    datacraft.entries(_spec(pool_size=10, pool_cache=str(tmp_path)), 1)
+    assert os.listdir(tmp_path) == []
+
+
+def test_pool_feeds_mgrs(tmp_path):
+    spec = {
+        "mgrs": {
+            "type": "geo.mgrs",
+            "config": {"geojson": _U_SHAPE, "pool_size": 5, "pool_replacement": False, "seed": 9}
+        }
+    }
+    entries = datacraft.entries(spec, 10)
+    values = [entry['mgrs'] for entry in entries]
+    assert len(set(values[:5])) == 5
+    assert set(values[:5]) == set(values[5:])
@@ -0,0 +1,92 @@
+import copy
+
+import numpy as np
+import pytest
+
+import datacraft
+from datacraft.loader import field_loader
+
+import datacraft_geo.suppliers as impl
+from datacraft_geo import cache
+
+# two boxes side by side, west from 0 to 1 long and east from 2 to 3 long
+_REGIONS = {"type": "FeatureCollection", "features": [
+    {"type": "Feature", "properties": {"name": "west", "code": 1},
+     "geometry": {"type": "Polygon", "coordinates": [[[0, 0], [1, 0], [1, 1], [0, 1], [0, 0]]]}},
+    {"type": "Feature", "properties": {"name": "east", "code": 2},
+     "geometry": {"type": "Polygon", "coordinates": [[[2, 0], [3, 0], [3, 1], [2, 1], [2, 0]]]}}
+]}
+
+
+def _name(long):
+    return 'west' if long <= 1 else 'east'
+
+
+def test_region_matches_point_in_group():
+    spec = {
+        "point": {"type": "geo.pair.clip", "config": {"geojson": _REGIONS, "point_group": "home"}},
+        "lat": {"type": "geo.lat.clip", "config": {"geojson": _REGIONS, "point_group": "home"}},
+        "region": {"type": "geo.region.clip", "config": {"geojson": _REGIONS, "point_group": "home",
+                                                         "property": "name"}},
+        "index": {"type": "geo.region.clip", "config": {"geojson": _REGIONS, "point_group": "home"}}
+    }
+    entries = datacraft.entries(spec, 200, enforce_schema=True)
+    for entry in entries:
+        long, lat = entry['point']
+        assert entry['lat'] == lat
+        assert entry['region'] == _name(long)
+        assert entry['index'] == ['west', 'east'].index(entry['region'])
+    assert {entry['region'] for entry in entries} == {'west', 'east'}
+
+
+def test_group_pair_formatted():
+    spec = {
+        "point": {"type": "geo.pair.clip", "config": {"geojson": _REGIONS, "point_group": "home",
+                                                      "lat_first": True, "join_with": ","}},
+        "long": {"type": "geo.long.clip", "config": {"geojson": _REGIONS, "point_group": "home"}}
+    }
+    for entry in datacraft.entries(spec, 20):
+        lat, long = entry['point'].split(',')
+        assert float(long) == entry['long']
+        assert 0 <= float(lat) <= 1
+
+
+def test_properties_as_dict():
+    spec = {"type": "geo.region.clip", "config": {"geojson": _REGIONS, "properties": ["name", "code"]}}
+    supplier = field_loader({"field": spec}).get('field')
+    for i in range(20):
+        value = supplier.next(i)
+        assert value in [{"name": "west", "code": 1}, {"name": "east", "code": 2}]
+
+
+def test_region_batch_matches_points():
+    spec = {"type": "geo.pair.clip", "config": {"geojson": _REGIONS, "point_group": "home", "batch_size": 16}}
+    loader = field_loader({
+        "point": copy.deepcopy(spec),
+        "code": {"type": "geo.region.clip", "config": {"geojson": _REGIONS, "point_group": "home",
+                                                       "property": "code", "batch_size": 16}}
+    })
+    points, codes = loader.get('point'), loader.get('code')
+    # batches that start part way through the points made for next
+    points.next(0)
+    for start, count in [(1, 10), (11, 40)]:
+        pairs = points.next_batch(start, count)
+        batch = codes.next_batch(start, count)
+        assert batch.dtype == np.int64 and len(batch) == count
+        assert batch.tolist() == [1 if long <= 1 else 2 for long in pairs[:, 0]]
+
+
+def test_track_regions():
+    shared = impl.shared_pairs(impl.track_supplier(cache.load_geojson(_REGIONS), tracks=5, step_meters=5000))
+    regions = impl.region_supplier(shared, property='name')
+    for i in range(100):
+        assert regions.next(i) == _name(shared.next(i)[0])
+
+
+@pytest.mark.parametrize('config', [{"pool_size": 10}, {"bbox": [0, 0, 1, 1]}])
+def test_region_unknown(config):
+    spec = {"type": "geo.region.clip", "config": dict(geojson=_REGIONS, property="name", **config)}
+    if 'bbox' in config:
+        del spec['config']['geojson']
+    with pytest.raises(datacraft.SpecException):
+        field_loader({"field": spec}).get('field')
@@ -0,0 +1,85 @@
+import re
+
+import numpy as np
+import pytest
+import shapely
+from shapely.geometry import shape
+
+import datacraft
+
+import datacraft_geo.suppliers as impl
+from datacraft_geo import cache, tracks
+
+# U shape, a straight line between the arms leaves the polygon
+_U_SHAPE = {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [
+    [[0, 0], [3, 0], [3, 3], [2, 3], [2, 1], [1, 1], [1, 3], [0, 3], [0, 0]]]}}
+_ISLANDS = {"type": "Feature", "geometry": {"type": "MultiPolygon", "coordinates": [
+    [[[0, 0], [1, 0], [1, 1], [0, 1], [0, 0]]],
+    [[[5, 5], [6, 5], [6, 6], [5, 6], [5, 5]]]]}}
+
+
+def _paths(supplier, num_tracks, steps):
+    points = supplier.next_points(num_tracks * steps)
+    return points.reshape(steps, num_tracks, 2)
+
+
+@pytest.mark.parametrize('mode', ['walk', 'waypoints'])
+def test_tracks_stay_inside(mode):
+    polygon = shape(_U_SHAPE['geometry'])
+    supplier = impl.track_supplier(cache.load_geojson(_U_SHAPE), tracks=4, mode=mode, step_meters=10000,
+                                   rng=np.random.default_rng(3))
+    paths = _paths(supplier, 4, 500)
+    for track in range(4):
+        path = shapely.LineString(paths[:, track])
+        assert polygon.buffer(1e-4).covers(path)
+
+
+@pytest.mark.parametrize('mode', ['walk', 'waypoints'])
+def test_step_length(mode):
+    supplier = impl.track_supplier(cache.load_geojson(_U_SHAPE), tracks=2, mode=mode, step_meters=1000,
+                                   rng=np.random.default_rng(5))
+    paths = _paths(supplier, 2, 200)
+    scale = np.array([111_320 * np.cos(np.radians(1.5)), 111_320])
+    meters = np.hypot(*(np.diff(paths, axis=0) * scale).transpose(2, 0, 1))
+    assert meters.max() < 1100
+
+
+def test_tracks_stay_on_their_island():
+    supplier = impl.track_supplier(cache.load_geojson(_ISLANDS), tracks=10, mode='waypoints', step_meters=20000,
+                                   rng=np.random.default_rng(7))
+    paths = _paths(supplier, 10, 100)
+    west = paths[0, :, 0] < 2
+    assert np.all((paths[:, west, 0] < 2) & (paths[:, west, 1] < 2))
+    assert np.all((paths[:, ~west, 0] > 4) & (paths[:, ~west, 1] > 4))
+
+
+def test_edge_index_blocks_crossing():
+    index = tracks.EdgeIndex(cache.load_geojson(_U_SHAPE).parts, 8)
+    x0, y0 = np.array([0.5, 0.5, 0.5]), np.array([2.5, 2.5, 0.5])
+    x1, y1 = np.array([2.5, 0.6, 2.5]), np.array([2.5, 2.6, 0.5])
+    assert index.allowed(x0, y0, x1, y1).tolist() == [False, True, True]
+
+
+def test_invalid_mode():
+    with pytest.raises(datacraft.SpecException):
+        impl.track_supplier(cache.load_geojson(_U_SHAPE), mode='teleport')
+
+
+def test_track_spec_seeded():
+    spec = {
+        "position": {
+            "type": "geo.track",
+            "config": {"geojson": _U_SHAPE, "tracks": 3, "seed": 11, "join_with": " "}
+        }
+    }
+    first = datacraft.entries(spec, 30, enforce_schema=True)
+    assert first == datacraft.entries(spec, 30, enforce_schema=True)
+    assert all(len(entry['position'].split(' ')) == 2 for entry in first)
+
+
+@pytest.mark.parametrize('output,pattern', [('mgrs', r'^31N[A-Z]{2}\d{10}$'), ('utm', r'^31 N \d+ \d+$')])
+def test_track_output_formats(output, pattern):
+    spec = {"position": {"type": "geo.track", "config": {"geojson": _U_SHAPE, "output": output}}}
+    entries = datacraft.entries(spec, 5, enforce_schema=True)
+    for entry in entries:
+        assert re.match(pattern, entry['position'])
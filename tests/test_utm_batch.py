@@ -0,0 +1,187 @@
+import mgrs
+import numpy as np
+import pytest
+import utm
+
+import datacraft
+
+import datacraft_geo.suppliers as impl
+from datacraft_geo import templates, utm_batch
+
+
+def _corpus():
+    rng = np.random.default_rng(7)
+    lats = np.concatenate([
+        rng.uniform(-80, 84, 5000),
+        rng.uniform(55, 65, 1000),
+        rng.uniform(71, 84, 1000),
+        [0.0, -0.0, -1e-20, 84.0, -80.0, 72.0, 56.0, 64.0]
+    ])
+    longs = np.concatenate([
+        rng.uniform(-180, 180, 5000),
+        rng.uniform(-2, 13, 1000),
+        rng.uniform(-2, 43, 1000),
+        [0.0, 180.0, -180.0, 9.0, 3.0, 42.0, 12.0, 0.0]
+    ])
+    return lats, longs
+
+
+def test_matches_utm_package():
+    lats, longs = _corpus()
+
+    eastings, northings, zone_numbers, zone_letters = utm_batch.from_latlon(lats, longs)
+
+    for i, (lat, long) in enumerate(zip(lats.tolist(), longs.tolist())):
+        assert utm.from_latlon(lat, long) == (eastings[i], northings[i], zone_numbers[i], zone_letters[i])
+
+
+def test_out_of_range():
+    with pytest.raises(utm.error.OutOfRangeError):
+        utm_batch.from_latlon([10.0, 10.0], [0.0, 181.0])
+
+
+def test_polar_points_use_ups():
+    lats = np.array([89.0, 85.0, -85.0, -89.9, 10.0])
+    longs = np.array([-45.0, 45.0, -120.0, 120.0, 10.0])
+
+    eastings, northings, zone_numbers, zone_letters = utm_batch.from_latlon(lats, longs)
+
+    assert zone_numbers.tolist() == [0, 0, 0, 0, 32]
+    assert zone_letters.tolist() == ['Y', 'Z', 'A', 'B', 'P']
+    converter = mgrs.MGRS()
+    for i in range(4):
+        # MGRS truncates the UPS coordinates to the meter within the 100 km square
+        digits = converter.toMGRS(lats[i], longs[i])[3:]
+        assert abs(eastings[i] % 100000 - int(digits[:5]) - 0.5) < 0.51
+        assert abs(northings[i] % 100000 - int(digits[5:]) - 0.5) < 0.51
+
+
+def test_forced_zone():
+    eastings, _, zone_numbers, zone_letters = utm_batch.from_latlon([48.8584, 48.8584], [2.2945, 2.2945],
+                                                                    force_zone_number=32, force_zone_letter='U')
+
+    assert zone_numbers.tolist() == [32, 32]
+    assert zone_letters.tolist() == ['U', 'U']
+    assert eastings[0] == utm.from_latlon(48.8584, 2.2945, force_zone_number=32, force_zone_letter='U')[0]
+
+
+@pytest.mark.parametrize('zone_number,zone_letter', [(0, None), (61, None), ('33', None), (None, 'I'), (33, 'TT')])
+def test_forced_zone_invalid(zone_number, zone_letter):
+    with pytest.raises(ValueError):
+        utm_batch.check_forced_zone(zone_number, zone_letter)
+
+
+def test_forced_zone_from_spec():
+    spec = {
+        "utm": {
+            "type": "geo.utm",
+            "config": {
+                "start_lat": 40, "end_lat": 50, "start_long": 0, "end_long": 20,
+                "force_zone_number": 33, "force_zone_letter": "T",
+                "template": "{{ zn }}{{ zl }}"
+            }
+        }
+    }
+    records = datacraft.entries(spec, 20, enforce_schema=True)
+    assert {record['utm'] for record in records} == {'33T'}
+
+
+def test_polar_from_spec():
+    spec = {
+        "utm": {
+            "type": "geo.utm",
+            "config": {"start_lat": 85, "end_lat": 90, "template": "{{ zl }} {{ easting | int }}"}
+        }
+    }
+    records = datacraft.entries(spec, 20, enforce_schema=True)
+    assert all(record['utm'][0] in 'YZ' for record in records)
+
+
+@pytest.mark.parametrize('template,parts', [(None, 3), ("{% if zn %}{{ zn }} {% endif %}{{ zl }}", 1)])
+def test_polar_without_zone_number(template, parts):
+    config = {"start_lat": 85, "end_lat": 90}
+    if template is not None:
+        config['template'] = template
+    records = datacraft.entries({"utm": {"type": "geo.utm", "config": config}}, 20, enforce_schema=True)
+    for record in records:
+        assert record['utm'] == record['utm'].strip()
+        assert len(record['utm'].split()) == parts
+        assert record['utm'][0] in 'YZ'
+
+
+@pytest.mark.parametrize('zone,expected_zones', [
+    ('33T', {'33T'}),
+    (['31V', '32V'], {'31V', '32V'}),
+    (['33X', 37], None),
+])
+def test_zones_from_spec(zone, expected_zones):
+    spec = {
+        "utm": {
+            "type": "geo.utm",
+            "config": {"zones": zone, "template": "{{ zn }}{{ zl }}"}
+        }
+    }
+    records = datacraft.entries(spec, 200, enforce_schema=True)
+    values = {record['utm'] for record in records}
+    if expected_zones is not None:
+        assert values == expected_zones
+    else:
+        assert {value[:2] for value in values} == {'33', '37'}
+
+
+@pytest.mark.parametrize('zone', ['32X', '61', 'T33', '33I'])
+def test_zones_invalid(zone):
+    spec = {"utm": {"type": "geo.utm", "config": {"zones": zone}}}
+    with pytest.raises(datacraft.SpecException):
+        datacraft.entries(spec, 1)
+
+
+@pytest.mark.parametrize('template', [
+    "{{ zone_number }} {{ zone_letter }} {{ easting | int }} {{ northing | int }}",
+    "{{ zn }}{{ zl }} {{ easting|int }}/{{ northing|int }}",
+    "{ \"e\": {{ easting }}, \"n\": {{ northing }} }",
+    "{{zl|int}}-{{ zn | int }}"
+])
+def test_compiled_template_matches_jinja(template):
+    lats, longs = _corpus()
+    eastings, northings, zone_numbers, zone_letters = utm_batch.from_latlon(lats[:200], longs[:200])
+    data = {"easting": eastings, "northing": northings, "zone_number": zone_numbers, "zone_letter": zone_letters,
+            "zn": zone_numbers, "zl": zone_letters}
+    engine = datacraft.outputs.processor(template=template)
+
+    render = templates.compile_template(template, impl._UTM_FIELDS)
+
+    expected = [engine.process({key: values.tolist()[i] for key, values in data.items()}) for i in range(200)]
+    assert render(data) == expected
+
+
+@pytest.mark.parametrize('template', [
+    "{{ easting | round }}",
+    "{% if zone_letter > 'M' %}N{% endif %}{{ zone_number }}",
+    "{{ unknown }}",
+    "{{ easting }}\n"
+])
+def test_template_needs_jinja(template):
+    assert templates.compile_template(template, impl._UTM_FIELDS) is None
+
+
+def test_jinja_template_from_spec():
+    spec = {
+        "utm": {
+            "type": "geo.utm",
+            "config": {
+                "template": "{% if zone_letter >= 'N' %}N{% else %}S{% endif %}{{ zone_number }}",
+                "batch_size": 7
+            }
+        }
+    }
+    records = datacraft.entries(spec, 10)
+    assert all(record['utm'][0] in 'NS' for record in records)
+
+
+def test_utm_supplier_lat_first():
+    pair_supplier = datacraft.suppliers.values([[48.8584, 2.2945]])
+    engine = datacraft.outputs.processor(template="{{ zn }}{{ zl }}")
+    supplier = impl.utm_supplier(pair_supplier, engine, True, batch_size=3)
+
+    assert supplier.next(0) == '31U'